@@ -0,0 +1,124 @@
+import copy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+RESPONSES = Path(__file__).resolve().parent.parent / 'tests' / 'responses'
+
+
+def load_response(filename: str) -> Any:
+    return json.loads((RESPONSES / f'{filename}.json').read_text())
+
+
+def with_energy_communities(entries: List[Dict[str, Any]], energy_communities: int) -> List[Dict[str, Any]]:
+    # the recorded total followed by copies of it for each energy community, like a meter taking part in many
+    # communities
+    total = entries[0]
+    return [total] + [{**copy.deepcopy(total), 'ec_id': f'EC{index:04d}'} for index in range(energy_communities)]
+
+
+class LocalPortal:
+    # Stand-in of the smartmeter portal on localhost serving the recorded responses: every request is answered after
+    # latency seconds (like the round trip to the portal), consumption records carry energy_communities additional
+    # entries and the login user owns accounts accounts with meters_per_account metering points each.
+    # Usable as context manager, base_url is passed to the api clients.
+
+    def __init__(self, latency: float = 0.0, energy_communities: int = 0, accounts: int = 1,
+                 meters_per_account: int = 1):
+        self.latency = latency
+        self.requests = 0
+        self.__lock = threading.Lock()
+        self.__records = {
+            endpoint: json.dumps(with_energy_communities(load_response(filename), energy_communities)).encode()
+            for endpoint, filename in (('Day', 'data_day'), ('Week', 'data_week'), ('Month', 'data_month'),
+                                       ('Year', 'data_year'))
+        }
+        self.__account_ids = [f'{index:012d}' for index in range(1, accounts + 1)]
+        account = load_response('data_account_id_1')[0]
+        self.__accounts = json.dumps(
+            [{**account, 'accountId': account_id} for account_id in self.__account_ids]
+        ).encode()
+        metering_point = load_response('data_metering_point')[0]
+        self.__metering_points = {
+            account_id: json.dumps([
+                {**metering_point, 'meteringPointId': f'AT00200000000000000000{account_id[-6:]}{index:05d}'}
+                for index in range(meters_per_account)
+            ]).encode() for account_id in self.__account_ids
+        }
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), self.__handler())
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.__server.server_port}'
+
+    def start(self) -> 'LocalPortal':
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def __enter__(self) -> 'LocalPortal':
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def answer(self, url: str) -> Optional[bytes]:
+        # response body of a GET (or the login POST) after the simulated latency, None for unknown paths
+        with self.__lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        parts = urlsplit(url)
+        path, query = parts.path, parse_qs(parts.query)
+        if path.startswith('/orchestration/ConsumptionRecord/'):
+            return self.__records.get(path.rsplit('/', 1)[1])
+        if path == '/orchestration/User/GetAccountIdByBussinespartnerId':
+            return self.__accounts
+        if path == '/orchestration/User/GetMeteringPointByAccountId':
+            return self.__metering_points.get(query.get('accountId', [''])[0])
+        if path in ('/orchestration/Authentication/Login', '/orchestration/Authentication/Logout'):
+            return b'{}'
+        return None
+
+    def __handler(self) -> type:
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, with Nagle every keep-alive response waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                self.__answer()
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.__answer()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def __answer(self) -> None:
+                body = portal.answer(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
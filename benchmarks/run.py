@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional
+from zoneinfo import ZoneInfo
+
+from netznoe_smartmeter_portal_api import (
+    AsyncNetzNoeSmartmeterPortalApi,
+    NetzNoeSmartmeterPortalApi,
+    SmartmeterResolution,
+)
+from netznoe_smartmeter_portal_api.frames import to_pandas
+from netznoe_smartmeter_portal_api.parser import (
+    calc_next_datetime,
+    calc_time_axis,
+    parse_peak_demand_times,
+    process_peak_demand,
+    to_smartmeter_result,
+    to_smartmeter_result_yearly,
+)
+
+from .portal import LocalPortal, load_response, with_energy_communities
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+METER_ID = 'AT0020000000000000000000100123456'
+FIRST_DAY = date(2023, 1, 1)
+PEAK_DEMAND_FIELDS = ('meteredPeakDemands', 'estimatedPeakDemands', 'peakDemands')
+
+
+@dataclass
+class Scale:
+    days: int = 365
+    # responses with many energy communities are parsed for fewer days
+    community_days: int = 30
+    energy_communities: int = 50
+    accounts: int = 20
+    meters_per_account: int = 5
+    workers: int = 8
+    repeat: int = 3
+
+
+QUICK = Scale(days=7, community_days=2, energy_communities=5, accounts=2, meters_per_account=2, workers=4, repeat=1)
+
+
+@dataclass
+class Measurement:
+    name: str
+    mode: str
+    seconds: float
+    peak_kib: float
+    items: int
+    unit: str
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else float('inf')
+
+
+def measure(name: str, mode: str, unit: str, run: Callable[[], int], repeat: int) -> Measurement:
+    # best of repeat runs without tracing, the allocations are taken from a separate traced run since tracemalloc
+    # slows down the run considerably
+    best = float('inf')
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(name, mode, best, peak / 1024, items, unit)
+
+
+def days(scale: Scale) -> List[date]:
+    return [FIRST_DAY + timedelta(days=offset) for offset in range(scale.days)]
+
+
+def base_time_of(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, 0, 15, tzinfo=ZoneInfo('Europe/Vienna')).astimezone(ZoneInfo('UTC'))
+
+
+def slots_of(day: date) -> int:
+    next_day = day + timedelta(days=1)
+    start = datetime(day.year, day.month, day.day, tzinfo=ZoneInfo('Europe/Vienna'))
+    end = datetime(next_day.year, next_day.month, next_day.day, tzinfo=ZoneInfo('Europe/Vienna'))
+    return int(end.timestamp() - start.timestamp()) // 900
+
+
+def parse_benchmarks(scale: Scale) -> List[Measurement]:
+    day_entries = load_response('data_day')
+    community_entries = with_energy_communities(day_entries, scale.energy_communities)
+    month, year = load_response('data_month')[0], load_response('data_year')[0]
+
+    def parse_days(entries: list, count: int, lazy: bool = False) -> Callable[[], int]:
+        def run() -> int:
+            values = 0
+            for day in days(scale)[:count]:
+                base_time = base_time_of(day)
+                for entry in entries:
+                    result = to_smartmeter_result(base_time, entry, {'minutes': 15}, lazy=lazy)
+                    values += len(result.metered)
+            return values
+        return run
+
+    def time_axis() -> int:
+        return sum(len(calc_time_axis(base_time_of(day), {'minutes': 15}, 96)) for day in days(scale))
+
+    def time_axis_per_value() -> int:
+        # how timestamps were computed before calc_time_axis: one step and time zone conversion per value
+        values = 0
+        for day in days(scale):
+            timestamp = base_time_of(day)
+            for _ in range(96):
+                timestamp.astimezone(ZoneInfo('Europe/Vienna'))
+                timestamp = calc_next_datetime(timestamp, {'minutes': 15})
+                values += 1
+        return values
+
+    def peak_demands() -> int:
+        values = 0
+        for _ in range(scale.days):
+            for data in (month, year):
+                peak_demand_times = parse_peak_demand_times(data)
+                for field in PEAK_DEMAND_FIELDS:
+                    values += len(process_peak_demand(data, field, peak_demand_times))
+        return values
+
+    def peak_demands_per_entry() -> int:
+        # how peak demands were parsed before peakDemandTimes were shared: strptime and two ZoneInfo lookups per entry
+        values = 0
+        for _ in range(scale.days):
+            for data in (month, year):
+                for field in PEAK_DEMAND_FIELDS:
+                    for cnt, value in enumerate(data.get(field, [])):
+                        if value is not None:
+                            datetime.strptime(data['peakDemandTimes'][cnt], '%Y-%m-%dT%H:%M:%S').replace(
+                                tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo('Europe/Vienna'))
+                            values += 1
+        return values
+
+    # the recorded day has 96 slots, DST days are cut to their 92 slots so that the days do not overlap
+    results = [to_smartmeter_result(base_time_of(day), {
+        field: series[:slots_of(day)] if isinstance(series, list) else series
+        for field, series in day_entries[0].items()
+    }, {'minutes': 15}) for day in days(scale)]
+
+    def frame_from_tuples() -> int:
+        # how DataFrames were built before to_pandas
+        frame = pandas.DataFrame({
+            name: pandas.Series(dict(itertools.chain.from_iterable(getattr(result, name) for result in results)),
+                                dtype='float64')
+            for name in ('metered', 'estimated', 'grid_usage_leftover', 'self_coverage')
+        })
+        return frame.size
+
+    def frame_from_columnar() -> int:
+        return to_pandas(results)[['metered', 'estimated', 'grid_usage_leftover', 'self_coverage']].size
+
+    def parse_years() -> int:
+        return sum(len(to_smartmeter_result_yearly(date(2023, 1, 1), year, {'months': 1}).values)
+                   for _ in range(scale.days))
+
+    cases = [
+        (f'parse {scale.days} days', 'eager', parse_days(day_entries, scale.days)),
+        (f'parse {scale.days} days', 'lazy, metered only', parse_days(day_entries, scale.days, lazy=True)),
+        (f'parse {scale.community_days} days x {scale.energy_communities} energy communities', 'eager',
+         parse_days(community_entries, scale.community_days)),
+        (f'parse {scale.community_days} days x {scale.energy_communities} energy communities', 'lazy, metered only',
+         parse_days(community_entries, scale.community_days, lazy=True)),
+        (f'15min time axis of {scale.days} days', 'per value stepping', time_axis_per_value),
+        (f'15min time axis of {scale.days} days', 'calc_time_axis', time_axis),
+        (f'peak demands of month + year x {scale.days}', 'strptime per entry', peak_demands_per_entry),
+        (f'peak demands of month + year x {scale.days}', 'shared peakDemandTimes', peak_demands),
+        (f'parse year x {scale.days}', 'eager', parse_years),
+    ]
+    if pandas is not None:
+        cases += [
+            (f'pandas DataFrame of {scale.days} days', 'from tuples', frame_from_tuples),
+            (f'pandas DataFrame of {scale.days} days', 'to_pandas', frame_from_columnar),
+        ]
+    return [measure(name, mode, 'values', run, scale.repeat) for name, mode, run in cases]
+
+
+def end_to_end_benchmarks(scale: Scale, latency: float) -> List[Measurement]:
+    first_day, last_day = days(scale)[0], days(scale)[-1]
+    measurements = []
+    # the recorded responses without additional energy communities, parsing them is covered by parse_benchmarks
+    with LocalPortal(latency=latency, accounts=scale.accounts, meters_per_account=scale.meters_per_account) as portal:
+        def client() -> NetzNoeSmartmeterPortalApi:
+            return NetzNoeSmartmeterPortalApi('benchmark', 'benchmark', pool_maxsize=scale.workers,
+                                              base_url=portal.base_url)
+
+        def counted(run: Callable[[], object]) -> Callable[[], int]:
+            # throughput is reported in portal requests
+            def wrapper() -> int:
+                before = portal.requests
+                run()
+                return portal.requests - before
+            return wrapper
+
+        def serial() -> None:
+            api = client()
+            for day in days(scale):
+                api.get_day(METER_ID, day)
+
+        def prefetch() -> None:
+            for _ in client().iter_days(METER_ID, first_day, last_day, prefetch=scale.workers):
+                pass
+
+        def get_range() -> None:
+            client().get_range(METER_ID, first_day, last_day, resolution=SmartmeterResolution.QUARTER_HOUR,
+                               max_workers=scale.workers)
+
+        def get_days_async() -> None:
+            api = AsyncNetzNoeSmartmeterPortalApi('benchmark', 'benchmark', max_concurrency=scale.workers,
+                                                  base_url=portal.base_url)
+            asyncio.run(api.get_days(METER_ID, first_day, last_day))
+
+        def metering_points() -> None:
+            client().get_metering_points()
+
+        cases = [
+            (f'get_day x {scale.days}', 'serial', serial),
+            (f'iter_days x {scale.days}', f'prefetch={scale.workers}', prefetch),
+            (f'get_range x {scale.days} days', f'max_workers={scale.workers}', get_range),
+            (f'get_days x {scale.days}', f'async, max_concurrency={scale.workers}', get_days_async),
+            (f'get_metering_points, {scale.accounts * scale.meters_per_account} meters', 'fan-out',
+             metering_points),
+        ]
+        for name, mode, run in cases:
+            measurements.append(measure(name, mode, 'requests', counted(run), scale.repeat))
+    return measurements
+
+
+def print_table(measurements: List[Measurement]) -> None:
+    header = ('benchmark', 'mode', 'best [s]', 'peak alloc [KiB]', 'throughput')
+    rows = [(m.name, m.mode, f'{m.seconds:.4f}', f'{m.peak_kib:.0f}', f'{m.throughput:,.0f} {m.unit}/s')
+            for m in measurements]
+    widths = [max(len(row[index]) for row in (header, *rows)) for index in range(len(header))]
+    for row in (header, tuple('-' * width for width in widths), *rows):
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def main(argv: Optional[List[str]] = None) -> List[Measurement]:
+    parser = argparse.ArgumentParser(description='Benchmarks of parsing and fetching against a local portal')
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated round trip of the portal in seconds')
+    parser.add_argument('--quick', action='store_true', help='small scale, single run (smoke test)')
+    parser.add_argument('--skip-end-to-end', action='store_true', help='only run the parse benchmarks')
+    parser.add_argument('--json', metavar='PATH', help='also write the measurements to a JSON file')
+    args = parser.parse_args(argv)
+
+    scale = QUICK if args.quick else Scale()
+    measurements = parse_benchmarks(scale)
+    if not args.skip_end_to_end:
+        measurements += end_to_end_benchmarks(scale, args.latency)
+    print_table(measurements)
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump([{**asdict(m), 'throughput': m.throughput} for m in measurements], fp, indent=2)
+    return measurements
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -24,6 +24,17 @@ setup(
     install_requires=[
         "requests"
     ],
+    extras_require={
+        "parquet": ["pyarrow"],
+        "numpy": ["numpy"],
+        "pandas": ["pandas"],
+        "polars": ["polars"],
+        "prometheus": ["prometheus_client"],
+        "opentelemetry": ["opentelemetry-api"],
+    },
+    entry_points={
+        "console_scripts": ["netznoe-smartmeter=netznoe_smartmeter_portal_api.cli:main"],
+    },
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
@@ -84,5 +84,9 @@ if __name__ == '__main__':
             api_data=api.get_day(meter_id, day)
         )
 
+    # same as above, but the next 4 days are fetched in the background while the current one is saved
+    for day, daily_values in api.iter_days(meter_id, date(2023, 2, 1), date(2023, 3, 1), prefetch=4):
+        save_as_csv(output_path=csv_output_dir_daily, filename_prefix=day.strftime('%Y-%m-%d'), api_data=daily_values)
+
     # logout of the api
     api.do_logout()
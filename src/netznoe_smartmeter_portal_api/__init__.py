@@ -1,17 +1,47 @@
 from .api import NetzNoeSmartmeterPortalApi
+from .async_api import AsyncNetzNoeSmartmeterPortalApi
+from .cache import SmartmeterResponseCache
+from .coverage import SmartmeterCoverageIndex, SmartmeterDayCoverage
+from .instrumentation import SmartmeterObserver, SmartmeterRequestEvent
+from .memo import SmartmeterMemo
 from .models import (
+    SmartmeterColumnarResult,
     SmartmeterDataQuality,
     SmartmeterEnergyCommunity,
     SmartmeterMeteringPoint,
+    SmartmeterResolution,
     SmartmeterResult,
     SmartmeterResultYearly,
 )
+from .parser import SmartmeterLazyResult, SmartmeterLazyResultYearly
+from .pool import SmartmeterAccountStats, SmartmeterSessionPool
+from .store import SmartmeterStore
+from .sync import SmartmeterSync, SmartmeterSyncResult
+from .throttle import SmartmeterConcurrencyController, SmartmeterRateLimiter
 
 __all__ = [
     "NetzNoeSmartmeterPortalApi",
+    "AsyncNetzNoeSmartmeterPortalApi",
     "SmartmeterResult",
     "SmartmeterResultYearly",
+    "SmartmeterColumnarResult",
+    "SmartmeterLazyResult",
+    "SmartmeterLazyResultYearly",
     "SmartmeterDataQuality",
     "SmartmeterMeteringPoint",
     "SmartmeterEnergyCommunity",
+    "SmartmeterResolution",
+    "SmartmeterResponseCache",
+    "SmartmeterMemo",
+    "SmartmeterCoverageIndex",
+    "SmartmeterDayCoverage",
+    "SmartmeterStore",
+    "SmartmeterSync",
+    "SmartmeterSyncResult",
+    "SmartmeterSessionPool",
+    "SmartmeterAccountStats",
+    "SmartmeterRateLimiter",
+    "SmartmeterConcurrencyController",
+    "SmartmeterObserver",
+    "SmartmeterRequestEvent",
 ]
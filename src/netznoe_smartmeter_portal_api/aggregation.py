@@ -0,0 +1,97 @@
+from dataclasses import fields
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from .models import (
+    PEAK_DEMAND_FIELDS,
+    QUALITY_CODES,
+    QUALITY_FIELDS,
+    SmartmeterDataQuality,
+    SmartmeterResolution,
+    SmartmeterResult,
+    day_of,
+)
+
+_TZ_UTC = ZoneInfo('UTC')
+_TZ_VIENNA = ZoneInfo('Europe/Vienna')
+_INTERVAL = timedelta(minutes=15)
+
+Timestamp = Union[date, datetime]
+
+
+def _hour_of(timestamp: Timestamp) -> Timestamp:
+    if not isinstance(timestamp, datetime):
+        raise ValueError('Hourly aggregation requires 15min values')
+    # like 15min values an hour is marked by its end, the key stays in UTC since datetimes of one zone which only
+    # differ by fold (both 02:00 of the DST switch) compare equal
+    start = (timestamp.astimezone(_TZ_UTC) - _INTERVAL).replace(minute=0, second=0, microsecond=0)
+    return start + timedelta(hours=1)
+
+
+def _month_of(timestamp: Timestamp) -> Timestamp:
+    return day_of(timestamp).replace(day=1)
+
+
+_BUCKETS: Dict[SmartmeterResolution, Callable[[Timestamp], Timestamp]] = {
+    SmartmeterResolution.HOUR: _hour_of,
+    SmartmeterResolution.DAY: day_of,
+    SmartmeterResolution.MONTH: _month_of,
+}
+
+
+def aggregate(results: Iterable[SmartmeterResult], resolution: SmartmeterResolution) -> SmartmeterResult:
+    # Rolls 15min (or daily) results up to hourly, daily or monthly values without asking the portal:
+    #   energy fields (kWh, kvarh) are summed over the available values of a period
+    #   estimated_qualities and quality_ec carry the worst quality of the period (L3 > L2 > L1)
+    #   metered/estimated peak demands keep the maximum of the period with the time it occurred, the peak demand
+    #   quality is the worst quality of the period at the time of the metered (or else estimated) peak
+    # Periods without any value are omitted, just like in the responses of the portal.
+    if resolution not in _BUCKETS:
+        raise ValueError('Unsupported resolution')
+    bucket = _BUCKETS[resolution]
+
+    sums: Dict[str, Dict[Timestamp, float]] = {}
+    worst: Dict[str, Dict[Timestamp, Tuple[Timestamp, SmartmeterDataQuality]]] = {}
+    peaks: Dict[str, Dict[Timestamp, Tuple[datetime, float]]] = {}
+    for result in results:
+        for result_field in fields(SmartmeterResult):
+            name = result_field.name
+            entries = getattr(result, name)
+            if name in QUALITY_FIELDS:
+                qualities = worst.setdefault(name, {})
+                for timestamp, quality in entries:
+                    key = bucket(timestamp)
+                    if key not in qualities or QUALITY_CODES[quality] > QUALITY_CODES[qualities[key][1]]:
+                        qualities[key] = (timestamp, quality)
+            elif name in PEAK_DEMAND_FIELDS:
+                maxima = peaks.setdefault(name, {})
+                for timestamp, value in entries:
+                    key = bucket(timestamp)
+                    if key not in maxima or value > maxima[key][1]:
+                        maxima[key] = (timestamp, value)
+            else:
+                totals = sums.setdefault(name, {})
+                for timestamp, value in entries:
+                    key = bucket(timestamp)
+                    totals[key] = totals.get(key, 0.0) + value
+
+    def local(key: Timestamp) -> Timestamp:
+        return key.astimezone(_TZ_VIENNA) if isinstance(key, datetime) else key
+
+    peak_times = {**peaks.get('estimated_peak_demands', {}), **peaks.get('metered_peak_demands', {})}
+    series: Dict[str, List[tuple]] = {}
+    for result_field in fields(SmartmeterResult):
+        name = result_field.name
+        if name == 'peak_demand_data_qualities':
+            series[name] = [
+                (peak_times[key][0] if key in peak_times else timestamp, quality)
+                for key, (timestamp, quality) in sorted(worst.get(name, {}).items())
+            ]
+        elif name in QUALITY_FIELDS:
+            series[name] = [(local(key), quality) for key, (_, quality) in sorted(worst.get(name, {}).items())]
+        elif name in PEAK_DEMAND_FIELDS:
+            series[name] = [peak for _, peak in sorted(peaks.get(name, {}).items())]
+        else:
+            series[name] = [(local(key), total) for key, total in sorted(sums.get(name, {}).items())]
+    return SmartmeterResult(**series)
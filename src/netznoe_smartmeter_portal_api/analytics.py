@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Union
+from zoneinfo import ZoneInfo
+
+from .models import SmartmeterResolution, SmartmeterResult, SmartmeterResultYearly, day_start
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+_TZ_VIENNA = ZoneInfo('Europe/Vienna')
+_INTERVAL_SECONDS = 15 * 60
+# energy fields summed per period, consumption is metered + estimated
+_ENERGY_FIELDS = ('metered', 'estimated', 'self_coverage', 'self_coverage_renewable_energy', 'grid_usage_leftover',
+                  'joint_tenancy_proportion')
+
+
+@dataclass
+class SmartmeterCommunityKpis:
+    # KPIs of one energy community (or of all of them), float64 numpy arrays aligned with
+    # SmartmeterCommunityAnalytics.periods. Energies are sums in kWh, ratios are NaN where the denominator is 0.
+    #   self_coverage_percent: self_coverage / consumption * 100
+    #   grid_usage_leftover_share: grid_usage_leftover / consumption
+    #   renewable_energy_ratio: self_coverage_renewable_energy / self_coverage
+    #   allocation_share: self_coverage / self_coverage of all energy communities of the meter
+    consumption: Any
+    self_coverage: Any
+    self_coverage_renewable_energy: Any
+    grid_usage_leftover: Any
+    joint_tenancy_proportion: Any
+    self_coverage_percent: Any
+    grid_usage_leftover_share: Any
+    renewable_energy_ratio: Any
+    allocation_share: Any
+
+
+@dataclass
+class SmartmeterCommunityAnalytics:
+    # periods: first day of every day or month between the first and the last value
+    # communities: KPIs per ec_id, aggregate: KPIs of all energy communities of the meter together
+    resolution: SmartmeterResolution
+    periods: List[date]
+    communities: Dict[str, SmartmeterCommunityKpis]
+    aggregate: SmartmeterCommunityKpis
+
+
+def _period_starts(first: date, last: date, resolution: SmartmeterResolution) -> List[date]:
+    periods = []
+    current = first.replace(day=1) if resolution == SmartmeterResolution.MONTH else first
+    while current <= last:
+        periods.append(current)
+        if resolution == SmartmeterResolution.MONTH:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1)
+    return periods
+
+
+def _ratio(numerator: Any, denominator: Any) -> Any:
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return numpy.where(denominator != 0, numerator / denominator, numpy.nan)
+
+
+def _kpis(sums: Dict[str, Any], consumption: Any, all_self_coverage: Any) -> SmartmeterCommunityKpis:
+    return SmartmeterCommunityKpis(
+        consumption=consumption,
+        self_coverage=sums['self_coverage'],
+        self_coverage_renewable_energy=sums['self_coverage_renewable_energy'],
+        grid_usage_leftover=sums['grid_usage_leftover'],
+        joint_tenancy_proportion=sums['joint_tenancy_proportion'],
+        self_coverage_percent=_ratio(sums['self_coverage'], consumption) * 100,
+        grid_usage_leftover_share=_ratio(sums['grid_usage_leftover'], consumption),
+        renewable_energy_ratio=_ratio(sums['self_coverage_renewable_energy'], sums['self_coverage']),
+        allocation_share=_ratio(sums['self_coverage'], all_self_coverage),
+    )
+
+
+def analyze_communities(results: Iterable[Mapping[str, Union[SmartmeterResult, SmartmeterResultYearly]]],
+                        resolution: SmartmeterResolution = SmartmeterResolution.MONTH) -> SmartmeterCommunityAnalytics:
+    # KPIs per energy community and period from the results of get_*_per_energy_community (15min or daily values,
+    # e.g. the days or months of a year, which must not overlap, or the monthly values of a year for monthly periods).
+    # All values of a community are binned into the periods at once on their columnar buffers. The consumption of a
+    # community is the consumption of its entry, or the one of the 'total' entry if the portal only reports it there.
+    # Requires numpy.
+    if numpy is None:  # pragma: no cover
+        raise ImportError('numpy is required for analyze_communities')
+    if resolution not in (SmartmeterResolution.DAY, SmartmeterResolution.MONTH):
+        raise ValueError('Unsupported resolution')
+
+    # timestamps (shifted to the start of their interval) and columns per ec_id
+    timestamps: Dict[str, List[Any]] = {}
+    columns: Dict[str, Dict[str, List[Any]]] = {}
+    for per_community in results:
+        for ec_id, result in per_community.items():
+            columnar = result.to_columnar()
+            # yearly results report the consumption of a month as values
+            consumption_field = 'metered'
+            if isinstance(result, SmartmeterResultYearly):
+                if resolution != SmartmeterResolution.MONTH:
+                    raise ValueError('Monthly values require resolution MONTH')
+                consumption_field = 'values'
+            shift = 0 if columnar.is_date else _INTERVAL_SECONDS
+            timestamps.setdefault(ec_id, []).append(numpy.frombuffer(columnar.timestamps, dtype=numpy.int64) - shift)
+            for name in _ENERGY_FIELDS:
+                column = columnar.values.get(consumption_field if name == 'metered' else name)
+                values = (numpy.frombuffer(column, dtype=numpy.float64) if column is not None
+                          else numpy.full(len(columnar.timestamps), numpy.nan))
+                columns.setdefault(ec_id, {}).setdefault(name, []).append(values)
+
+    all_timestamps = numpy.concatenate([part for parts in timestamps.values() for part in parts] or
+                                       [numpy.empty(0, dtype=numpy.int64)])
+    if len(all_timestamps) == 0:
+        raise ValueError('No values to analyze')
+    first = datetime.fromtimestamp(int(all_timestamps.min()), _TZ_VIENNA).date()
+    last = datetime.fromtimestamp(int(all_timestamps.max()), _TZ_VIENNA).date()
+    periods = _period_starts(first, last, resolution)
+    boundaries = numpy.array([day_start(period) for period in periods], dtype=numpy.int64)
+
+    sums: Dict[str, Dict[str, Any]] = {}
+    for ec_id, parts in timestamps.items():
+        bins = numpy.searchsorted(boundaries, numpy.concatenate(parts), side='right') - 1
+        sums[ec_id] = {
+            name: numpy.bincount(bins, weights=numpy.nan_to_num(numpy.concatenate(values)), minlength=len(periods))
+            for name, values in columns[ec_id].items()
+        }
+
+    total = sums.get('total')
+    # a meter without energy communities only has its total entry
+    members = {ec_id: ec_sums for ec_id, ec_sums in sums.items() if ec_id != 'total'} or sums
+    consumptions = {ec_id: ec_sums['metered'] + ec_sums['estimated'] for ec_id, ec_sums in sums.items()}
+    if total is not None:
+        # communities without own consumption values share the one of the meter
+        for ec_id in members:
+            if not consumptions[ec_id].any():
+                consumptions[ec_id] = consumptions['total']
+        aggregate_consumption = consumptions['total']
+    else:
+        aggregate_consumption = numpy.max([consumptions[ec_id] for ec_id in members], axis=0)
+
+    aggregate_sums = {name: numpy.sum([ec_sums[name] for ec_sums in members.values()], axis=0)
+                      for name in _ENERGY_FIELDS}
+    return SmartmeterCommunityAnalytics(
+        resolution=resolution,
+        periods=periods,
+        communities={
+            ec_id: _kpis(ec_sums, consumptions[ec_id], aggregate_sums['self_coverage'])
+            for ec_id, ec_sums in members.items()
+        },
+        aggregate=_kpis(aggregate_sums, aggregate_consumption, aggregate_sums['self_coverage']),
+    )
@@ -1,17 +1,40 @@
-from datetime import date, datetime, timedelta
-from typing import Dict, List, Union, no_type_check, Tuple
+import calendar
+import email.utils
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import fields
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 from zoneinfo import ZoneInfo
 
 import itertools
-from requests import Session
-
+from requests import ConnectionError, Response, Session, Timeout
+from requests.adapters import HTTPAdapter
+
+from .aggregation import aggregate
+from .cache import SmartmeterResponseCache, is_final
+from .coverage import SmartmeterCoverageIndex
+from .instrumentation import SmartmeterObserver, SmartmeterRequestEvent, count_values
+from .memo import SmartmeterMemo
 from .models import (
-    SmartmeterDataQuality,
     SmartmeterEnergyCommunity,
     SmartmeterMeteringPoint,
+    SmartmeterResolution,
     SmartmeterResult,
     SmartmeterResultYearly,
+    day_of,
 )
+from .parser import calc_next_datetime, iter_json_array, to_smartmeter_result, to_smartmeter_result_yearly
+from .throttle import SmartmeterConcurrencyController, SmartmeterRateLimiter
+
+
+Parsed = TypeVar('Parsed')
+ParsedEntry = TypeVar('ParsedEntry')
 
 
 class NetzNoeSmartmeterPortalAuthError(Exception):
@@ -25,12 +48,50 @@ class NetzNoeSmartmeterPortalDataError(Exception):
 class NetzNoeSmartmeterPortalApi:
     __user_agent = 'fetched by https://github.com/schue30/NetzNoe-SmartmeterPortal-Api'
     __domain = 'https://smartmeter.netz-noe.at'
-
-    def __init__(self, username: str, password: str):
+    __stream_chunk_size = 64 * 1024
+    # an expired session is answered with 401/403, throttling and transient portal errors are worth retrying
+    __auth_status_codes = frozenset({401, 403})
+    __retry_status_codes = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, username: str, password: str, pool_maxsize: int = 10,
+                 cache: Optional[SmartmeterResponseCache] = None, max_retries: int = 3,
+                 backoff_factor: float = 0.5, max_backoff: float = 30.0,
+                 rate_limiter: Optional[SmartmeterRateLimiter] = None,
+                 concurrency: Optional[SmartmeterConcurrencyController] = None,
+                 memo: Optional[SmartmeterMemo] = None, local_aggregation: bool = False,
+                 lazy_results: bool = False, base_url: Optional[str] = None,
+                 observers: Iterable[SmartmeterObserver] = (),
+                 metering_points_ttl: timedelta = timedelta(0),
+                 coverage: Optional[SmartmeterCoverageIndex] = None):
+        if max_retries < 0:
+            raise ValueError('max_retries must not be negative')
         self.__username = username
         self.__password = password
+        self.__cache = cache
+        self.__max_retries = max_retries
+        self.__backoff_factor = backoff_factor
+        self.__max_backoff = max_backoff
+        self.__rate_limiter = rate_limiter
+        self.__concurrency = concurrency
+        self.__memo = memo
+        self.__local_aggregation = local_aggregation
+        # lazy results decode a field on its first access
+        self.__lazy_results = lazy_results
+        self.__observers = list(observers)
+        self.__coverage = coverage
+        # metering points per account id with a fingerprint of the account data they were discovered with
+        self.__topology: Optional[Dict[str, Tuple[str, List[SmartmeterMeteringPoint]]]] = None
+        self.__topology_ttl = metering_points_ttl.total_seconds()
+        self.__topology_expires = 0.0
+        self.__topology_lock = threading.Lock()
+        if base_url is not None:
+            # e.g. a proxy or the local stand-in of the benchmarks
+            self.__domain = base_url.rstrip('/')
         self.__session = Session()
         self.__session.headers.update({'User-Agent': self.__user_agent})
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        self.__session.mount('https://', adapter)
+        self.__session.mount('http://', adapter)
 
     def do_login(self):
         resp = self.__session.post(f'{self.__domain}/orchestration/Authentication/Login',
@@ -44,38 +105,95 @@ class NetzNoeSmartmeterPortalApi:
             raise NetzNoeSmartmeterPortalAuthError('Logout of Smartmeter-Portal failed')
 
     def get_day_per_energy_community(self, meter_id: str, day: date) -> Dict[str, SmartmeterResult]:
-        resp = self.__session.get(f'{self.__domain}/orchestration/ConsumptionRecord/Day',
-                                  params={'meterId': meter_id, 'day': day.strftime('%Y-%-m-%-d')})
-        if resp.status_code != 200:
-            raise NetzNoeSmartmeterPortalDataError('Fetching daily data failed')
+        return self.__fetch_consumption_record(
+            'Day', {'meterId': meter_id, 'day': day.strftime('%Y-%-m-%-d')}, period_end=day,
+            error_message='Fetching daily data failed',
+            parse=lambda data: self.__covered(meter_id, self.__parse_day(day, data), SmartmeterResolution.QUARTER_HOUR,
+                                              day, day)
+        )
 
+    def __parse_day(self, day: date, data: Any) -> Dict[str, SmartmeterResult]:
         base_time = datetime(day.year, day.month, day.day, hour=0, minute=15,
                              tzinfo=ZoneInfo('Europe/Vienna')).astimezone(ZoneInfo('UTC'))
         return dict(map(
             lambda e: (
                 e.get('ec_id') if e.get('ec_id') else 'total',
-                self.__to_smartmeter_result(base_time, e, time_increase={'minutes': 15})
-            ), resp.json()
+                to_smartmeter_result(base_time, e, time_increase={'minutes': 15}, lazy=self.__lazy_results)
+            ), data
         ))
 
+    def iter_day_per_energy_community(self, meter_id: str, day: date) -> Iterator[Tuple[str, SmartmeterResult]]:
+        base_time = datetime(day.year, day.month, day.day, hour=0, minute=15,
+                             tzinfo=ZoneInfo('Europe/Vienna')).astimezone(ZoneInfo('UTC'))
+        return self.__stream_consumption_record(
+            'Day', {'meterId': meter_id, 'day': day.strftime('%Y-%-m-%-d')},
+            error_message='Fetching daily data failed',
+            parse_entry=lambda e: (
+                e.get('ec_id') if e.get('ec_id') else 'total',
+                to_smartmeter_result(base_time, e, time_increase={'minutes': 15}, lazy=self.__lazy_results)
+            )
+        )
+
     def get_day(self, meter_id: str, day: date) -> SmartmeterResult:
         return self.get_day_per_energy_community(meter_id, day)['total']
 
+    def iter_days(self, meter_id: str, start_date: date, end_date: date,
+                  prefetch: int = 0) -> Iterator[Tuple[date, SmartmeterResult]]:
+        # lazily yields the 15min values day by day, with prefetch > 0 the next days are fetched in the background
+        # while the caller processes the current one
+        days = _date_range(start_date, end_date)
+        if prefetch <= 0:
+            for day in days:
+                yield day, self.get_day(meter_id, day)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        pending: Deque[Tuple[date, Future]] = deque()
+        try:
+            for day in days:
+                pending.append((day, executor.submit(self.get_day, meter_id, day)))
+                if len(pending) > prefetch:
+                    next_day, result = pending.popleft()
+                    yield next_day, result.result()
+            while pending:
+                next_day, result = pending.popleft()
+                yield next_day, result.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def get_week_per_energy_community(self, meter_id: str,
                                       start_date: date, end_date: date) -> Dict[str, SmartmeterResult]:
-        params: Dict[str, str] = {'meterId': meter_id, 'startDate': start_date.strftime('%Y-%-m-%-d'),
-                                  'endDate': end_date.strftime('%Y-%-m-%-d')}
-        resp = self.__session.get(f'{self.__domain}/orchestration/ConsumptionRecord/Week', params=params)
-        if resp.status_code != 200:
-            raise NetzNoeSmartmeterPortalDataError('Fetching weekly data failed')
+        params: Dict[str, Union[str, int]] = {'meterId': meter_id,
+                                              'startDate': start_date.strftime('%Y-%-m-%-d'),
+                                              'endDate': end_date.strftime('%Y-%-m-%-d')}
+        fetched = self.__aggregate_fetched_days(meter_id, start_date, end_date)
+        if fetched is not None:
+            return self.__covered(meter_id, fetched, SmartmeterResolution.DAY, start_date, end_date)
 
         base_time = date(start_date.year, start_date.month, start_date.day)
-        return dict(map(
-            lambda e: (
+        return self.__fetch_consumption_record(
+            'Week', params, period_end=end_date, error_message='Fetching weekly data failed',
+            parse=lambda data: self.__covered(meter_id, dict(map(
+                lambda e: (
+                    e.get('ec_id') if e.get('ec_id') else 'total',
+                    to_smartmeter_result(base_time, e, time_increase={'days': 1}, lazy=self.__lazy_results)
+                ), data
+            )), SmartmeterResolution.DAY, start_date, end_date)
+        )
+
+    def iter_week_per_energy_community(self, meter_id: str,
+                                       start_date: date, end_date: date) -> Iterator[Tuple[str, SmartmeterResult]]:
+        params: Dict[str, Union[str, int]] = {'meterId': meter_id,
+                                              'startDate': start_date.strftime('%Y-%-m-%-d'),
+                                              'endDate': end_date.strftime('%Y-%-m-%-d')}
+        base_time = date(start_date.year, start_date.month, start_date.day)
+        return self.__stream_consumption_record(
+            'Week', params, error_message='Fetching weekly data failed',
+            parse_entry=lambda e: (
                 e.get('ec_id') if e.get('ec_id') else 'total',
-                self.__to_smartmeter_result(base_time, e, time_increase={'days': 1})
-            ), resp.json()
-        ))
+                to_smartmeter_result(base_time, e, time_increase={'days': 1}, lazy=self.__lazy_results)
+            )
+        )
 
     def get_week(self, meter_id: str, start_date: date, end_date: date) -> SmartmeterResult:
         return self.get_week_per_energy_community(meter_id, start_date, end_date)['total']
@@ -84,17 +202,36 @@ class NetzNoeSmartmeterPortalApi:
         if not 2000 <= year <= 2999 or not 1 <= month <= 12:
             raise ValueError('year or month not in valid range')
         params: Dict[str, Union[str, int]] = {'meterId': meter_id, 'year': year, 'month': month}
-        resp = self.__session.get(f'{self.__domain}/orchestration/ConsumptionRecord/Month', params=params)
-        if resp.status_code != 200:
-            raise NetzNoeSmartmeterPortalDataError('Fetching monthly data failed')
+        first_day, last_day = date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+        fetched = self.__aggregate_fetched_days(meter_id, first_day, last_day)
+        if fetched is not None:
+            return self.__covered(meter_id, fetched, SmartmeterResolution.DAY, first_day, last_day)
 
         base_time = date(year, month, 1)
-        return dict(map(
-            lambda e: (
+        return self.__fetch_consumption_record(
+            'Month', params, period_end=last_day,
+            error_message='Fetching monthly data failed',
+            parse=lambda data: self.__covered(meter_id, dict(map(
+                lambda e: (
+                    e.get('ec_id') if e.get('ec_id') else 'total',
+                    to_smartmeter_result(base_time, e, time_increase={'days': 1}, lazy=self.__lazy_results)
+                ), data
+            )), SmartmeterResolution.DAY, first_day, last_day)
+        )
+
+    def iter_month_per_energy_community(self, meter_id: str,
+                                        year: int, month: int) -> Iterator[Tuple[str, SmartmeterResult]]:
+        if not 2000 <= year <= 2999 or not 1 <= month <= 12:
+            raise ValueError('year or month not in valid range')
+        params: Dict[str, Union[str, int]] = {'meterId': meter_id, 'year': year, 'month': month}
+        base_time = date(year, month, 1)
+        return self.__stream_consumption_record(
+            'Month', params, error_message='Fetching monthly data failed',
+            parse_entry=lambda e: (
                 e.get('ec_id') if e.get('ec_id') else 'total',
-                self.__to_smartmeter_result(base_time, e, time_increase={'days': 1})
-            ), resp.json()
-        ))
+                to_smartmeter_result(base_time, e, time_increase={'days': 1}, lazy=self.__lazy_results)
+            )
+        )
 
     def get_month(self, meter_id: str, year: int, month: int) -> SmartmeterResult:
         return self.get_month_per_energy_community(meter_id, year, month)['total']
@@ -103,127 +240,425 @@ class NetzNoeSmartmeterPortalApi:
         if not 2000 <= year <= 2999:
             raise ValueError('year not in valid range')
         params: Dict[str, Union[str, int]] = {'meterId': meter_id, 'year': year}
-        resp = self.__session.get(f'{self.__domain}/orchestration/ConsumptionRecord/Year', params=params)
-        if resp.status_code != 200:
-            raise NetzNoeSmartmeterPortalDataError('Fetching yearly data failed')
+        base_time = date(year, 1, 1)
+        return self.__fetch_consumption_record(
+            'Year', params, period_end=date(year, 12, 31), error_message='Fetching yearly data failed',
+            parse=lambda data: dict(map(
+                lambda e: (
+                    e.get('ec_id') if e.get('ec_id') else 'total',
+                    to_smartmeter_result_yearly(base_time, e, time_increase={'months': 1}, lazy=self.__lazy_results)
+                ), data
+            ))
+        )
 
+    def iter_year_per_energy_community(self, meter_id: str, year: int) -> Iterator[Tuple[str, SmartmeterResultYearly]]:
+        if not 2000 <= year <= 2999:
+            raise ValueError('year not in valid range')
+        params: Dict[str, Union[str, int]] = {'meterId': meter_id, 'year': year}
         base_time = date(year, 1, 1)
-        return dict(map(
-            lambda e: (
+        return self.__stream_consumption_record(
+            'Year', params, error_message='Fetching yearly data failed',
+            parse_entry=lambda e: (
                 e.get('ec_id') if e.get('ec_id') else 'total',
-                self.__to_smartmeter_result_yearly(base_time, e, time_increase={'months': 1})
-            ), resp.json()
-        ))
+                to_smartmeter_result_yearly(base_time, e, time_increase={'months': 1}, lazy=self.__lazy_results)
+            )
+        )
 
     def get_year(self, meter_id: str, year: int) -> SmartmeterResultYearly:
         return self.get_year_per_energy_community(meter_id, year)['total']
 
-    def get_metering_points(self) -> List[SmartmeterMeteringPoint]:
-        account_ids = self._get_account_ids()
-        return list(itertools.chain.from_iterable(
-            map(lambda account_id: self._get_metering_point_by_account_id(account_id), account_ids)
-        ))
+    def get_range(self, meter_id: str, start_date: date, end_date: date,
+                  resolution: SmartmeterResolution = SmartmeterResolution.DAY,
+                  max_workers: int = 4) -> Union[SmartmeterResult, SmartmeterResultYearly]:
+        calls = self._plan_range(start_date, end_date, resolution)
+        results = self.__execute_calls(meter_id, calls, max_workers)
+
+        first_day = start_date.replace(day=1) if resolution == SmartmeterResolution.MONTH else start_date
+        return _concat_results([_slice_result(result, first_day, end_date) for result in results])
+
+    def plan_repair(self, meter_id: str, start_date: date, end_date: date,
+                    resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR
+                    ) -> List[Tuple[str, date, date]]:
+        # returns the fewest (endpoint, start, end) calls refetching every day of the range the coverage index does not
+        # know as complete: Day calls for 15min values, Week/Month calls for daily values
+        if self.__coverage is None:
+            raise ValueError('plan_repair requires a coverage index')
+        days = self.__coverage.incomplete_days(meter_id, start_date, end_date, resolution)
+        # plans[n] covers the first n incomplete days, the last call of a plan covers days[first:n] if _plan_range
+        # fetches them with a single call
+        plans: List[List[Tuple[str, date, date]]] = [[]]
+        for last in range(len(days)):
+            best: Optional[List[Tuple[str, date, date]]] = None
+            for first in range(last, -1, -1):
+                calls = self._plan_range(days[first], days[last], resolution)
+                if len(calls) > 1:
+                    # wider spans need more calls as well
+                    break
+                if best is None or len(plans[first]) + 1 < len(best):
+                    best = plans[first] + [(calls[0][0], days[first], days[last])]
+            plans.append(best or [])
+        return plans[-1]
+
+    def repair_range(self, meter_id: str, start_date: date, end_date: date,
+                     resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR,
+                     max_workers: int = 4
+                     ) -> Dict[Tuple[str, date, date], Union[SmartmeterResult, SmartmeterResultYearly]]:
+        # executes plan_repair, returns the values of the days each call was planned for. Non-final responses of the
+        # response cache and the memo are reused until they expire.
+        calls = self.plan_repair(meter_id, start_date, end_date, resolution)
+        results = self.__execute_calls(meter_id, calls, max_workers)
+        return {call: _slice_result(result, call[1], call[2]) for call, result in zip(calls, results)}
+
+    def __execute_calls(self, meter_id: str, calls: List[Tuple[str, date, date]],
+                        max_workers: int) -> List[Union[SmartmeterResult, SmartmeterResultYearly]]:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda call: self._fetch_call(meter_id, call), calls))
+
+    def _fetch_call(self, meter_id: str,
+                    call: Tuple[str, date, date]) -> Union[SmartmeterResult, SmartmeterResultYearly]:
+        # fetches one (endpoint, start, end) call of _plan_range or plan_repair, the result covers the whole period of
+        # the endpoint
+        endpoint, start, end = call
+        fetchers: Dict[str, Callable[[], Union[SmartmeterResult, SmartmeterResultYearly]]] = {
+            'Day': lambda: self.get_day(meter_id, start),
+            'Week': lambda: self.get_week(meter_id, start, end),
+            'Month': lambda: self.get_month(meter_id, start.year, start.month),
+            'Year': lambda: self.get_year(meter_id, start.year),
+        }
+        return fetchers[endpoint]()
+
+    def __covered(self, meter_id: str, per_energy_community: Dict[str, SmartmeterResult],
+                  resolution: SmartmeterResolution, start_date: date, end_date: date) -> Dict[str, SmartmeterResult]:
+        # records the total of a fetched period in the coverage index
+        if self.__coverage is not None and 'total' in per_energy_community:
+            self.__coverage.record(meter_id, per_energy_community['total'], resolution, start_date, end_date)
+        return per_energy_community
+
+    @staticmethod
+    def _plan_range(start_date: date, end_date: date,
+                    resolution: SmartmeterResolution) -> List[Tuple[str, date, date]]:
+        # returns the cheapest list of (endpoint, start, end) calls covering the range in the requested resolution
+        if start_date > end_date:
+            raise ValueError('start_date must not be after end_date')
+
+        calls: List[Tuple[str, date, date]] = []
+        current = start_date
+        while current <= end_date:
+            if resolution == SmartmeterResolution.QUARTER_HOUR:
+                calls.append(('Day', current, current))
+                next_start = current + timedelta(days=1)
+            elif resolution == SmartmeterResolution.DAY:
+                month_end = current.replace(day=calendar.monthrange(current.year, current.month)[1])
+                if (end_date - current).days < 7:
+                    # one week call also covers short ranges spanning the turn of a month
+                    calls.append(('Week', current, end_date))
+                    next_start = end_date + timedelta(days=1)
+                else:
+                    calls.append(('Month', current, min(month_end, end_date)))
+                    next_start = month_end + timedelta(days=1)
+            elif resolution == SmartmeterResolution.MONTH:
+                year_end = date(current.year, 12, 31)
+                calls.append(('Year', current, min(year_end, end_date)))
+                next_start = year_end + timedelta(days=1)
+            else:
+                raise ValueError('Unsupported resolution')
+            current = next_start
+        return calls
+
+    def __aggregate_fetched_days(self, meter_id: str, start_date: date,
+                                 end_date: date) -> Optional[Dict[str, SmartmeterResult]]:
+        # with local_aggregation daily values are summed up from 15min values of the memo or the response cache,
+        # if they cover every day of the period
+        if not self.__local_aggregation:
+            return None
+        days = []
+        for day in _date_range(start_date, end_date):
+            period = f"day={day.strftime('%Y-%-m-%-d')}"
+            per_energy_community = self.__memo.peek(('Day', meter_id, period)) if self.__memo is not None else None
+            if per_energy_community is None and self.__cache is not None:
+                body = self.__cache.get('Day', meter_id, period)
+                per_energy_community = self.__parse_day(day, json.loads(body)) if body is not None else None
+            if per_energy_community is None:
+                return None
+            days.append(per_energy_community)
+
+        names = [name for name in days[0] if all(name in day for day in days)]
+        return {name: aggregate([day[name] for day in days], SmartmeterResolution.DAY) for name in names}
+
+    def __fetch_consumption_record(self, endpoint: str, params: Dict[str, Union[str, int]], period_end: date,
+                                   error_message: str, parse: Callable[[Any], Dict[str, Any]]) -> Any:
+        meter_id = str(params['meterId'])
+        period = '&'.join(f'{key}={value}' for key, value in params.items() if key != 'meterId')
+
+        def load_and_parse() -> Dict[str, Any]:
+            with self.__observe(f'ConsumptionRecord/{endpoint}', meter_id) as event:
+                data = self.__load_consumption_record(endpoint, meter_id, period, params, period_end, error_message,
+                                                      event)
+                return self.__parse_observed(event, data, parse)
+
+        if self.__memo is None:
+            return load_and_parse()
+        # callers get their own dict, the parsed results in it are shared
+        return dict(self.__memo.get_or_compute((endpoint, meter_id, period), load_and_parse))
+
+    def __load_consumption_record(self, endpoint: str, meter_id: str, period: str, params: Dict[str, Union[str, int]],
+                                  period_end: date, error_message: str, event: SmartmeterRequestEvent) -> Any:
+        if self.__cache is not None:
+            body = self.__cache.get(endpoint, meter_id, period)
+            if body is not None:
+                event.cached = True
+                event.bytes = len(body)
+                return json.loads(body)
+
+        resp = self.__get(f'ConsumptionRecord/{endpoint}', params, error_message, event=event)
+        data = resp.json()
+
+        if self.__cache is not None:
+            # finalized periods of the past never change again
+            immutable = period_end < datetime.now(ZoneInfo('Europe/Vienna')).date() and is_final(data)
+            self.__cache.put(endpoint, meter_id, period, resp.text, immutable=immutable)
+        return data
+
+    def __stream_consumption_record(self, endpoint: str, params: Dict[str, Union[str, int]], error_message: str,
+                                    parse_entry: Callable[[Any], ParsedEntry]) -> Iterator[ParsedEntry]:
+        # streamed responses are decoded incrementally and bypass the response cache. The request is sent on the first
+        # next(), the response is released and the event emitted once the stream is consumed, fails or is closed.
+        event = SmartmeterRequestEvent(endpoint=f'ConsumptionRecord/{endpoint}', meter_id=str(params['meterId']))
+        error: Optional[Exception] = None
+        try:
+            resp = self.__get(f'ConsumptionRecord/{endpoint}', params, error_message, stream=True, event=event)
+            with resp:
+                # reading the body counts as HTTP latency, not as parse time
+                chunks = resp.iter_content(chunk_size=self.__stream_chunk_size)
+
+                def timed_chunks() -> Iterator[bytes]:
+                    while True:
+                        started = time.perf_counter()
+                        chunk = next(chunks, None)
+                        event.latency += time.perf_counter() - started
+                        if chunk is None:
+                            return
+                        event.bytes += len(chunk)
+                        yield chunk
+
+                started, read = time.perf_counter(), event.latency
+                for entry in iter_json_array(timed_chunks()):
+                    parsed = parse_entry(entry)
+                    event.parse_duration += time.perf_counter() - started - (event.latency - read)
+                    if self.__observers:
+                        event.values += count_values([entry])
+                    yield parsed
+                    started, read = time.perf_counter(), event.latency
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.__emit(event, error)
+
+    @contextmanager
+    def __observe(self, endpoint: str, meter_id: Optional[str]) -> Iterator[SmartmeterRequestEvent]:
+        # collects the event of one endpoint call and passes it to the observers, also if the call fails
+        event = SmartmeterRequestEvent(endpoint=endpoint, meter_id=meter_id)
+        try:
+            yield event
+        except Exception as e:
+            self.__emit(event, e)
+            raise
+        self.__emit(event)
+
+    def __emit(self, event: SmartmeterRequestEvent, error: Optional[Exception] = None) -> None:
+        if error is not None:
+            event.error = type(error).__name__
+        for observer in self.__observers:
+            observer.on_request(event)
+
+    def __parse_observed(self, event: SmartmeterRequestEvent, data: Any, parse: Callable[[Any], Parsed],
+                         count: Callable[[Any], int] = count_values) -> Parsed:
+        started = time.perf_counter()
+        parsed = parse(data)
+        event.parse_duration = time.perf_counter() - started
+        if self.__observers:
+            # counting is a separate pass over the response, only done if someone is listening
+            event.values = count(data)
+        return parsed
+
+    def __get(self, path: str, params: Dict[str, Union[str, int]], error_message: str,
+              stream: bool = False, event: Optional[SmartmeterRequestEvent] = None) -> Response:
+        # all portal GETs are idempotent: an expired session is renewed once, connection errors and transient
+        # statuses are retried with jittered exponential backoff (or as long as the portal asks via Retry-After)
+        attempt = 0
+        logged_in = False
+        while True:
+            if event is not None:
+                event.retries = attempt + int(logged_in)
+            try:
+                resp = self.__throttled_get(path, params, stream, event)
+            except (ConnectionError, Timeout):
+                if attempt >= self.__max_retries:
+                    raise
+                self.__wait_before_retry(attempt, None)
+                attempt += 1
+                continue
+            if event is not None:
+                event.status = resp.status_code
+            if resp.status_code == 200:
+                if event is not None and not stream:
+                    event.bytes = len(resp.content)
+                return resp
+
+            resp.close()
+            if resp.status_code in self.__auth_status_codes and not logged_in:
+                logged_in = True
+                self.do_login()
+            elif resp.status_code in self.__retry_status_codes and attempt < self.__max_retries:
+                self.__wait_before_retry(attempt, resp.headers.get('Retry-After'))
+                attempt += 1
+            else:
+                raise NetzNoeSmartmeterPortalDataError(error_message)
+
+    def __throttled_get(self, path: str, params: Dict[str, Union[str, int]], stream: bool,
+                        event: Optional[SmartmeterRequestEvent]) -> Response:
+        # waiting for the rate limiter or a concurrency slot does not count as latency
+        if self.__rate_limiter is not None:
+            self.__rate_limiter.acquire()
+        if self.__concurrency is not None:
+            self.__concurrency.acquire()
+        started = time.perf_counter()
+        congested = True
+        try:
+            resp = self.__session.get(f'{self.__domain}/orchestration/{path}', params=params, stream=stream)
+            congested = resp.status_code in self.__retry_status_codes
+            return resp
+        finally:
+            latency = time.perf_counter() - started
+            if event is not None:
+                event.latency += latency
+            if self.__concurrency is not None:
+                self.__concurrency.release(latency, congested=congested)
+
+    def __wait_before_retry(self, attempt: int, retry_after: Optional[str]) -> None:
+        delay = _retry_after_seconds(retry_after)
+        if delay is None:
+            delay = min(self.__max_backoff, self.__backoff_factor * 2 ** attempt) * random.uniform(0.5, 1.0)
+        time.sleep(delay)
+
+    def get_metering_points(self, max_workers: int = 8) -> List[SmartmeterMeteringPoint]:
+        # the metering points of all accounts are queried concurrently, the discovered topology is kept for
+        # metering_points_ttl
+        if self.__memo is not None:
+            return list(self.__memo.get_or_compute(('MeteringPoints', self.__username),
+                                                   lambda: self.__get_metering_points(max_workers)))
+        return self.__get_metering_points(max_workers)
+
+    def refresh_metering_points(self, max_workers: int = 8) -> List[SmartmeterMeteringPoint]:
+        # re-reads the accounts and only queries the metering points of accounts which are new or whose account data
+        # changed since the last discovery, metering points of removed accounts are dropped
+        if self.__memo is not None:
+            self.__memo.invalidate(('MeteringPoints', self.__username))
+        return self.__discover_metering_points(max_workers, incremental=True)
+
+    def __get_metering_points(self, max_workers: int) -> List[SmartmeterMeteringPoint]:
+        with self.__topology_lock:
+            if self.__topology is not None and time.monotonic() < self.__topology_expires:
+                return _flatten_topology(self.__topology)
+        return self.__discover_metering_points(max_workers, incremental=False)
+
+    def __discover_metering_points(self, max_workers: int, incremental: bool) -> List[SmartmeterMeteringPoint]:
+        accounts = self._get_accounts()
+        with self.__topology_lock:
+            known = dict(self.__topology or {}) if incremental else {}
+        stale = [account_id for account_id, fingerprint in accounts.items()
+                 if account_id not in known or known[account_id][0] != fingerprint]
+
+        if len(stale) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(stale))) as executor:
+                fetched = dict(zip(stale, executor.map(self._get_metering_point_by_account_id, stale)))
+        else:
+            fetched = {account_id: self._get_metering_point_by_account_id(account_id) for account_id in stale}
+
+        topology = {
+            account_id: (fingerprint, fetched[account_id] if account_id in fetched else known[account_id][1])
+            for account_id, fingerprint in accounts.items()
+        }
+        with self.__topology_lock:
+            self.__topology = topology
+            self.__topology_expires = time.monotonic() + self.__topology_ttl
+        return _flatten_topology(topology)
 
     def _get_account_ids(self) -> List[str]:
-        params: Dict[str, int] = {'context': 2}
-        resp = self.__session.get(f'{self.__domain}/orchestration/User/GetAccountIdByBussinespartnerId', params=params)
-        if resp.status_code != 200:
-            raise NetzNoeSmartmeterPortalDataError('Fetching account id data failed')
-        return list(filter(None, map(lambda account: account.get('accountId'), resp.json())))
+        return list(self._get_accounts())
+
+    def _get_accounts(self) -> Dict[str, str]:
+        # account ids with a fingerprint of their account data, which changes e.g. with hasSmartMeter or hasActive
+        params: Dict[str, Union[str, int]] = {'context': 2}
+        with self.__observe('User/GetAccountIdByBussinespartnerId', None) as event:
+            resp = self.__get('User/GetAccountIdByBussinespartnerId', params, 'Fetching account id data failed',
+                              event=event)
+            return self.__parse_observed(event, resp.json(), lambda data: {
+                account['accountId']: json.dumps(account, sort_keys=True)
+                for account in data if account.get('accountId')
+            }, count=len)
 
     def _get_metering_point_by_account_id(self, account_id: str) -> List[SmartmeterMeteringPoint]:
         account_params: Dict[str, Union[str, int]] = {'accountId': account_id, 'context': 2}
-        resp = self.__session.get(f'{self.__domain}/orchestration/User/GetMeteringPointByAccountId',
-                                  params=account_params)
-        if resp.status_code != 200:
-            raise NetzNoeSmartmeterPortalDataError(
-                'Fetching metering point for account id "%s" failed', account_id
-            )
-        return list(map(lambda meter: SmartmeterMeteringPoint(
-            account_id=account_id,
-            metering_point_id=meter.get('meteringPointId'),
-            type_of_relation=meter.get('typeOfRelation'),
-            energy_communities=list(map(lambda ec: SmartmeterEnergyCommunity(
-                id=ec.get('ecid'),
-                name=ec.get('name')
-            ), meter.get('energyCommunities', [])))
-        ), resp.json()))
-
-    def __get_values(self, data: dict, field: str, base_time: Union[date, datetime],
-                     time_increase: Dict[str, int]
-                     ) -> List[Tuple[Union[date, datetime], Union[float, SmartmeterDataQuality]]]:
-        results: List[Tuple[Union[date, datetime], Union[float, SmartmeterDataQuality]]] = []
-        for value in data.get(field, []):
-            if value is not None:
-                converted_time = base_time
-                if isinstance(converted_time, datetime):
-                    converted_time = converted_time.astimezone(ZoneInfo('Europe/Vienna'))
-                if value in ('L1', 'L2', 'L3'):
-                    results.append((converted_time, SmartmeterDataQuality(value)))
-                else:
-                    results.append((converted_time, value))
-
-            # increase base_time for next value
-            base_time = self._calc_next_datetime(base_time, time_increase)
-        return results
-
-    @staticmethod
-    def __process_peak_demand(data: dict, field: str) -> List[Tuple[datetime, Union[float, SmartmeterDataQuality]]]:
-        results: List[Tuple[datetime, Union[float, SmartmeterDataQuality]]] = []
-        for cnt, value in enumerate(data.get(field, [])):
-            if value is not None:
-                timestamp = datetime.strptime(
-                    data['peakDemandTimes'][cnt], '%Y-%m-%dT%H:%M:%S'
-                ).replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo('Europe/Vienna'))
-
-                if value in ('L1', 'L2', 'L3'):
-                    results.append((timestamp, SmartmeterDataQuality(value)))
-                else:
-                    results.append((timestamp, value))
-        return results
+        with self.__observe('User/GetMeteringPointByAccountId', None) as event:
+            resp = self.__get('User/GetMeteringPointByAccountId', account_params,
+                              f'Fetching metering point for account id "{account_id}" failed', event=event)
+            return self.__parse_observed(event, resp.json(), lambda data: list(map(
+                lambda meter: SmartmeterMeteringPoint(
+                    account_id=account_id,
+                    metering_point_id=meter.get('meteringPointId'),
+                    type_of_relation=meter.get('typeOfRelation'),
+                    energy_communities=list(map(lambda ec: SmartmeterEnergyCommunity(
+                        id=ec.get('ecid'),
+                        name=ec.get('name')
+                    ), meter.get('energyCommunities', [])))
+                ), data
+            )), count=len)
 
     def _calc_next_datetime(self, current_time: Union[date, datetime],
                             time_increase: Dict[str, int]) -> Union[date, datetime]:
-        if 'months' in time_increase and isinstance(current_time, date):
-            next_month = current_time.month + time_increase['months']
-            next_year = current_time.year + int(next_month / 12) if next_month > 12 else current_time.year
-            next_month = 12 if next_month % 12 == 0 else next_month % 12
-            return date(next_year, next_month, current_time.day)
-        elif 'days' in time_increase or 'minutes' in time_increase:
-            return current_time + timedelta(**time_increase)
-        else:
-            raise ValueError('Unsupported time_increase interval')
-
-    @no_type_check
-    def __to_smartmeter_result(self, base_time: Union[date, datetime], data: dict,
-                               time_increase: dict) -> SmartmeterResult:
-        return SmartmeterResult(
-            metered=self.__get_values(data, 'meteredValues', base_time, time_increase),
-            estimated=self.__get_values(data, 'estimatedValues', base_time, time_increase),
-            estimated_qualities=self.__get_values(data, 'estimatedQualities', base_time, time_increase),
-            grid_usage_leftover=self.__get_values(data, 'gridUsageLeftoverValues', base_time, time_increase),
-            quality_ec=self.__get_values(data, 'qualityEC', base_time, time_increase),
-            self_coverage=self.__get_values(data, 'selfCoverageValues', base_time, time_increase),
-            joint_tenancy_proportion=self.__get_values(data, 'jointTenancyProportionValues', base_time, time_increase),
-            metered_peak_demands=self.__process_peak_demand(data, 'meteredPeakDemands'),
-            estimated_peak_demands=self.__process_peak_demand(data, 'estimatedPeakDemands'),
-            peak_demand_data_qualities=self.__process_peak_demand(data, 'peakDemandDataQualities'),
-            self_coverage_renewable_energy=self.__get_values(data, 'selfCoverageRenewableEnergyValue',
-                                                             base_time, time_increase),
-            blind_consumption=self.__get_values(data, 'blindConsumptionValue', base_time, time_increase),
-            blind_power_feed=self.__get_values(data, 'blindPowerFeedValue', base_time, time_increase)
-        )
-
-    @no_type_check
-    def __to_smartmeter_result_yearly(self, base_time: date, data: dict, time_increase: dict) -> SmartmeterResultYearly:
-        return SmartmeterResultYearly(
-            values=self.__get_values(data, 'values', base_time, time_increase),
-            grid_usage_leftover=self.__get_values(data, 'gridUsageLeftoverValues', base_time, time_increase),
-            blind_consumption=self.__get_values(data, 'blindConsumptionValue', base_time, time_increase),
-            blind_power_feed=self.__get_values(data, 'blindPowerFeedValue', base_time, time_increase),
-            self_coverage=self.__get_values(data, 'selfCoverageValues', base_time, time_increase),
-            joint_tenancy_proportion=self.__get_values(data, 'jointTenancyProportionValues', base_time, time_increase),
-            self_coverage_renewable_energy=self.__get_values(data, 'selfCoverageRenewableEnergyValue',
-                                                             base_time, time_increase),
-            peak_demands=self.__process_peak_demand(data, 'peakDemands'),
-        )
+        return calc_next_datetime(current_time, time_increase)
+
+
+def _flatten_topology(topology: Dict[str, Tuple[str, List[SmartmeterMeteringPoint]]]
+                      ) -> List[SmartmeterMeteringPoint]:
+    return list(itertools.chain.from_iterable(points for _, points in topology.values()))
+
+
+def _retry_after_seconds(retry_after: Optional[str]) -> Optional[float]:
+    # Retry-After is either a number of seconds or an HTTP date
+    if not retry_after:
+        return None
+    if retry_after.strip().isdigit():
+        return float(retry_after)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _date_range(start_date: date, end_date: date) -> List[date]:
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date')
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def _slice_result(result: Union[SmartmeterResult, SmartmeterResultYearly],
+                  start_date: date, end_date: date) -> Union[SmartmeterResult, SmartmeterResultYearly]:
+    # keeps all values whose day (see day_of) lies within start_date and end_date
+    return type(result)(**{
+        field.name: [entry for entry in getattr(result, field.name) if start_date <= day_of(entry[0]) <= end_date]
+        for field in fields(result)
+    })
+
+
+def _concat_results(results: List[Union[SmartmeterResult, SmartmeterResultYearly]]
+                    ) -> Union[SmartmeterResult, SmartmeterResultYearly]:
+    return type(results[0])(**{
+        field.name: list(itertools.chain.from_iterable(getattr(result, field.name) for result in results))
+        for field in fields(results[0])
+    })
@@ -0,0 +1,163 @@
+import math
+import mmap
+import os
+import struct
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from .models import QUALITY_FIELDS, SmartmeterResult, day_start
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+_MAGIC = b'NNSMARC1'
+# magic, array typecode, epoch of the first slot (unix seconds, UTC), slot length in seconds
+_HEADER = struct.Struct('<8s1s7xqq')
+EPOCH = int(datetime(2000, 1, 1, tzinfo=ZoneInfo('UTC')).timestamp())
+SLOT_SECONDS = 15 * 60
+
+
+def _typecode(field: str) -> str:
+    return 'B' if field in QUALITY_FIELDS else 'd'
+
+
+def _fill(typecode: str, length: int) -> bytes:
+    # gaps are NaN for values and 0 for qualities, like in SmartmeterColumnarResult
+    return (array('d', [math.nan]) * length).tobytes() if typecode == 'd' else bytes(length)
+
+
+def _slot(timestamp: int) -> int:
+    # 15min timestamps mark the end of their interval, slot n covers EPOCH + n * 15min to EPOCH + (n + 1) * 15min
+    offset = timestamp - EPOCH - SLOT_SECONDS
+    if offset < 0 or offset % SLOT_SECONDS:
+        raise ValueError('Timestamp is not on the 15min slot grid')
+    return offset // SLOT_SECONDS
+
+
+def _slots_of_days(start_date: date, end_date: date) -> Tuple[int, int]:
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date')
+    # the first slot of a day ends at 00:15
+    start, end = day_start(start_date), day_start(end_date + timedelta(days=1))
+    return _slot(start + SLOT_SECONDS), _slot(end + SLOT_SECONDS)
+
+
+class SmartmeterArchive:
+    # Fixed-width binary archive of 15min values, one file per meter and field (<path>/<meter_id>/<field>.bin). After
+    # a 32 byte header every slot of the 15min grid since EPOCH has a fixed position (float64 values, NaN for gaps,
+    # uint8 quality codes, 0 for gaps, see QUALITY_CODES), so a period is located without any index and read through
+    # mmap without copying. Reading into numpy arrays requires numpy.
+
+    def __init__(self, path: Union[str, Path]):
+        self.__path = Path(path)
+        self.__maps: Dict[Path, mmap.mmap] = {}
+
+    def write(self, meter_id: str, results: Iterable[SmartmeterResult]) -> None:
+        # stores all slots covered by the results, re-written slots replace the archived values
+        for result in results:
+            columnar = result.to_columnar()
+            if not isinstance(result, SmartmeterResult) or columnar.is_date:
+                raise ValueError('Only 15min results can be archived')
+            for timestamps, columns in ((columnar.timestamps, {**columnar.values, **columnar.qualities}),
+                                        (columnar.peak_demand_timestamps,
+                                         {**columnar.peak_demand_values, **columnar.peak_demand_qualities})):
+                if len(timestamps) == 0:
+                    continue
+                slots = [_slot(timestamp) for timestamp in timestamps]
+                for field, column in columns.items():
+                    self.__write_column(self.__file(meter_id, field), slots, column)
+
+    def slots(self, meter_id: str, field: str) -> int:
+        # number of archived slots of the field (including gaps), 0 if it was never written
+        path = self.__file(meter_id, field)
+        if not path.exists():
+            return 0
+        return (path.stat().st_size - _HEADER.size) // array(_typecode(field)).itemsize
+
+    def timestamps(self, start_date: date, end_date: date) -> Any:
+        # epoch seconds (int64) of the ends of all slots of the days start_date to end_date (inclusive)
+        if numpy is None:  # pragma: no cover
+            raise ImportError('numpy is required for SmartmeterArchive.timestamps')
+        first, last = _slots_of_days(start_date, end_date)
+        return numpy.arange(first + 1, last + 1, dtype='int64') * SLOT_SECONDS + EPOCH
+
+    def read(self, meter_id: str, field: str, start_date: date, end_date: date) -> Any:
+        # values of the days start_date to end_date (inclusive) aligned with timestamps(), as read-only view of the
+        # mapped file if the period is archived completely, otherwise as copy with gaps for missing slots
+        if numpy is None:  # pragma: no cover
+            raise ImportError('numpy is required for SmartmeterArchive.read')
+        first, last = _slots_of_days(start_date, end_date)
+        typecode = _typecode(field)
+        dtype = numpy.float64 if typecode == 'd' else numpy.uint8
+        itemsize = numpy.dtype(dtype).itemsize
+        archived = self.slots(meter_id, field)
+        if last <= archived:
+            mapped = self.__map(self.__file(meter_id, field))
+            return numpy.frombuffer(mapped, dtype=dtype, count=last - first, offset=_HEADER.size + first * itemsize)
+
+        values = numpy.frombuffer(_fill(typecode, last - first), dtype=dtype).copy()
+        if first < archived:
+            mapped = self.__map(self.__file(meter_id, field))
+            values[:archived - first] = numpy.frombuffer(mapped, dtype=dtype, count=archived - first,
+                                                         offset=_HEADER.size + first * itemsize)
+        return values
+
+    def close(self) -> None:
+        for mapped in self.__maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # still referenced by returned arrays, released together with them
+                pass
+        self.__maps.clear()
+
+    def __enter__(self) -> 'SmartmeterArchive':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __file(self, meter_id: str, field: str) -> Path:
+        return self.__path / meter_id / f'{field}.bin'
+
+    def __map(self, path: Path) -> mmap.mmap:
+        size = path.stat().st_size
+        mapped = self.__maps.get(path)
+        if mapped is None or len(mapped) != size:
+            # the file grew since it was mapped, arrays of the old mapping stay valid
+            with path.open('rb') as fp:
+                mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__maps[path] = mapped
+        return mapped
+
+    def __write_column(self, path: Path, slots: list, column: array) -> None:
+        typecode = column.typecode
+        itemsize = column.itemsize
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open('wb') as fp:
+                fp.write(_HEADER.pack(_MAGIC, typecode.encode(), EPOCH, SLOT_SECONDS))
+
+        with path.open('r+b') as fp:
+            magic, stored_typecode, epoch, slot_seconds = _HEADER.unpack(fp.read(_HEADER.size))
+            if (magic, stored_typecode, epoch, slot_seconds) != (_MAGIC, typecode.encode(), EPOCH, SLOT_SECONDS):
+                raise ValueError(f'Unsupported archive file "{path}"')
+            archived = (os.fstat(fp.fileno()).st_size - _HEADER.size) // itemsize
+            if slots[-1] >= archived:
+                # extend the file up to the last slot with gaps
+                fp.seek(0, os.SEEK_END)
+                fp.write(_fill(typecode, slots[-1] + 1 - archived))
+
+            if slots[-1] - slots[0] == len(slots) - 1:
+                # contiguous slots (e.g. a whole day) are written at once
+                fp.seek(_HEADER.size + slots[0] * itemsize)
+                fp.write(column.tobytes())
+            else:
+                for slot, value in zip(slots, column):
+                    fp.seek(_HEADER.size + slot * itemsize)
+                    fp.write(array(typecode, [value]).tobytes())
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from .api import NetzNoeSmartmeterPortalApi, _date_range
+from .instrumentation import SmartmeterObserver
+from .memo import SmartmeterMemo
+from .models import (
+    SmartmeterMeteringPoint,
+    SmartmeterResult,
+    SmartmeterResultYearly,
+)
+from .throttle import SmartmeterConcurrencyController, SmartmeterRateLimiter
+
+
+class AsyncNetzNoeSmartmeterPortalApi:
+    # Requests are executed on worker threads sharing one pooled session of the synchronous client, so parsing and
+    # authentication stay identical to NetzNoeSmartmeterPortalApi.
+
+    def __init__(self, username: str, password: str, max_concurrency: int = 8,
+                 rate_limiter: Optional[SmartmeterRateLimiter] = None,
+                 concurrency: Optional[SmartmeterConcurrencyController] = None,
+                 memo: Optional[SmartmeterMemo] = None, base_url: Optional[str] = None,
+                 observers: Iterable[SmartmeterObserver] = ()):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        self.__max_concurrency = max_concurrency
+        self.__api = NetzNoeSmartmeterPortalApi(username, password, pool_maxsize=max_concurrency,
+                                                rate_limiter=rate_limiter, concurrency=concurrency, memo=memo,
+                                                base_url=base_url, observers=observers)
+
+    async def do_login(self) -> None:
+        await asyncio.to_thread(self.__api.do_login)
+
+    async def do_logout(self) -> None:
+        await asyncio.to_thread(self.__api.do_logout)
+
+    async def get_day_per_energy_community(self, meter_id: str, day: date) -> Dict[str, SmartmeterResult]:
+        return await asyncio.to_thread(self.__api.get_day_per_energy_community, meter_id, day)
+
+    async def get_day(self, meter_id: str, day: date) -> SmartmeterResult:
+        return (await self.get_day_per_energy_community(meter_id, day))['total']
+
+    async def get_days(self, meter_id: str, start_date: date, end_date: date) -> Dict[date, SmartmeterResult]:
+        days = _date_range(start_date, end_date)
+        semaphore = asyncio.Semaphore(self.__max_concurrency)
+
+        async def fetch(day: date) -> SmartmeterResult:
+            async with semaphore:
+                return await self.get_day(meter_id, day)
+
+        return dict(zip(days, await asyncio.gather(*map(fetch, days))))
+
+    async def get_week_per_energy_community(self, meter_id: str,
+                                            start_date: date, end_date: date) -> Dict[str, SmartmeterResult]:
+        return await asyncio.to_thread(self.__api.get_week_per_energy_community, meter_id, start_date, end_date)
+
+    async def get_week(self, meter_id: str, start_date: date, end_date: date) -> SmartmeterResult:
+        return (await self.get_week_per_energy_community(meter_id, start_date, end_date))['total']
+
+    async def get_month_per_energy_community(self, meter_id: str,
+                                             year: int, month: int) -> Dict[str, SmartmeterResult]:
+        return await asyncio.to_thread(self.__api.get_month_per_energy_community, meter_id, year, month)
+
+    async def get_month(self, meter_id: str, year: int, month: int) -> SmartmeterResult:
+        return (await self.get_month_per_energy_community(meter_id, year, month))['total']
+
+    async def get_year_per_energy_community(self, meter_id: str, year: int) -> Dict[str, SmartmeterResultYearly]:
+        return await asyncio.to_thread(self.__api.get_year_per_energy_community, meter_id, year)
+
+    async def get_year(self, meter_id: str, year: int) -> SmartmeterResultYearly:
+        return (await self.get_year_per_energy_community(meter_id, year))['total']
+
+    async def get_metering_points(self) -> List[SmartmeterMeteringPoint]:
+        return await asyncio.to_thread(self.__api.get_metering_points)
+
+    async def refresh_metering_points(self) -> List[SmartmeterMeteringPoint]:
+        return await asyncio.to_thread(self.__api.refresh_metering_points)
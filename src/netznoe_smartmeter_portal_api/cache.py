@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Optional, Union
+
+from .models import QUALITY_CODES, SmartmeterDataQuality, is_final_slot
+
+FINAL_QUALITY = 'L1'
+QUALITY_FIELDS = ('estimatedQualities', 'qualityEC', 'peakDemandDataQualities')
+
+
+def _code(quality: Optional[str]) -> int:
+    return 0 if quality is None else QUALITY_CODES[SmartmeterDataQuality(quality)]
+
+
+def _total_is_final(entry: dict) -> bool:
+    # every slot of the total is final by the rule of SmartmeterStore and SmartmeterCoverageIndex (see
+    # is_final_slot), yearly totals only have values
+    if 'meteredValues' not in entry:
+        return None not in entry.get('values', [])
+    metered = entry['meteredValues']
+    estimated_qualities = entry.get('estimatedQualities') or [None] * len(metered)
+    quality_ec = entry.get('qualityEC') or [None] * len(metered)
+    return all(
+        is_final_slot(value is not None, _code(estimated_qualities[index]), _code(quality_ec[index]))
+        for index, value in enumerate(metered)
+    )
+
+
+def is_final(data: List[dict]) -> bool:
+    # a response is final if every slot of the total is final, and the peak demands and energy community data are
+    # measured (quality L1), an empty response (e.g. data not imported yet) is not
+    has_values = False
+    for entry in data:
+        fields = QUALITY_FIELDS if entry.get('ec_id') else ('peakDemandDataQualities',)
+        for field in fields:
+            if any(quality not in (None, FINAL_QUALITY) for quality in entry.get(field, [])):
+                return False
+        if not entry.get('ec_id'):
+            if not _total_is_final(entry):
+                return False
+            has_values = has_values or len(entry.get('meteredValues', entry.get('values', []))) > 0
+    return has_values
+
+
+class SmartmeterResponseCache:
+    # Stores raw ConsumptionRecord responses in a SQLite database. Immutable entries (finalized past periods) never
+    # expire, all other entries are revalidated after ttl. If max_size (bytes) is set, the least recently used entries
+    # are evicted once the stored responses exceed it.
+
+    def __init__(self, path: Union[str, Path], ttl: timedelta = timedelta(hours=1), max_size: Optional[int] = None):
+        self.__ttl = ttl.total_seconds()
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'endpoint TEXT NOT NULL, meter_id TEXT NOT NULL, period TEXT NOT NULL, body TEXT NOT NULL, '
+            'size INTEGER NOT NULL, immutable INTEGER NOT NULL, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, '
+            'PRIMARY KEY (endpoint, meter_id, period))'
+        )
+        self.__connection.commit()
+
+    def get(self, endpoint: str, meter_id: str, period: str) -> Optional[str]:
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT body, immutable, fetched_at FROM responses WHERE endpoint = ? AND meter_id = ? AND period = ?',
+                (endpoint, meter_id, period)
+            ).fetchone()
+            if row is None:
+                return None
+            body, immutable, fetched_at = row
+            now = time.time()
+            if not immutable and fetched_at + self.__ttl <= now:
+                return None
+            self.__connection.execute(
+                'UPDATE responses SET accessed_at = ? WHERE endpoint = ? AND meter_id = ? AND period = ?',
+                (now, endpoint, meter_id, period)
+            )
+            self.__connection.commit()
+            return body
+
+    def put(self, endpoint: str, meter_id: str, period: str, body: str, immutable: bool) -> None:
+        with self.__lock:
+            now = time.time()
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (endpoint, meter_id, period, body, len(body.encode()), int(immutable), now, now)
+            )
+            if self.__max_size is not None:
+                self.__evict(self.__max_size)
+            self.__connection.commit()
+
+    def size(self) -> int:
+        with self.__lock:
+            return self.__connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__connection.execute('DELETE FROM responses')
+            self.__connection.commit()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    def __evict(self, max_size: int) -> None:
+        total = self.__connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        for endpoint, meter_id, period, size in self.__connection.execute(
+                'SELECT endpoint, meter_id, period, size FROM responses ORDER BY accessed_at, rowid').fetchall():
+            if total <= max_size:
+                break
+            self.__connection.execute(
+                'DELETE FROM responses WHERE endpoint = ? AND meter_id = ? AND period = ?', (endpoint, meter_id, period)
+            )
+            total -= size
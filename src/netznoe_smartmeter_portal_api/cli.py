@@ -0,0 +1,279 @@
+import argparse
+import getpass
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from .api import NetzNoeSmartmeterPortalApi, _slice_result
+from .archive import SmartmeterArchive
+from .exporters import SmartmeterCsvExporter, SmartmeterParquetExporter
+from .models import SmartmeterResolution, SmartmeterResult, SmartmeterResultYearly
+from .store import SmartmeterStore
+from .sync import SmartmeterSync
+
+LOGGER = logging.getLogger('netznoe_smartmeter_portal_api.cli')
+
+USERNAME_VARIABLE = 'NETZNOE_SMARTMETER_USERNAME'
+PASSWORD_VARIABLE = 'NETZNOE_SMARTMETER_PASSWORD'
+RESOLUTIONS = {
+    '15min': SmartmeterResolution.QUARTER_HOUR,
+    'day': SmartmeterResolution.DAY,
+    'month': SmartmeterResolution.MONTH,
+}
+FORMATS = ('csv', 'parquet', 'arrow', 'archive', 'store')
+
+# meter_id, endpoint, first and last day of one portal call
+Unit = Tuple[str, str, date, date]
+Result = Union[SmartmeterResult, SmartmeterResultYearly]
+
+
+class _Checkpoint:
+    # Append-only log of the completed units of a fetch, one line per unit. A unit is logged after its values were
+    # written, so an interrupted run resumes with the first unit which was not written completely.
+
+    def __init__(self, path: Path):
+        self.__done: Set[str] = set()
+        if path.exists():
+            self.__done = set(path.read_text().splitlines())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__fp = path.open('a')
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__done
+
+    def add(self, key: str) -> None:
+        self.__done.add(key)
+        self.__fp.write(f'{key}\n')
+        self.__fp.flush()
+
+    def close(self) -> None:
+        self.__fp.close()
+
+
+class _Writer:
+    # Writes results to the chosen output, every batch is on disk when write returns: CSV files and archive maps are
+    # closed (and lazily reopened by the next batch), Parquet/Arrow files and store transactions are complete anyway.
+
+    def __init__(self, output_format: str, output: Path):
+        # output_format is one of FORMATS
+        self.__target: Any
+        if output_format == 'csv':
+            self.__target = SmartmeterCsvExporter(output)
+        elif output_format in ('parquet', 'arrow'):
+            self.__target = SmartmeterParquetExporter(output, file_format=output_format)
+        elif output_format == 'archive':
+            self.__target = SmartmeterArchive(output)
+        else:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            self.__target = SmartmeterStore(output)
+
+    def write(self, meter_id: str, results: List[Result]) -> None:
+        if isinstance(self.__target, SmartmeterStore):
+            self.__target.ingest_many(meter_id, results)
+            return
+        self.__target.write(meter_id, results)
+        if isinstance(self.__target, (SmartmeterCsvExporter, SmartmeterArchive)):
+            self.__target.close()
+
+    def close(self) -> None:
+        if not isinstance(self.__target, SmartmeterParquetExporter):
+            self.__target.close()
+
+
+def _unit_key(unit: Unit) -> str:
+    meter_id, endpoint, start_date, end_date = unit
+    return f'{meter_id} {endpoint} {start_date.isoformat()} {end_date.isoformat()}'
+
+
+def _in_order(executor: ThreadPoolExecutor, fetch: Callable[[Unit], Result], units: Iterable[Unit],
+              window: int) -> Iterator[Tuple[Unit, 'Future[Result]']]:
+    # keeps up to window fetches running and yields them in the order of units, so that the output stays
+    # chronological and the checkpoint never skips an unwritten unit
+    pending: Deque[Tuple[Unit, 'Future[Result]']] = deque()
+    for unit in units:
+        pending.append((unit, executor.submit(fetch, unit)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def _yesterday() -> date:
+    return datetime.now(ZoneInfo('Europe/Vienna')).date() - timedelta(days=1)
+
+
+def _api(args: argparse.Namespace, parser: argparse.ArgumentParser) -> NetzNoeSmartmeterPortalApi:
+    username = args.username or os.environ.get(USERNAME_VARIABLE)
+    if not username:
+        parser.error(f'--username or {USERNAME_VARIABLE} is required')
+    password = os.environ.get(PASSWORD_VARIABLE) or getpass.getpass(f'Password of {username}: ')
+    return NetzNoeSmartmeterPortalApi(username, password, pool_maxsize=args.workers, base_url=args.base_url)
+
+
+def _meters(args: argparse.Namespace, api: NetzNoeSmartmeterPortalApi) -> List[str]:
+    if args.meter:
+        return list(args.meter)
+    meters = [metering_point.metering_point_id for metering_point in api.get_metering_points()]
+    LOGGER.info('Discovered %d metering points', len(meters))
+    return meters
+
+
+def _fetch(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    resolution = RESOLUTIONS[args.resolution]
+    if args.format == 'archive' and resolution != SmartmeterResolution.QUARTER_HOUR:
+        parser.error('the archive format only stores 15min values')
+    end_date = args.end or _yesterday()
+    output = Path(args.output)
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else (
+        output.with_name(f'{output.name}.checkpoint') if args.format == 'store' else output / '.checkpoint'
+    )
+
+    api = _api(args, parser)
+    api.do_login()
+    checkpoint = _Checkpoint(checkpoint_path)
+    writer = _Writer(args.format, output)
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    failed = 0
+    try:
+        # one unit per portal call, e.g. a day of 15min values or a month of daily values
+        units = [
+            (meter_id, endpoint, start_date, last_day)
+            for meter_id in _meters(args, api)
+            for endpoint, start_date, last_day in api._plan_range(args.start, end_date, resolution)
+        ]
+        remaining = [unit for unit in units if _unit_key(unit) not in checkpoint]
+        LOGGER.info('Fetching %d of %d periods, %d already done', len(remaining), len(units),
+                    len(units) - len(remaining))
+
+        def fetch(unit: Unit) -> Result:
+            # each unit is a single portal call, sliced like get_range does
+            meter_id, endpoint, start_date, last_day = unit
+            result = api._fetch_call(meter_id, (endpoint, start_date, last_day))
+            first_day = start_date.replace(day=1) if resolution == SmartmeterResolution.MONTH else start_date
+            return _slice_result(result, first_day, last_day)
+
+        for unit, future in _in_order(executor, fetch, remaining, window=2 * args.workers):
+            try:
+                result = future.result()
+            except Exception as e:
+                # left out of the checkpoint, the next run fetches it again
+                LOGGER.error('Fetching %s failed: %s', _unit_key(unit), e)
+                failed += 1
+                continue
+            writer.write(unit[0], [result])
+            checkpoint.add(_unit_key(unit))
+            LOGGER.info('Wrote %s', _unit_key(unit))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+        checkpoint.close()
+        api.do_logout()
+    if failed:
+        LOGGER.error('%d periods failed, run the command again to retry them', failed)
+        return 1
+    return 0
+
+
+def _sync(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    # the high-water marks of the store are the checkpoint of a sync
+    api = _api(args, parser)
+    api.do_login()
+    store = SmartmeterStore(args.store)
+    sync = SmartmeterSync(api, store, revalidate_days=args.revalidate_days)
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                meter_id: executor.submit(sync.sync, meter_id, args.start, args.end, args.fields)
+                for meter_id in _meters(args, api)
+            }
+            for meter_id, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    LOGGER.error('Syncing %s failed: %s', meter_id, e)
+                    failed += 1
+                    continue
+                LOGGER.info('Synced %s: %d days fetched, high-water mark %s', meter_id, len(result.fetched_days),
+                            result.high_water_mark.isoformat() if result.high_water_mark else '-')
+    finally:
+        store.close()
+        api.do_logout()
+    return 1 if failed else 0
+
+
+def _export(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    resolution = RESOLUTIONS[args.resolution]
+    if args.format == 'store':
+        parser.error('export reads from a store, choose another format')
+    if args.format == 'archive' and resolution != SmartmeterResolution.QUARTER_HOUR:
+        parser.error('the archive format only stores 15min values')
+    end_date = args.end or _yesterday()
+    store = SmartmeterStore(args.store)
+    writer = _Writer(args.format, Path(args.output))
+    try:
+        for meter_id in args.meter:
+            writer.write(meter_id, [store.query(meter_id, args.start, end_date, resolution)])
+            LOGGER.info('Exported %s', meter_id)
+    finally:
+        writer.close()
+        store.close()
+    return 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='netznoe-smartmeter',
+                                     description='Collects values of the NetzNÖ Smartmeter Portal')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def portal_arguments(command: argparse.ArgumentParser) -> None:
+        command.add_argument('--username', help=f'portal user (default: ${USERNAME_VARIABLE}), the password is read '
+                                                f'from ${PASSWORD_VARIABLE} or prompted')
+        command.add_argument('--base-url', help='alternative portal URL, e.g. a proxy')
+        command.add_argument('--workers', type=int, default=4, help='parallel portal requests (default: 4)')
+
+    def range_arguments(command: argparse.ArgumentParser, meter_required: bool) -> None:
+        command.add_argument('--meter', action='append', required=meter_required,
+                             help='metering point id, repeatable' +
+                                  ('' if meter_required else ' (default: all metering points of the user)'))
+        command.add_argument('--start', type=date.fromisoformat, required=True, help='first day (YYYY-MM-DD)')
+        command.add_argument('--end', type=date.fromisoformat, help='last day (default: yesterday)')
+
+    fetch = commands.add_parser('fetch', help='fetch a range of values into an output, resumable')
+    portal_arguments(fetch)
+    range_arguments(fetch, meter_required=False)
+    fetch.add_argument('--resolution', choices=RESOLUTIONS, default='15min')
+    fetch.add_argument('--format', choices=FORMATS, default='csv')
+    fetch.add_argument('--output', required=True, help='output directory (the database file for store)')
+    fetch.add_argument('--checkpoint', help='file of completed periods (default: .checkpoint in the output directory)')
+    fetch.set_defaults(run=_fetch)
+
+    sync = commands.add_parser('sync', help='incrementally sync 15min values into a store')
+    portal_arguments(sync)
+    range_arguments(sync, meter_required=False)
+    sync.add_argument('--store', required=True, help='SQLite database of SmartmeterStore')
+    sync.add_argument('--revalidate-days', type=int, default=14, help='refetch recent days with estimates')
+    sync.add_argument('--fields', nargs='+', default=['metered'], help='fields of the high-water mark')
+    sync.set_defaults(run=_sync)
+
+    export = commands.add_parser('export', help='export values of a store without querying the portal')
+    range_arguments(export, meter_required=True)
+    export.add_argument('--store', required=True, help='SQLite database of SmartmeterStore')
+    export.add_argument('--resolution', choices=RESOLUTIONS, default='15min')
+    export.add_argument('--format', choices=FORMATS, default='csv')
+    export.add_argument('--output', required=True, help='output directory')
+    export.set_defaults(run=_export)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(format='%(asctime)s [%(levelname)6s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S',
+                        level=logging.INFO)
+    return args.run(args, parser)
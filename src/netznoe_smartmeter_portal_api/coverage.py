@@ -0,0 +1,133 @@
+import math
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .models import (
+    SmartmeterResolution,
+    SmartmeterResult,
+    _from_epoch,
+    day_of,
+    day_start,
+)
+from .store import SmartmeterStore
+
+_INTERVAL_SECONDS = 15 * 60
+# fields deciding which slots are present and final
+_COVERAGE_FIELDS = ('metered', 'estimated', 'estimated_qualities', 'quality_ec')
+
+
+@dataclass(frozen=True)
+class SmartmeterDayCoverage:
+    # Bitmaps of the slots of a day, bit n is the n-th 15min interval (92 or 100 on DST days) or the only bit of a
+    # daily value. A slot is present if it has a metered or estimated value and final if it has a metered value or a
+    # measured (L1) estimate without L2/L3 energy community data, like final slots of SmartmeterStore.
+    slots: int
+    present: int = 0
+    final: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.final == (1 << self.slots) - 1
+
+    @property
+    def missing_slots(self) -> List[int]:
+        return [slot for slot in range(self.slots) if not self.present >> slot & 1]
+
+    @property
+    def estimated_slots(self) -> List[int]:
+        return [slot for slot in range(self.slots) if (self.present & ~self.final) >> slot & 1]
+
+
+def _slots_of(day: date, resolution: SmartmeterResolution) -> int:
+    if resolution == SmartmeterResolution.DAY:
+        return 1
+    if resolution != SmartmeterResolution.QUARTER_HOUR:
+        raise ValueError('Unsupported resolution')
+    return (day_start(day + timedelta(days=1)) - day_start(day)) // _INTERVAL_SECONDS
+
+
+class SmartmeterCoverageIndex:
+    # Knows per meter which 15min slots (ConsumptionRecord/Day) and daily values (Week/Month) were fetched and are
+    # final. Passed to the api as coverage it is updated with every fetched total, days never recorded are missing
+    # entirely. Thread-safe.
+
+    def __init__(self):
+        self.__days: Dict[Tuple[str, SmartmeterResolution], Dict[date, SmartmeterDayCoverage]] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, meter_id: str, result: SmartmeterResult, resolution: SmartmeterResolution,
+               start_date: date, end_date: date) -> None:
+        # replaces the coverage of all days from start_date to end_date by the one of result (the total of a fetched
+        # period), values outside of the period are ignored
+        columnar = result.to_columnar()
+        count = len(columnar.timestamps)
+        nan = [math.nan] * count
+        metered = columnar.values.get('metered', nan)
+        estimated = columnar.values.get('estimated', nan)
+        final_slots = columnar.final_slots()
+
+        coverage = {
+            start_date + timedelta(days=offset): [_slots_of(start_date + timedelta(days=offset), resolution), 0, 0]
+            for offset in range((end_date - start_date).days + 1)
+        }
+        starts: Dict[date, int] = {}
+        for position, timestamp in enumerate(columnar.timestamps):
+            day = day_of(_from_epoch(timestamp, columnar.is_date))
+            if day not in coverage:
+                continue
+            if day not in starts:
+                starts[day] = day_start(day)
+            # slot n of a day ends at its start + (n + 1) * 15min
+            bit = 1 if columnar.is_date else 1 << (timestamp - starts[day]) // _INTERVAL_SECONDS - 1
+            if math.isnan(metered[position]) and math.isnan(estimated[position]):
+                continue
+            coverage[day][1] |= bit
+            if final_slots[position]:
+                coverage[day][2] |= bit
+
+        with self.__lock:
+            days = self.__days.setdefault((meter_id, resolution), {})
+            for day, (slots, present, final) in coverage.items():
+                days[day] = SmartmeterDayCoverage(slots, present, final)
+
+    def record_store(self, store: SmartmeterStore, meter_id: str, start_date: date, end_date: date,
+                     resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR) -> None:
+        # rebuilds the coverage of the days start_date to end_date from the values kept in store, e.g. by the fetches
+        # of an earlier process, days without stored values are missing
+        result = store.query(meter_id, start_date, end_date, resolution, fields=_COVERAGE_FIELDS)
+        if not isinstance(result, SmartmeterResult):
+            raise ValueError('Unsupported resolution')
+        self.record(meter_id, result, resolution, start_date, end_date)
+
+    def get(self, meter_id: str, day: date,
+            resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR) -> SmartmeterDayCoverage:
+        with self.__lock:
+            coverage: Optional[SmartmeterDayCoverage] = self.__days.get((meter_id, resolution), {}).get(day)
+        return coverage if coverage is not None else SmartmeterDayCoverage(_slots_of(day, resolution))
+
+    def incomplete_days(self, meter_id: str, start_date: date, end_date: date,
+                        resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR) -> List[date]:
+        # days of the range with missing or estimated values, including days which were never fetched
+        if start_date > end_date:
+            raise ValueError('start_date must not be after end_date')
+        # raises for resolutions without coverage
+        _slots_of(start_date, resolution)
+        incomplete = []
+        with self.__lock:
+            days = self.__days.get((meter_id, resolution), {})
+            for offset in range((end_date - start_date).days + 1):
+                day = start_date + timedelta(days=offset)
+                coverage = days.get(day)
+                if coverage is None or not coverage.complete:
+                    incomplete.append(day)
+        return incomplete
+
+    def clear(self, meter_id: Optional[str] = None) -> None:
+        with self.__lock:
+            if meter_id is None:
+                self.__days.clear()
+            else:
+                for key in [key for key in self.__days if key[0] == meter_id]:
+                    del self.__days[key]
@@ -0,0 +1,135 @@
+import csv
+import math
+import uuid
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from .models import (
+    QUALITY_NAMES,
+    SmartmeterResult,
+    SmartmeterResultYearly,
+)
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+_TZ_VIENNA = ZoneInfo('Europe/Vienna')
+
+
+def _dataset_names(result: Union[SmartmeterResult, SmartmeterResultYearly]) -> Tuple[str, str]:
+    if isinstance(result, SmartmeterResultYearly):
+        return 'yearly_values', 'yearly_peak_demands'
+    return 'values', 'peak_demands'
+
+
+class SmartmeterCsvExporter:
+    # Appends results to one CSV per meter and dataset (<meter_id>_values.csv, <meter_id>_peak_demands.csv, ...) with
+    # one row per timestamp and one column per field. Files are kept open until close().
+
+    def __init__(self, output_dir: Union[str, Path], delimiter: str = ','):
+        self.__output_dir = Path(output_dir)
+        self.__output_dir.mkdir(parents=True, exist_ok=True)
+        self.__delimiter = delimiter
+        self.__files: Dict[Path, Tuple[IO[str], Any]] = {}
+
+    def write(self, meter_id: str, results: Iterable[Union[SmartmeterResult, SmartmeterResultYearly]]) -> None:
+        for result in results:
+            columnar = result.to_columnar()
+            for dataset, peak_demands in zip(_dataset_names(result), (False, True)):
+                timestamps, values, qualities = columnar.columns(peak_demands)
+                if len(timestamps) == 0:
+                    continue
+                formatted_timestamps = [
+                    self.__format_timestamp(timestamp, columnar.is_date and not peak_demands)
+                    for timestamp in timestamps
+                ]
+                writer = self.__writer(self.__output_dir / f'{meter_id}_{dataset}.csv',
+                                       ['timestamp', *values.keys(), *qualities.keys()])
+                writer.writerows(zip(
+                    formatted_timestamps,
+                    *[['' if math.isnan(value) else value for value in column] for column in values.values()],
+                    *[[QUALITY_NAMES[code] for code in column] for column in qualities.values()],
+                ))
+
+    def close(self) -> None:
+        for fp, _ in self.__files.values():
+            fp.close()
+        self.__files.clear()
+
+    def __enter__(self) -> 'SmartmeterCsvExporter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __writer(self, path: Path, header: List[str]) -> Any:
+        if path not in self.__files:
+            write_header = not path.exists() or path.stat().st_size == 0
+            fp = path.open('a', newline='')
+            writer = csv.writer(fp, delimiter=self.__delimiter)
+            if write_header:
+                writer.writerow(header)
+            self.__files[path] = (fp, writer)
+        return self.__files[path][1]
+
+    @staticmethod
+    def __format_timestamp(timestamp: int, is_date: bool) -> str:
+        converted = datetime.fromtimestamp(timestamp, _TZ_VIENNA)
+        return converted.date().isoformat() if is_date else converted.isoformat()
+
+
+class SmartmeterParquetExporter:
+    # Writes each batch of results as one file per dataset into a hive partitioned dataset
+    # (<output_dir>/<dataset>/meter_id=<meter_id>/part-<uuid>.parquet) readable by pyarrow.dataset, pandas or polars.
+    # Timestamps are stored in Europe/Vienna, gaps are NaN and qualities are dictionary encoded. Requires pyarrow.
+
+    def __init__(self, output_dir: Union[str, Path], file_format: str = 'parquet'):
+        if pyarrow is None:  # pragma: no cover
+            raise ImportError('pyarrow is required for SmartmeterParquetExporter')
+        if file_format not in ('parquet', 'arrow'):
+            raise ValueError('Unsupported file_format')
+        self.__output_dir = Path(output_dir)
+        self.__file_format = file_format
+
+    def write(self, meter_id: str, results: Iterable[Union[SmartmeterResult, SmartmeterResultYearly]]) -> None:
+        tables: Dict[str, List[Any]] = {}
+        for result in results:
+            columnar = result.to_columnar()
+            for dataset, peak_demands in zip(_dataset_names(result), (False, True)):
+                timestamps, values, qualities = columnar.columns(peak_demands)
+                if len(timestamps) > 0:
+                    tables.setdefault(dataset, []).append(self.__to_table(timestamps, values, qualities))
+
+        for dataset, dataset_tables in tables.items():
+            path = self.__output_dir / dataset / f'meter_id={meter_id}'
+            path.mkdir(parents=True, exist_ok=True)
+            table = pyarrow.concat_tables(dataset_tables)
+            filename = path / f'part-{uuid.uuid4().hex}.{self.__file_format}'
+            if self.__file_format == 'parquet':
+                pyarrow.parquet.write_table(table, filename)
+            else:
+                pyarrow.feather.write_feather(table, filename)
+
+    @staticmethod
+    def __to_table(timestamps: array, values: Dict[str, array], qualities: Dict[str, array]) -> Any:
+        def from_buffer(data_type: Any, column: array) -> Any:
+            # wraps the array buffer without copying it
+            return pyarrow.Array.from_buffers(data_type, len(column), [None, pyarrow.py_buffer(column)])
+
+        quality_dictionary = pyarrow.array(QUALITY_NAMES)
+        columns = {'timestamp': from_buffer(pyarrow.timestamp('s', tz='Europe/Vienna'), timestamps)}
+        columns.update({name: from_buffer(pyarrow.float64(), column) for name, column in values.items()})
+        for name, column in qualities.items():
+            codes = from_buffer(pyarrow.uint8(), column)
+            codes = pyarrow.compute.if_else(pyarrow.compute.equal(codes, 0), pyarrow.scalar(None, pyarrow.uint8()),
+                                            codes)
+            columns[name] = pyarrow.DictionaryArray.from_arrays(codes, quality_dictionary)
+        return pyarrow.table(columns)
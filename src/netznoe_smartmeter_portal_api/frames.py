@@ -0,0 +1,102 @@
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from .models import (
+    QUALITY_NAMES,
+    SmartmeterResult,
+    SmartmeterResultYearly,
+)
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+try:
+    import pandas
+except ImportError:  # pragma: no cover
+    pandas = None
+
+try:
+    import polars
+except ImportError:  # pragma: no cover
+    polars = None
+
+Results = Union[SmartmeterResult, SmartmeterResultYearly, Iterable[Union[SmartmeterResult, SmartmeterResultYearly]]]
+
+_TZ_VIENNA = 'Europe/Vienna'
+# category n - 1 belongs to quality code n, code 0 (gap) becomes a missing category
+_CATEGORIES = list(QUALITY_NAMES[1:])
+
+
+Columns = Tuple[array, Dict[str, array], Dict[str, array]]
+
+
+def _columns_of(results: Results, peak_demands: bool) -> Columns:
+    if isinstance(results, (SmartmeterResult, SmartmeterResultYearly)):
+        return results.to_columnar().columns(peak_demands)
+    parts = [result.to_columnar().columns(peak_demands) for result in results]
+    if len(parts) == 1:
+        return parts[0]
+    return _concat_columns(parts)
+
+
+def _concat_columns(parts: List[Columns]) -> Columns:
+    # the buffers of consecutive results (e.g. the days of iter_days) are appended, fields missing in a result are
+    # filled with gaps
+    timestamps = array('q')
+    values: Dict[str, array] = {}
+    qualities: Dict[str, array] = {}
+    for _, part_values, part_qualities in parts:
+        for name in part_values:
+            values.setdefault(name, array('d'))
+        for name in part_qualities:
+            qualities.setdefault(name, array('B'))
+
+    for part_timestamps, part_values, part_qualities in parts:
+        length = len(part_timestamps)
+        if length and timestamps and part_timestamps[0] <= timestamps[-1]:
+            raise ValueError('Results must be in chronological order without overlap')
+        timestamps.extend(part_timestamps)
+        for name, column in values.items():
+            column.extend(part_values.get(name, array('d', [math.nan]) * length))
+        for name, column in qualities.items():
+            column.extend(part_qualities.get(name, array('B', bytes(length))))
+    return timestamps, values, qualities
+
+
+def to_pandas(results: Results, peak_demands: bool = False) -> Any:
+    # DataFrame indexed by the Europe/Vienna timestamps of the values (the peak demand times with peak_demands=True,
+    # dates as midnight), one float64 column per value field (NaN for gaps) viewing the columnar buffers without
+    # copying, and one categorical column (L1, L2, L3) per quality field. Requires pandas.
+    if pandas is None or numpy is None:  # pragma: no cover
+        raise ImportError('pandas is required for to_pandas')
+    timestamps, values, qualities = _columns_of(results, peak_demands)
+    index = pandas.to_datetime(numpy.frombuffer(timestamps, dtype=numpy.int64), unit='s', utc=True)
+    columns: Dict[str, Any] = {name: numpy.frombuffer(column, dtype=numpy.float64) for name, column in values.items()}
+    for name, column in qualities.items():
+        columns[name] = pandas.Categorical.from_codes(
+            numpy.frombuffer(column, dtype=numpy.uint8).astype(numpy.int8) - 1, categories=_CATEGORIES
+        )
+    return pandas.DataFrame(columns, index=index.tz_convert(_TZ_VIENNA).rename('timestamp'), copy=False)
+
+
+def to_polars(results: Results, peak_demands: bool = False) -> Any:
+    # DataFrame with a Europe/Vienna timestamp column followed by one Float64 column per value field (NaN for gaps)
+    # viewing the columnar buffers and one Enum column (L1, L2, L3, null for gaps) per quality field. Requires polars.
+    if polars is None or numpy is None:  # pragma: no cover
+        raise ImportError('polars is required for to_polars')
+    timestamps, values, qualities = _columns_of(results, peak_demands)
+    series = [
+        polars.from_epoch(polars.Series('timestamp', numpy.frombuffer(timestamps, dtype=numpy.int64)), time_unit='s')
+        .dt.replace_time_zone('UTC').dt.convert_time_zone(_TZ_VIENNA)
+    ]
+    series += [polars.Series(name, numpy.frombuffer(column, dtype=numpy.float64)) for name, column in values.items()]
+    quality_type = polars.Enum(_CATEGORIES)
+    series += [
+        polars.Series(name, numpy.frombuffer(column, dtype=numpy.uint8)).replace_strict(
+            dict(enumerate(_CATEGORIES, start=1)), default=None, return_dtype=quality_type
+        ) for name, column in qualities.items()
+    ]
+    return polars.DataFrame(series)
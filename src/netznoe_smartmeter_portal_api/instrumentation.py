@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+try:
+    from opentelemetry import metrics as otel_metrics
+except ImportError:  # pragma: no cover
+    otel_metrics = None
+
+
+@dataclass
+class SmartmeterRequestEvent:
+    # One call of a portal endpoint (e.g. ConsumptionRecord/Day), emitted after the response was parsed or the call
+    # failed. Calls answered by the memo emit no event, calls answered by the response cache have cached set.
+    #   latency: seconds spent in HTTP requests (all attempts, for streamed responses including reading the body)
+    #   bytes: size of the response body
+    #   retries: repeated requests after transient errors or a renewed session
+    #   parse_duration: seconds spent decoding the response into results
+    #   values: number of non-null entries of all series of the response
+    #   error: name of the exception the call failed with
+    endpoint: str
+    meter_id: Optional[str] = None
+    status: Optional[int] = None
+    latency: float = 0.0
+    bytes: int = 0
+    retries: int = 0
+    parse_duration: float = 0.0
+    values: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+
+
+class SmartmeterObserver:
+    # Receives an event per endpoint call, passed to the api via observers. on_request is called on the thread which
+    # made the call, implementations shared by concurrent clients must be thread-safe.
+
+    def on_request(self, event: SmartmeterRequestEvent) -> None:
+        pass
+
+
+def count_values(data: Any) -> int:
+    # non-null entries of all series of a consumption record (list of energy community entries)
+    count = 0
+    for entry in data:
+        for field, series in entry.items():
+            if field != 'peakDemandTimes' and isinstance(series, list):
+                count += sum(1 for value in series if value is not None)
+    return count
+
+
+class SmartmeterPrometheusObserver(SmartmeterObserver):
+    # Records events as Prometheus metrics labelled by endpoint (meter ids are left out to keep the cardinality low):
+    #   <namespace>_requests_total{endpoint,outcome}  outcome is ok, cached or error
+    #   <namespace>_request_latency_seconds{endpoint}, <namespace>_parse_duration_seconds{endpoint}  histograms
+    #   <namespace>_response_bytes_total, <namespace>_retries_total, <namespace>_values_total{endpoint}
+    # Requires prometheus_client.
+
+    def __init__(self, registry: Any = None, namespace: str = 'netznoe_smartmeter'):
+        if prometheus_client is None:  # pragma: no cover
+            raise ImportError('prometheus_client is required for SmartmeterPrometheusObserver')
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+        self.__requests = prometheus_client.Counter('requests', 'Calls of portal endpoints', ['endpoint', 'outcome'],
+                                                    namespace=namespace, registry=registry)
+        self.__latency = prometheus_client.Histogram('request_latency_seconds', 'HTTP latency of portal calls',
+                                                     ['endpoint'], namespace=namespace, registry=registry)
+        self.__parse_duration = prometheus_client.Histogram('parse_duration_seconds', 'Parse time of portal responses',
+                                                            ['endpoint'], namespace=namespace, registry=registry)
+        self.__bytes = prometheus_client.Counter('response_bytes', 'Size of portal responses', ['endpoint'],
+                                                 namespace=namespace, registry=registry)
+        self.__retries = prometheus_client.Counter('retries', 'Repeated portal requests', ['endpoint'],
+                                                   namespace=namespace, registry=registry)
+        self.__values = prometheus_client.Counter('values', 'Parsed values', ['endpoint'],
+                                                  namespace=namespace, registry=registry)
+
+    def on_request(self, event: SmartmeterRequestEvent) -> None:
+        outcome = 'error' if event.error is not None else 'cached' if event.cached else 'ok'
+        self.__requests.labels(endpoint=event.endpoint, outcome=outcome).inc()
+        if not event.cached:
+            self.__latency.labels(endpoint=event.endpoint).observe(event.latency)
+        self.__parse_duration.labels(endpoint=event.endpoint).observe(event.parse_duration)
+        self.__bytes.labels(endpoint=event.endpoint).inc(event.bytes)
+        self.__retries.labels(endpoint=event.endpoint).inc(event.retries)
+        self.__values.labels(endpoint=event.endpoint).inc(event.values)
+
+
+class SmartmeterOpenTelemetryObserver(SmartmeterObserver):
+    # Records events with OpenTelemetry instruments of meter (by default the meter of the global MeterProvider),
+    # attributes are endpoint and outcome like in SmartmeterPrometheusObserver. Requires opentelemetry-api unless a
+    # meter is passed.
+
+    def __init__(self, meter: Any = None):
+        if meter is None:
+            if otel_metrics is None:  # pragma: no cover
+                raise ImportError('opentelemetry-api is required for SmartmeterOpenTelemetryObserver')
+            meter = otel_metrics.get_meter('netznoe_smartmeter_portal_api')
+        self.__requests = meter.create_counter('netznoe_smartmeter.requests', unit='1',
+                                               description='Calls of portal endpoints')
+        self.__latency = meter.create_histogram('netznoe_smartmeter.request.latency', unit='s',
+                                                description='HTTP latency of portal calls')
+        self.__parse_duration = meter.create_histogram('netznoe_smartmeter.parse.duration', unit='s',
+                                                       description='Parse time of portal responses')
+        self.__bytes = meter.create_counter('netznoe_smartmeter.response.size', unit='By',
+                                            description='Size of portal responses')
+        self.__retries = meter.create_counter('netznoe_smartmeter.retries', unit='1',
+                                              description='Repeated portal requests')
+        self.__values = meter.create_counter('netznoe_smartmeter.values', unit='1', description='Parsed values')
+
+    def on_request(self, event: SmartmeterRequestEvent) -> None:
+        outcome = 'error' if event.error is not None else 'cached' if event.cached else 'ok'
+        attributes: Dict[str, str] = {'endpoint': event.endpoint, 'outcome': outcome}
+        self.__requests.add(1, attributes)
+        if not event.cached:
+            self.__latency.record(event.latency, attributes)
+        self.__parse_duration.record(event.parse_duration, attributes)
+        self.__bytes.add(event.bytes, attributes)
+        self.__retries.add(event.retries, attributes)
+        self.__values.add(event.values, attributes)
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+MemoValue = TypeVar('MemoValue')
+
+
+class SmartmeterMemo:
+    # In-memory LRU memo of parsed results with single-flight coalescing: concurrent calls for the same key share one
+    # computation (one portal request), its result is kept for ttl. Failures are passed to all waiting callers but are
+    # never memoized. With ttl=0 only in-flight calls are coalesced.
+    # Memoized results are shared between callers and must not be modified.
+
+    def __init__(self, max_entries: int = 1024, ttl: timedelta = timedelta(minutes=5)):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.__max_entries = max_entries
+        self.__ttl = ttl.total_seconds()
+        self.__entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self.__in_flight: Dict[Hashable, Future] = {}
+        self.__lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], MemoValue]) -> MemoValue:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.__entries.move_to_end(key)
+                    return entry[1]
+                del self.__entries[key]
+
+            future = self.__in_flight.get(key)
+            leader = future is None
+            if future is None:
+                future = self.__in_flight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self.__lock:
+                del self.__in_flight[key]
+            future.set_exception(e)
+            raise
+        with self.__lock:
+            del self.__in_flight[key]
+            if self.__ttl > 0:
+                self.__entries[key] = (time.monotonic() + self.__ttl, value)
+                while len(self.__entries) > self.__max_entries:
+                    self.__entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        # the memoized value if it is still valid, never computes or waits for one
+        with self.__lock:
+            entry = self.__entries.get(key)
+            return entry[1] if entry is not None and entry[0] > time.monotonic() else None
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
@@ -1,7 +1,10 @@
-from dataclasses import dataclass
-from datetime import date, datetime
+import math
+from array import array
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, timedelta
 from enum import Enum
-from typing import List, Union, Tuple
+from typing import Any, Dict, List, Type, TypeVar, Union, Tuple
+from zoneinfo import ZoneInfo
 
 
 @dataclass
@@ -25,6 +28,63 @@ class SmartmeterDataQuality(str, Enum):
     #               Verbrauch/diese Einspeisung nicht für die Verrechnung verwendet.
 
 
+# uint8 codes of the quality columns, 0 marks a gap
+QUALITY_CODES: Dict[SmartmeterDataQuality, int] = {
+    SmartmeterDataQuality.L1: 1,
+    SmartmeterDataQuality.L2: 2,
+    SmartmeterDataQuality.L3: 3,
+}
+# name of each quality code, the gap is empty
+QUALITY_NAMES: Tuple[str, ...] = ('', *(
+    quality.value for quality in sorted(QUALITY_CODES, key=QUALITY_CODES.__getitem__)
+))
+QUALITY_FIELDS = ('estimated_qualities', 'quality_ec', 'peak_demand_data_qualities')
+PEAK_DEMAND_FIELDS = ('metered_peak_demands', 'estimated_peak_demands', 'peak_demand_data_qualities', 'peak_demands')
+
+
+def is_final_slot(metered: bool, estimated_quality: int, quality_ec: int) -> bool:
+    # a slot is final if it has a metered value or a measured (L1) estimate and its energy community data is not an
+    # L2/L3 estimate, qualities are codes of QUALITY_CODES (0 if missing)
+    measured = QUALITY_CODES[SmartmeterDataQuality.L1]
+    return (metered or estimated_quality == measured) and quality_ec in (0, measured)
+
+
+@dataclass
+class SmartmeterColumnarResult:
+    # Columnar representation of SmartmeterResult/SmartmeterResultYearly, all columns are arrays supporting the buffer
+    # protocol (e.g. numpy.frombuffer(columnar.values['metered'], dtype='float64') without copying).
+    #   timestamps: epoch seconds (int64) of the interval values, dates are stored as midnight in Europe/Vienna
+    #   values: float64 column per value field aligned with timestamps, NaN for gaps
+    #   qualities: uint8 column per quality field aligned with timestamps, 0 for gaps (see QUALITY_CODES)
+    #   peak_demand_*: the same for the peak demand fields, which have their own timestamps
+    is_date: bool
+    timestamps: array = field(default_factory=lambda: array('q'))
+    values: Dict[str, array] = field(default_factory=dict)
+    qualities: Dict[str, array] = field(default_factory=dict)
+    peak_demand_timestamps: array = field(default_factory=lambda: array('q'))
+    peak_demand_values: Dict[str, array] = field(default_factory=dict)
+    peak_demand_qualities: Dict[str, array] = field(default_factory=dict)
+
+    def columns(self, peak_demands: bool = False) -> Tuple[array, Dict[str, array], Dict[str, array]]:
+        # timestamps, values and qualities of the interval fields or of the peak demand fields
+        if peak_demands:
+            return self.peak_demand_timestamps, self.peak_demand_values, self.peak_demand_qualities
+        return self.timestamps, self.values, self.qualities
+
+    def final_slots(self) -> List[bool]:
+        # final flag of each slot (see is_final_slot), results without metered values (e.g. yearly results) are final
+        if 'metered' not in self.values:
+            return [True] * len(self.timestamps)
+        gaps = bytes(len(self.timestamps))
+        metered = self.values['metered']
+        estimated_qualities = self.qualities.get('estimated_qualities', gaps)
+        quality_ec = self.qualities.get('quality_ec', gaps)
+        return [
+            is_final_slot(not math.isnan(metered[index]), estimated_qualities[index], quality_ec[index])
+            for index in range(len(self.timestamps))
+        ]
+
+
 @dataclass
 class SmartmeterResult:
     # Description:
@@ -104,6 +164,23 @@ class SmartmeterResult:
     # other API fields:
     #   ec_id, peakDemandTimes
 
+    def to_columnar(self) -> SmartmeterColumnarResult:
+        return _to_columnar(self)
+
+    @classmethod
+    def from_columnar(cls, columnar: SmartmeterColumnarResult) -> 'SmartmeterResult':
+        return _from_columnar(cls, columnar)
+
+    def to_pandas(self, peak_demands: bool = False) -> Any:
+        # see frames.to_pandas, which also accepts a list of consecutive results
+        from .frames import to_pandas
+        return to_pandas(self, peak_demands)
+
+    def to_polars(self, peak_demands: bool = False) -> Any:
+        # see frames.to_polars
+        from .frames import to_polars
+        return to_polars(self, peak_demands)
+
 
 @dataclass
 class SmartmeterResultYearly:
@@ -156,3 +233,109 @@ class SmartmeterResultYearly:
 
     # other API fields:
     #   ec_id, peakDemandTimes, isMixed
+
+    def to_columnar(self) -> SmartmeterColumnarResult:
+        return _to_columnar(self)
+
+    @classmethod
+    def from_columnar(cls, columnar: SmartmeterColumnarResult) -> 'SmartmeterResultYearly':
+        return _from_columnar(cls, columnar)
+
+    def to_pandas(self, peak_demands: bool = False) -> Any:
+        # see frames.to_pandas, which also accepts a list of consecutive results
+        from .frames import to_pandas
+        return to_pandas(self, peak_demands)
+
+    def to_polars(self, peak_demands: bool = False) -> Any:
+        # see frames.to_polars
+        from .frames import to_polars
+        return to_polars(self, peak_demands)
+
+
+class SmartmeterResolution(str, Enum):
+    QUARTER_HOUR = "15min"  # ConsumptionRecord/Day
+    HOUR = "hour"  # only derived locally, see aggregation.aggregate
+    DAY = "day"  # ConsumptionRecord/Week and ConsumptionRecord/Month
+    MONTH = "month"  # ConsumptionRecord/Year
+
+
+ResultType = TypeVar('ResultType', SmartmeterResult, SmartmeterResultYearly)
+
+_TZ_VIENNA = ZoneInfo('Europe/Vienna')
+_INTERVAL = timedelta(minutes=15)
+_QUALITIES_BY_CODE = {code: quality for quality, code in QUALITY_CODES.items()}
+
+
+def day_start(day: date) -> int:
+    # midnight of the day in Europe/Vienna as epoch seconds
+    return int(datetime(day.year, day.month, day.day, tzinfo=_TZ_VIENNA).timestamp())
+
+
+def day_of(timestamp: Union[date, datetime]) -> date:
+    # day a value belongs to, 15min timestamps (and peak demand times) mark the end of their interval so 00:00 still
+    # belongs to the previous day
+    return (timestamp - _INTERVAL).date() if isinstance(timestamp, datetime) else timestamp
+
+
+def _to_epoch(timestamp: Union[date, datetime]) -> int:
+    return int(timestamp.timestamp()) if isinstance(timestamp, datetime) else day_start(timestamp)
+
+
+def _from_epoch(timestamp: int, is_date: bool) -> Union[date, datetime]:
+    converted = datetime.fromtimestamp(timestamp, _TZ_VIENNA)
+    return converted.date() if is_date else converted
+
+
+def _fill_columns(series: Dict[str, list], timestamps: array,
+                  values: Dict[str, array], qualities: Dict[str, array]) -> None:
+    index = {timestamp: position for position, timestamp in enumerate(timestamps)}
+    for name, entries in series.items():
+        if name in QUALITY_FIELDS:
+            quality_column = array('B', bytes(len(timestamps)))
+            for timestamp, quality in entries:
+                quality_column[index[_to_epoch(timestamp)]] = QUALITY_CODES[quality]
+            qualities[name] = quality_column
+        else:
+            value_column = array('d', [math.nan]) * len(timestamps)
+            for timestamp, value in entries:
+                value_column[index[_to_epoch(timestamp)]] = value
+            values[name] = value_column
+
+
+def _to_columnar(result: Union[SmartmeterResult, SmartmeterResultYearly]) -> SmartmeterColumnarResult:
+    series = {result_field.name: getattr(result, result_field.name) for result_field in fields(result)}
+    interval_series = {name: entries for name, entries in series.items() if name not in PEAK_DEMAND_FIELDS}
+    peak_demand_series = {name: entries for name, entries in series.items() if name in PEAK_DEMAND_FIELDS}
+
+    first = next((entries[0][0] for entries in interval_series.values() if entries), None)
+    columnar = SmartmeterColumnarResult(
+        is_date=isinstance(result, SmartmeterResultYearly) if first is None else not isinstance(first, datetime),
+        timestamps=array('q', sorted({
+            _to_epoch(timestamp) for entries in interval_series.values() for timestamp, _ in entries
+        })),
+        peak_demand_timestamps=array('q', sorted({
+            _to_epoch(timestamp) for entries in peak_demand_series.values() for timestamp, _ in entries
+        })),
+    )
+    _fill_columns(interval_series, columnar.timestamps, columnar.values, columnar.qualities)
+    _fill_columns(peak_demand_series, columnar.peak_demand_timestamps,
+                  columnar.peak_demand_values, columnar.peak_demand_qualities)
+    return columnar
+
+
+def _from_columnar(cls: Type[ResultType], columnar: SmartmeterColumnarResult) -> ResultType:
+    timestamps = [_from_epoch(timestamp, columnar.is_date) for timestamp in columnar.timestamps]
+    # peak demands always carry the exact time of the peak
+    peak_demand_timestamps = [_from_epoch(timestamp, False) for timestamp in columnar.peak_demand_timestamps]
+
+    def decode(name: str) -> list:
+        axis = peak_demand_timestamps if name in PEAK_DEMAND_FIELDS else timestamps
+        values = columnar.peak_demand_values if name in PEAK_DEMAND_FIELDS else columnar.values
+        qualities = columnar.peak_demand_qualities if name in PEAK_DEMAND_FIELDS else columnar.qualities
+        if name in qualities:
+            return [(timestamp, _QUALITIES_BY_CODE[code]) for timestamp, code in zip(axis, qualities[name]) if code]
+        if name in values:
+            return [(timestamp, value) for timestamp, value in zip(axis, values[name]) if not math.isnan(value)]
+        return []
+
+    return cls(**{result_field.name: decode(result_field.name) for result_field in fields(cls)})
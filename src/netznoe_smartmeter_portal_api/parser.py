@@ -0,0 +1,241 @@
+import codecs
+import json
+import re
+from dataclasses import fields
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union, Tuple
+from zoneinfo import ZoneInfo
+
+from .models import (
+    PEAK_DEMAND_FIELDS,
+    SmartmeterDataQuality,
+    SmartmeterResult,
+    SmartmeterResultYearly,
+)
+
+TZ_UTC = ZoneInfo('UTC')
+TZ_VIENNA = ZoneInfo('Europe/Vienna')
+
+_JSON_TOKENS = re.compile(r'["{}\[\]]')
+_JSON_STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+
+_QUALITIES: Dict[object, SmartmeterDataQuality] = {quality.value: quality for quality in SmartmeterDataQuality}
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    # Incrementally decodes a JSON array of objects/arrays (e.g. the per energy community blocks of a
+    # ConsumptionRecord response) and yields each element as soon as it is complete, so only one element and the
+    # current chunk are held in memory.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    depth = 0
+    element_start: Optional[int] = None
+    in_string = False
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        while True:
+            if in_string:
+                string_end = _JSON_STRING_END.match(buffer, position)
+                if string_end is None:
+                    break
+                position = string_end.end()
+                in_string = False
+                continue
+
+            token = _JSON_TOKENS.search(buffer, position)
+            if token is None:
+                position = len(buffer)
+                break
+            position = token.end()
+            if token.group() == '"':
+                in_string = True
+            elif token.group() in '{[':
+                depth += 1
+                if depth == 2:
+                    element_start = token.start()
+            else:
+                depth -= 1
+                if depth == 1 and element_start is not None:
+                    yield json.loads(buffer[element_start:position])
+                    element_start = None
+                elif depth == 0:
+                    return
+
+            if element_start is None:
+                # drop everything already consumed between the elements
+                buffer = buffer[position:]
+                position = 0
+    raise ValueError('Unexpected end of JSON array')
+
+
+def calc_next_datetime(current_time: Union[date, datetime], time_increase: Dict[str, int]) -> Union[date, datetime]:
+    if 'months' in time_increase and isinstance(current_time, date):
+        next_month = current_time.month + time_increase['months']
+        next_year = current_time.year + int(next_month / 12) if next_month > 12 else current_time.year
+        next_month = 12 if next_month % 12 == 0 else next_month % 12
+        return date(next_year, next_month, current_time.day)
+    elif 'days' in time_increase or 'minutes' in time_increase:
+        return current_time + timedelta(**time_increase)
+    else:
+        raise ValueError('Unsupported time_increase interval')
+
+
+def calc_time_axis(base_time: Union[date, datetime], time_increase: Dict[str, int],
+                   length: int) -> List[Union[date, datetime]]:
+    # Timestamps of all slots of a response. Datetimes are stepped in UTC and converted to Europe/Vienna afterwards,
+    # so days with a DST switch get their 92 or 100 slots.
+    if 'months' in time_increase:
+        axis: List[Union[date, datetime]] = []
+        for _ in range(length):
+            axis.append(base_time)
+            base_time = calc_next_datetime(base_time, time_increase)
+        return axis
+    if 'days' not in time_increase and 'minutes' not in time_increase:
+        raise ValueError('Unsupported time_increase interval')
+
+    step = timedelta(**time_increase)
+    if isinstance(base_time, datetime):
+        return [(base_time + step * index).astimezone(TZ_VIENNA) for index in range(length)]
+    return [base_time + step * index for index in range(length)]
+
+
+def get_values(data: dict, field: str, time_axis: Sequence[Union[date, datetime]]
+               ) -> List[Tuple[Union[date, datetime], Union[float, SmartmeterDataQuality]]]:
+    return [
+        (time_axis[index], _QUALITIES.get(value, value))
+        for index, value in enumerate(data.get(field, [])) if value is not None
+    ]
+
+
+def parse_peak_demand_times(data: dict) -> List[Optional[datetime]]:
+    # peakDemandTimes are shared by all peak demand series of a response and parsed once, they are UTC timestamps
+    # without offset ('2023-03-31T22:15:00') which fromisoformat parses much faster than strptime
+    return [
+        datetime.fromisoformat(value).replace(tzinfo=TZ_UTC).astimezone(TZ_VIENNA) if value else None
+        for value in data.get('peakDemandTimes', [])
+    ]
+
+
+def process_peak_demand(data: dict, field: str, peak_demand_times: Optional[Sequence[Optional[datetime]]] = None
+                        ) -> List[Tuple[datetime, Union[float, SmartmeterDataQuality]]]:
+    if peak_demand_times is None:
+        peak_demand_times = parse_peak_demand_times(data)
+    results: List[Tuple[datetime, Union[float, SmartmeterDataQuality]]] = []
+    for cnt, value in enumerate(data.get(field, [])):
+        if value is not None:
+            timestamp = peak_demand_times[cnt]
+            if timestamp is None:
+                raise ValueError(f'Missing peak demand time of {field}')
+            results.append((timestamp, _QUALITIES.get(value, value)))
+    return results
+
+
+def _time_axis_of(data: dict, base_time: Union[date, datetime],
+                  time_increase: Dict[str, int]) -> List[Union[date, datetime]]:
+    # one axis per response, long enough for the longest series
+    length = max((len(values) for values in data.values() if isinstance(values, list)), default=0)
+    return calc_time_axis(base_time, time_increase, length)
+
+
+# model field: response field
+_RESULT_FIELDS: Dict[str, str] = {
+    'metered': 'meteredValues',
+    'estimated': 'estimatedValues',
+    'estimated_qualities': 'estimatedQualities',
+    'grid_usage_leftover': 'gridUsageLeftoverValues',
+    'quality_ec': 'qualityEC',
+    'self_coverage': 'selfCoverageValues',
+    'joint_tenancy_proportion': 'jointTenancyProportionValues',
+    'metered_peak_demands': 'meteredPeakDemands',
+    'estimated_peak_demands': 'estimatedPeakDemands',
+    'peak_demand_data_qualities': 'peakDemandDataQualities',
+    'self_coverage_renewable_energy': 'selfCoverageRenewableEnergyValue',
+    'blind_consumption': 'blindConsumptionValue',
+    'blind_power_feed': 'blindPowerFeedValue',
+}
+_RESULT_YEARLY_FIELDS: Dict[str, str] = {
+    'values': 'values',
+    'grid_usage_leftover': 'gridUsageLeftoverValues',
+    'blind_consumption': 'blindConsumptionValue',
+    'blind_power_feed': 'blindPowerFeedValue',
+    'self_coverage': 'selfCoverageValues',
+    'joint_tenancy_proportion': 'jointTenancyProportionValues',
+    'self_coverage_renewable_energy': 'selfCoverageRenewableEnergyValue',
+    'peak_demands': 'peakDemands',
+}
+
+
+def _decode_fields(api_fields: Dict[str, str], data: dict, base_time: Union[date, datetime],
+                   time_increase: Dict[str, int]) -> Dict[str, list]:
+    time_axis = _time_axis_of(data, base_time, time_increase)
+    peak_demand_times = parse_peak_demand_times(data)
+    decoded: Dict[str, list] = {}
+    for name, api_field in api_fields.items():
+        if name in PEAK_DEMAND_FIELDS:
+            decoded[name] = process_peak_demand(data, api_field, peak_demand_times)
+        else:
+            decoded[name] = get_values(data, api_field, time_axis)
+    return decoded
+
+
+class _LazyFields:
+    # Keeps the raw response block and decodes a field on its first access, decoded fields are stored as ordinary
+    # instance attributes. Instances created with the regular dataclass constructor are not lazy at all.
+    _api_fields: Dict[str, str] = {}
+
+    @classmethod
+    def from_response(cls, base_time: Union[date, datetime], data: dict, time_increase: Dict[str, int]) -> Any:
+        result = cls.__new__(cls)
+        result.__dict__.update(_data=data, _base_time=base_time, _time_increase=time_increase)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes which are not set yet
+        state = self.__dict__
+        api_field = self._api_fields.get(name)
+        if api_field is None or '_data' not in state:
+            raise AttributeError(name)
+        value: list
+        if name in PEAK_DEMAND_FIELDS:
+            if '_peak_demand_times' not in state:
+                state['_peak_demand_times'] = parse_peak_demand_times(state['_data'])
+            value = process_peak_demand(state['_data'], api_field, state['_peak_demand_times'])
+        else:
+            if '_time_axis' not in state:
+                # shared by all fields of the response
+                state['_time_axis'] = _time_axis_of(state['_data'], state['_base_time'], state['_time_increase'])
+            value = get_values(state['_data'], api_field, state['_time_axis'])
+        state[name] = value
+        return value
+
+    def __eq__(self, other: object) -> bool:
+        # equal to eager results with the same values
+        if not isinstance(other, (SmartmeterResult, SmartmeterResultYearly)) or \
+                set(self._api_fields) != {result_field.name for result_field in fields(other)}:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._api_fields)
+
+
+class SmartmeterLazyResult(_LazyFields, SmartmeterResult):
+    # SmartmeterResult decoding its fields on first access, see to_smartmeter_result(lazy=True)
+    _api_fields = _RESULT_FIELDS
+
+
+class SmartmeterLazyResultYearly(_LazyFields, SmartmeterResultYearly):
+    # SmartmeterResultYearly decoding its fields on first access, see to_smartmeter_result_yearly(lazy=True)
+    _api_fields = _RESULT_YEARLY_FIELDS
+
+
+def to_smartmeter_result(base_time: Union[date, datetime], data: dict, time_increase: Dict[str, int],
+                         lazy: bool = False) -> SmartmeterResult:
+    if lazy:
+        return SmartmeterLazyResult.from_response(base_time, data, time_increase)
+    return SmartmeterResult(**_decode_fields(_RESULT_FIELDS, data, base_time, time_increase))
+
+
+def to_smartmeter_result_yearly(base_time: date, data: dict, time_increase: Dict[str, int],
+                                lazy: bool = False) -> SmartmeterResultYearly:
+    if lazy:
+        return SmartmeterLazyResultYearly.from_response(base_time, data, time_increase)
+    return SmartmeterResultYearly(**_decode_fields(_RESULT_YEARLY_FIELDS, data, base_time, time_increase))
@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from .api import NetzNoeSmartmeterPortalApi, NetzNoeSmartmeterPortalDataError
+from .instrumentation import SmartmeterObserver
+from .throttle import SmartmeterConcurrencyController, SmartmeterRateLimiter
+
+JobResult = TypeVar('JobResult')
+
+
+@dataclass
+class SmartmeterAccountStats:
+    username: str
+    jobs: int = 0
+    failures: int = 0
+    relogins: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        # finished jobs per second the account was busy
+        return self.jobs / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+
+class _PooledAccount:
+    def __init__(self, username: str, password: str, max_concurrency: int,
+                 rate_limiter: Optional[SmartmeterRateLimiter], concurrency: Optional[SmartmeterConcurrencyController],
+                 observers: Sequence[SmartmeterObserver]):
+        self.api = NetzNoeSmartmeterPortalApi(username, password, pool_maxsize=max_concurrency,
+                                              rate_limiter=rate_limiter, concurrency=concurrency, observers=observers)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f'smartmeter-{username}')
+        self.stats = SmartmeterAccountStats(username=username)
+        self.meter_ids: List[str] = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.busy_since = 0.0
+
+
+class SmartmeterSessionPool:
+    # Holds one authenticated client per portal login and runs per meter jobs on the client owning the meter. Every
+    # account has its own worker threads (max_concurrency_per_account), jobs of different accounts are interleaved.
+    # A job failing with NetzNoeSmartmeterPortalDataError is retried once after logging in again. A rate_limiter and
+    # concurrency controller are shared by all accounts, since all of them hit the same portal.
+
+    def __init__(self, credentials: Sequence[Tuple[str, str]], max_concurrency_per_account: int = 2,
+                 rate_limiter: Optional[SmartmeterRateLimiter] = None,
+                 concurrency: Optional[SmartmeterConcurrencyController] = None,
+                 observers: Iterable[SmartmeterObserver] = ()):
+        if max_concurrency_per_account < 1:
+            raise ValueError('max_concurrency_per_account must be at least 1')
+        observers = list(observers)
+        self.__accounts = [
+            _PooledAccount(username, password, max_concurrency_per_account, rate_limiter, concurrency, observers)
+            for username, password in credentials
+        ]
+        self.__meters: Dict[str, _PooledAccount] = {}
+
+    def login(self) -> None:
+        # logs in all accounts concurrently and discovers their metering points
+        with ThreadPoolExecutor(max_workers=max(len(self.__accounts), 1)) as executor:
+            list(executor.map(self.__login, self.__accounts))
+        self.__meters = {}
+        for account in self.__accounts:
+            for meter_id in account.meter_ids:
+                self.__meters.setdefault(meter_id, account)
+
+    def logout(self) -> None:
+        for account in self.__accounts:
+            account.api.do_logout()
+
+    def close(self) -> None:
+        for account in self.__accounts:
+            account.executor.shutdown(wait=True)
+
+    def meter_ids(self) -> List[str]:
+        return list(self.__meters.keys())
+
+    def stats(self) -> List[SmartmeterAccountStats]:
+        return [account.stats for account in self.__accounts]
+
+    def run(self, job: Callable[[NetzNoeSmartmeterPortalApi, str], JobResult],
+            meter_ids: Optional[Iterable[str]] = None) -> Dict[str, JobResult]:
+        meter_ids = self.meter_ids() if meter_ids is None else list(meter_ids)
+        per_account: Dict[int, List[Tuple[_PooledAccount, str]]] = {}
+        for meter_id in meter_ids:
+            if meter_id not in self.__meters:
+                raise ValueError(f'Unknown meter_id "{meter_id}"')
+            account = self.__meters[meter_id]
+            per_account.setdefault(id(account), []).append((account, meter_id))
+
+        # submitting round robin keeps one account's backlog from delaying the others
+        futures: Dict[str, Future] = {}
+        for account, meter_id in filter(None, itertools.chain.from_iterable(
+                itertools.zip_longest(*per_account.values()))):
+            futures[meter_id] = account.executor.submit(self.__execute, account, job, meter_id)
+        return {meter_id: futures[meter_id].result() for meter_id in meter_ids}
+
+    @staticmethod
+    def __login(account: _PooledAccount) -> None:
+        account.api.do_login()
+        account.meter_ids = [meter.metering_point_id for meter in account.api.get_metering_points()]
+
+    @staticmethod
+    def __execute(account: _PooledAccount, job: Callable[[NetzNoeSmartmeterPortalApi, str], JobResult],
+                  meter_id: str) -> JobResult:
+        with account.lock:
+            if account.running == 0:
+                account.busy_since = time.perf_counter()
+            account.running += 1
+        try:
+            try:
+                result = job(account.api, meter_id)
+            except NetzNoeSmartmeterPortalDataError:
+                # most likely the session expired
+                with account.lock:
+                    account.stats.relogins += 1
+                account.api.do_login()
+                result = job(account.api, meter_id)
+        except Exception:
+            with account.lock:
+                account.stats.failures += 1
+            raise
+        else:
+            with account.lock:
+                account.stats.jobs += 1
+            return result
+        finally:
+            with account.lock:
+                account.running -= 1
+                if account.running == 0:
+                    account.stats.busy_seconds += time.perf_counter() - account.busy_since
@@ -0,0 +1,189 @@
+import math
+from bisect import bisect_left
+import sqlite3
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from .models import (
+    PEAK_DEMAND_FIELDS,
+    QUALITY_CODES,
+    QUALITY_FIELDS,
+    SmartmeterColumnarResult,
+    SmartmeterDataQuality,
+    SmartmeterResolution,
+    SmartmeterResult,
+    SmartmeterResultYearly,
+    _from_epoch,
+    day_of,
+    day_start,
+)
+
+_TZ_VIENNA = ZoneInfo('Europe/Vienna')
+_FINAL_CODES = (0, QUALITY_CODES[SmartmeterDataQuality.L1])
+
+
+def _to_result(columns: Iterable[Tuple[str, int, Optional[float], int]], resolution: SmartmeterResolution,
+               ) -> Union[SmartmeterResult, SmartmeterResultYearly]:
+    rows = list(columns)
+    columnar = SmartmeterColumnarResult(
+        is_date=resolution != SmartmeterResolution.QUARTER_HOUR,
+        timestamps=array('q', sorted({timestamp for name, timestamp, _, _ in rows if name not in PEAK_DEMAND_FIELDS})),
+        peak_demand_timestamps=array('q', sorted({timestamp for name, timestamp, _, _ in rows
+                                                  if name in PEAK_DEMAND_FIELDS})),
+    )
+    for name, timestamp, value, quality in rows:
+        peak_demand = name in PEAK_DEMAND_FIELDS
+        timestamps = columnar.peak_demand_timestamps if peak_demand else columnar.timestamps
+        if name in QUALITY_FIELDS:
+            qualities = columnar.peak_demand_qualities if peak_demand else columnar.qualities
+            if name not in qualities:
+                qualities[name] = array('B', bytes(len(timestamps)))
+            qualities[name][bisect_left(timestamps, timestamp)] = quality
+        else:
+            values = columnar.peak_demand_values if peak_demand else columnar.values
+            if name not in values:
+                values[name] = array('d', [math.nan]) * len(timestamps)
+            values[name][bisect_left(timestamps, timestamp)] = value
+    if resolution == SmartmeterResolution.MONTH:
+        return SmartmeterResultYearly.from_columnar(columnar)
+    return SmartmeterResult.from_columnar(columnar)
+
+
+def _rows(meter_id: str, resolution: str,
+          columnar: SmartmeterColumnarResult) -> Iterator[Tuple[str, str, str, int, Union[float, None], int, int]]:
+    final = columnar.final_slots()
+    for name, column in columnar.values.items():
+        for index, value in enumerate(column):
+            if not math.isnan(value):
+                yield meter_id, resolution, name, columnar.timestamps[index], value, 0, int(final[index])
+    for name, codes in columnar.qualities.items():
+        for index, code in enumerate(codes):
+            if code:
+                yield meter_id, resolution, name, columnar.timestamps[index], None, code, int(final[index])
+
+    peak_demand_qualities = columnar.peak_demand_qualities.get('peak_demand_data_qualities')
+    for name, column in columnar.peak_demand_values.items():
+        for index, value in enumerate(column):
+            if not math.isnan(value):
+                peak_final = peak_demand_qualities is None or peak_demand_qualities[index] in _FINAL_CODES
+                yield meter_id, resolution, name, columnar.peak_demand_timestamps[index], value, 0, int(peak_final)
+    for name, codes in columnar.peak_demand_qualities.items():
+        for index, code in enumerate(codes):
+            if code:
+                yield meter_id, resolution, name, columnar.peak_demand_timestamps[index], None, code, \
+                    int(code in _FINAL_CODES)
+
+
+class SmartmeterStore:
+    # Local SQLite store of fetched values, one row per meter, resolution, field and timestamp. Re-ingesting a period
+    # replaces all of its previously stored values, so re-fetched estimates never leave stale rows behind. Range
+    # queries are served by the primary key (meter, resolution, field, timestamp) or, for all fields, by the
+    # (meter, resolution, timestamp) index.
+
+    def __init__(self, path: Union[str, Path]):
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS measurements ('
+            'meter_id TEXT NOT NULL, resolution TEXT NOT NULL, field TEXT NOT NULL, timestamp INTEGER NOT NULL, '
+            'value REAL, quality INTEGER NOT NULL, final INTEGER NOT NULL, '
+            'PRIMARY KEY (meter_id, resolution, field, timestamp)) WITHOUT ROWID'
+        )
+        self.__connection.execute(
+            'CREATE INDEX IF NOT EXISTS measurements_timestamp ON measurements (meter_id, resolution, timestamp)'
+        )
+        self.__connection.commit()
+
+    def ingest(self, meter_id: str, result: Union[SmartmeterResult, SmartmeterResultYearly],
+               resolution: Optional[SmartmeterResolution] = None) -> None:
+        # without resolution it is derived from the result: yearly results are monthly values, results with dates
+        # daily values and results with datetimes 15min values
+        self.ingest_many(meter_id, [result], resolution)
+
+    def ingest_many(self, meter_id: str, results: Iterable[Union[SmartmeterResult, SmartmeterResultYearly]],
+                    resolution: Optional[SmartmeterResolution] = None) -> None:
+        # ingests a batch of results in one transaction
+        with self.__lock:
+            with self.__connection:
+                for result in results:
+                    self.__ingest(meter_id, result, resolution)
+
+    def query(self, meter_id: str, start_date: date, end_date: date,
+              resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR,
+              fields: Optional[Sequence[str]] = None) -> Union[SmartmeterResult, SmartmeterResultYearly]:
+        # stored values of the days start_date to end_date (inclusive, monthly values of all months they touch) as
+        # result of the resolution (a SmartmeterResultYearly for monthly values), with fields only these fields are read
+        if start_date > end_date:
+            raise ValueError('start_date must not be after end_date')
+        lower = day_start(start_date)
+        upper = day_start(end_date + timedelta(days=1))
+        if resolution == SmartmeterResolution.MONTH:
+            # monthly values are stored at the first of their month, their peak demands at any time of the month
+            lower = day_start(start_date.replace(day=1))
+            upper = day_start((end_date.replace(day=28) + timedelta(days=4)).replace(day=1))
+        elif resolution == SmartmeterResolution.QUARTER_HOUR:
+            # a 15min value belongs to the day before its timestamp (see day_of), midnight included
+            lower, upper = lower + 1, upper + 1
+        sql = ('SELECT field, timestamp, value, quality FROM measurements '
+               'WHERE meter_id = ? AND resolution = ? AND timestamp >= ? AND timestamp < ?')
+        parameters: List[Union[str, int]] = [meter_id, resolution.value, lower, upper]
+        if fields is not None:
+            sql += f" AND field IN ({', '.join('?' * len(fields))})"
+            parameters.extend(fields)
+        with self.__lock:
+            rows = self.__connection.execute(sql, parameters).fetchall()
+        return _to_result(rows, resolution)
+
+    def high_water_marks(self, meter_id: str, resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR
+                         ) -> Dict[str, datetime]:
+        # latest timestamp with final data per field
+        with self.__lock:
+            rows = self.__connection.execute(
+                'SELECT field, MAX(timestamp) FROM measurements '
+                'WHERE meter_id = ? AND resolution = ? AND final = 1 GROUP BY field',
+                (meter_id, resolution.value)
+            ).fetchall()
+        return {field: datetime.fromtimestamp(timestamp, _TZ_VIENNA) for field, timestamp in rows}
+
+    def non_final_days(self, meter_id: str, start_date: date, end_date: date,
+                       resolution: SmartmeterResolution = SmartmeterResolution.QUARTER_HOUR) -> List[date]:
+        # days between start_date and end_date which contain estimated or otherwise non final slots
+        first_day = start_date - timedelta(days=1)
+        last_day = end_date + timedelta(days=2)
+        with self.__lock:
+            rows = self.__connection.execute(
+                'SELECT DISTINCT timestamp FROM measurements '
+                'WHERE meter_id = ? AND resolution = ? AND final = 0 AND timestamp BETWEEN ? AND ?',
+                (meter_id, resolution.value, day_start(first_day), day_start(last_day))
+            ).fetchall()
+        is_date = resolution != SmartmeterResolution.QUARTER_HOUR
+        days: Set[date] = {day_of(_from_epoch(timestamp, is_date)) for timestamp, in rows}
+        return sorted(day for day in days if start_date <= day <= end_date)
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    def __ingest(self, meter_id: str, result: Union[SmartmeterResult, SmartmeterResultYearly],
+                 resolution: Optional[SmartmeterResolution]) -> None:
+        columnar = result.to_columnar()
+        if resolution is None:
+            if isinstance(result, SmartmeterResultYearly):
+                resolution = SmartmeterResolution.MONTH
+            else:
+                resolution = SmartmeterResolution.DAY if columnar.is_date else SmartmeterResolution.QUARTER_HOUR
+        timestamps = list(columnar.timestamps) + list(columnar.peak_demand_timestamps)
+        if not timestamps:
+            return
+        self.__connection.execute(
+            'DELETE FROM measurements WHERE meter_id = ? AND resolution = ? AND timestamp BETWEEN ? AND ?',
+            (meter_id, resolution.value, min(timestamps), max(timestamps))
+        )
+        self.__connection.executemany(
+            'INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?, ?, ?, ?)',
+            _rows(meter_id, resolution.value, columnar)
+        )
@@ -0,0 +1,55 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from .api import NetzNoeSmartmeterPortalApi, _date_range
+from .models import SmartmeterResolution
+from .store import SmartmeterStore
+
+
+@dataclass
+class SmartmeterSyncResult:
+    meter_id: str
+    fetched_days: List[date] = field(default_factory=list)
+    # earliest high-water mark of the synced fields after the sync
+    high_water_mark: Optional[datetime] = None
+
+
+class SmartmeterSync:
+    # Incrementally syncs 15min values into a SmartmeterStore. Per meter only the days after the high-water mark of the
+    # synced fields (the last timestamp with final data) are fetched, plus days within revalidate_days before end_date
+    # which still contain estimated values.
+
+    def __init__(self, api: NetzNoeSmartmeterPortalApi, store: SmartmeterStore, revalidate_days: int = 14):
+        self.__api = api
+        self.__store = store
+        self.__revalidate_days = revalidate_days
+
+    def sync(self, meter_id: str, start_date: date, end_date: Optional[date] = None,
+             fields: Sequence[str] = ('metered',)) -> SmartmeterSyncResult:
+        end_date = end_date or datetime.now(ZoneInfo('Europe/Vienna')).date()
+
+        tail_start = start_date
+        marks = self.__store.high_water_marks(meter_id, SmartmeterResolution.QUARTER_HOUR)
+        if all(name in marks for name in fields):
+            # a mark at midnight is the last interval of the previous day
+            tail_start = max(start_date, min(marks[name] for name in fields).date())
+
+        revalidate_start = max(start_date, end_date - timedelta(days=self.__revalidate_days))
+        days = {
+            day for day in self.__store.non_final_days(meter_id, revalidate_start, end_date,
+                                                       SmartmeterResolution.QUARTER_HOUR)
+            if day < tail_start
+        }
+        if tail_start <= end_date:
+            days.update(_date_range(tail_start, end_date))
+
+        result = SmartmeterSyncResult(meter_id=meter_id, fetched_days=sorted(days))
+        for day in result.fetched_days:
+            self.__store.ingest(meter_id, self.__api.get_day(meter_id, day), SmartmeterResolution.QUARTER_HOUR)
+
+        marks = self.__store.high_water_marks(meter_id, SmartmeterResolution.QUARTER_HOUR)
+        if all(name in marks for name in fields):
+            result.high_water_mark = min(marks[name] for name in fields)
+        return result
@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Optional
+
+
+class SmartmeterRateLimiter:
+    # Token bucket: every request takes one token, tokens are refilled with rate per second up to burst. One instance
+    # can be shared by several clients to limit the total request rate of a process.
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.__rate = rate
+        self.__burst = burst
+        self.__tokens = float(burst)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+                self.__updated = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait = (1 - self.__tokens) / self.__rate
+            time.sleep(wait)
+
+
+class SmartmeterConcurrencyController:
+    # Adaptive limit of concurrent requests (AIMD): every successful response raises the limit by 1 / limit, so it
+    # grows by one per round of requests, throttled or failed responses and responses slower than latency_tolerance
+    # times the fastest observed latency cut it by decrease_factor. The limit is cut at most once per round, so one
+    # burst of errors does not collapse it to min_limit. One instance can be shared by several clients.
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 4.0):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('min_limit <= initial_limit <= max_limit must hold and min_limit must be at least 1')
+        if not 0 < decrease_factor < 1:
+            raise ValueError('decrease_factor must be between 0 and 1')
+        self.__min_limit = min_limit
+        self.__max_limit = max_limit
+        self.__decrease_factor = decrease_factor
+        self.__latency_tolerance = latency_tolerance
+        self.__limit = float(initial_limit)
+        self.__in_flight = 0
+        self.__min_latency: Optional[float] = None
+        self.__since_decrease = initial_limit
+        self.__condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self.__limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self.__in_flight
+
+    def acquire(self) -> None:
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__in_flight < int(self.__limit))
+            self.__in_flight += 1
+
+    def release(self, latency: float, congested: bool = False) -> None:
+        # congested: the request was throttled or failed for reasons of the portal, not of the request itself
+        with self.__condition:
+            self.__in_flight -= 1
+            self.__since_decrease += 1
+            if not congested:
+                if self.__min_latency is None or latency < self.__min_latency:
+                    self.__min_latency = latency
+                congested = latency > self.__latency_tolerance * self.__min_latency
+
+            if not congested:
+                self.__limit = min(self.__max_limit, self.__limit + 1 / self.__limit)
+            elif self.__since_decrease >= self.__limit:
+                self.__limit = max(self.__min_limit, self.__limit * self.__decrease_factor)
+                self.__since_decrease = 0
+            self.__condition.notify_all()
@@ -4,7 +4,7 @@ from pathlib import Path
 import pytest
 
 import responses
-from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi
+from netznoe_smartmeter_portal_api import AsyncNetzNoeSmartmeterPortalApi, NetzNoeSmartmeterPortalApi
 
 
 @pytest.fixture
@@ -12,6 +12,11 @@ def api():
     return NetzNoeSmartmeterPortalApi(username='localtest', password='localtest')
 
 
+@pytest.fixture
+def async_api():
+    return AsyncNetzNoeSmartmeterPortalApi(username='localtest', password='localtest')
+
+
 class ImprovedRequestsMock(responses.RequestsMock):
     def get(self, url, filename, status=200, **kwargs):
         body = self._get_body(filename)
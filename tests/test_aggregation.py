@@ -0,0 +1,132 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from netznoe_smartmeter_portal_api import (
+    NetzNoeSmartmeterPortalApi,
+    SmartmeterDataQuality,
+    SmartmeterMemo,
+    SmartmeterResolution,
+    SmartmeterResponseCache,
+)
+from netznoe_smartmeter_portal_api.aggregation import aggregate
+from netznoe_smartmeter_portal_api.parser import to_smartmeter_result
+
+METER_ID = 'ATxxTEST'
+TZ_VIENNA = ZoneInfo('Europe/Vienna')
+TZ_UTC = ZoneInfo('UTC')
+
+
+def quarter_hours(day: date, slots: int = 96):
+    base_time = datetime(day.year, day.month, day.day, 0, 15, tzinfo=TZ_VIENNA).astimezone(TZ_UTC)
+    peak_times = [(base_time + timedelta(minutes=15 * index)).strftime('%Y-%m-%dT%H:%M:%S') for index in range(slots)]
+    data = {
+        'meteredValues': [0.25] * slots,
+        'estimatedValues': [None] * slots,
+        'estimatedQualities': [None] * slots,
+        'qualityEC': ['L1'] * slots,
+        'meteredPeakDemands': [float(index % 10) for index in range(slots)],
+        'peakDemandDataQualities': ['L1'] * slots,
+        'peakDemandTimes': peak_times,
+    }
+    # one estimated slot in the afternoon
+    data['meteredValues'][60] = None
+    data['estimatedValues'][60] = 0.5
+    data['estimatedQualities'][60] = 'L2'
+    data['qualityEC'][60] = 'L3'
+    data['peakDemandDataQualities'][60] = 'L2'
+    return to_smartmeter_result(base_time, data, time_increase={'minutes': 15})
+
+
+def test_aggregate_hourly():
+    result = aggregate([quarter_hours(date(2023, 4, 1))], SmartmeterResolution.HOUR)
+    assert len(result.metered) == 24
+    # hours are marked by their end like the 15min values
+    assert result.metered[0] == (datetime(2023, 4, 1, 1, 0, tzinfo=TZ_VIENNA), 1.0)
+    assert result.metered[-1][0] == datetime(2023, 4, 2, 0, 0, tzinfo=TZ_VIENNA)
+    assert result.metered[15] == (datetime(2023, 4, 1, 16, 0, tzinfo=TZ_VIENNA), 0.75)
+    assert result.estimated == [(datetime(2023, 4, 1, 16, 0, tzinfo=TZ_VIENNA), 0.5)]
+    assert result.estimated_qualities == [(datetime(2023, 4, 1, 16, 0, tzinfo=TZ_VIENNA), SmartmeterDataQuality.L2)]
+    assert result.quality_ec[14:16] == [
+        (datetime(2023, 4, 1, 15, 0, tzinfo=TZ_VIENNA), SmartmeterDataQuality.L1),
+        (datetime(2023, 4, 1, 16, 0, tzinfo=TZ_VIENNA), SmartmeterDataQuality.L3),
+    ]
+    # slots 0 to 3 have peaks 0, 1, 2 and 3
+    assert result.metered_peak_demands[0] == (datetime(2023, 4, 1, 1, 0, tzinfo=TZ_VIENNA), 3.0)
+
+
+def test_aggregate_hourly_dst():
+    assert len(aggregate([quarter_hours(date(2023, 3, 26), 92)], SmartmeterResolution.HOUR).metered) == 23
+    result = aggregate([quarter_hours(date(2023, 10, 29), 100)], SmartmeterResolution.HOUR)
+    assert len(result.metered) == 25
+    # the hours ending at 02:00 CEST and 02:00 CET are kept apart
+    assert [(timestamp.hour, timestamp.utcoffset()) for timestamp, _ in result.metered[1:4]] == [
+        (2, timedelta(hours=2)), (2, timedelta(hours=1)), (3, timedelta(hours=1))
+    ]
+    assert sum(value for _, value in result.metered) == 99 * 0.25
+
+
+def test_aggregate_daily():
+    days = [quarter_hours(date(2023, 4, 1)), quarter_hours(date(2023, 4, 2))]
+    result = aggregate(days, SmartmeterResolution.DAY)
+    assert result.metered == [(date(2023, 4, 1), 23.75), (date(2023, 4, 2), 23.75)]
+    assert result.estimated == [(date(2023, 4, 1), 0.5), (date(2023, 4, 2), 0.5)]
+    assert result.quality_ec == [(date(2023, 4, 1), SmartmeterDataQuality.L3),
+                                 (date(2023, 4, 2), SmartmeterDataQuality.L3)]
+    # the first slot with the maximum of 9 ends at 02:30
+    peak_time = datetime(2023, 4, 1, 2, 30, tzinfo=TZ_VIENNA)
+    assert result.metered_peak_demands[0] == (peak_time, 9.0)
+    assert result.peak_demand_data_qualities[0] == (peak_time, SmartmeterDataQuality.L2)
+    assert result.grid_usage_leftover == []
+
+
+def test_aggregate_monthly():
+    days = [quarter_hours(date(2023, 3, 31)), quarter_hours(date(2023, 4, 1))]
+    daily = aggregate(days, SmartmeterResolution.DAY)
+    monthly = aggregate([daily], SmartmeterResolution.MONTH)
+    assert monthly.metered == [(date(2023, 3, 1), 23.75), (date(2023, 4, 1), 23.75)]
+    assert aggregate(days, SmartmeterResolution.MONTH) == monthly
+
+
+def test_aggregate_errors():
+    with pytest.raises(ValueError) as excinfo:
+        aggregate([], SmartmeterResolution.QUARTER_HOUR)
+    assert str(excinfo.value) == 'Unsupported resolution'
+
+    daily = aggregate([quarter_hours(date(2023, 4, 1))], SmartmeterResolution.DAY)
+    with pytest.raises(ValueError) as excinfo:
+        aggregate([daily], SmartmeterResolution.HOUR)
+    assert str(excinfo.value) == 'Hourly aggregation requires 15min values'
+
+
+def test_get_week_from_memoized_days(response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Week', 'data_week')
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', memo=SmartmeterMemo(),
+                                     local_aggregation=True)
+
+    days = [api.get_day(METER_ID, date(2023, 4, day)) for day in (1, 2, 3)]
+    week = api.get_week(METER_ID, date(2023, 4, 1), date(2023, 4, 3))
+    assert len(response.calls) == 3
+    assert week == aggregate(days, SmartmeterResolution.DAY)
+    assert [timestamp for timestamp, _ in week.metered] == [date(2023, 4, 1), date(2023, 4, 2), date(2023, 4, 3)]
+
+    # a day which was not fetched yet falls back to the portal
+    api.get_week(METER_ID, date(2023, 4, 1), date(2023, 4, 4))
+    assert response.calls[-1].request.url.startswith(
+        'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Week'
+    )
+
+
+def test_get_month_from_cached_days(response, tmp_path):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite')
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache,
+                                     local_aggregation=True)
+
+    days = [api.get_day(METER_ID, date(2023, 2, day)) for day in range(1, 29)]
+    month = api.get_month(METER_ID, 2023, 2)
+    assert len(response.calls) == 28
+    assert month == aggregate(days, SmartmeterResolution.DAY)
+    cache.close()
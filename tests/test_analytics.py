@@ -0,0 +1,110 @@
+import math
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterResolution
+from netznoe_smartmeter_portal_api.analytics import analyze_communities
+from netznoe_smartmeter_portal_api.parser import to_smartmeter_result
+
+numpy = pytest.importorskip('numpy')
+
+TZ_VIENNA = ZoneInfo('Europe/Vienna')
+TZ_UTC = ZoneInfo('UTC')
+
+
+def slots_of(day: date) -> int:
+    next_day = day + timedelta(days=1)
+    start = datetime(day.year, day.month, day.day, tzinfo=TZ_VIENNA)
+    end = datetime(next_day.year, next_day.month, next_day.day, tzinfo=TZ_VIENNA)
+    return int(end.timestamp() - start.timestamp()) // 900
+
+
+def community_day(day: date, consumption: float, self_coverage: float, renewable: float):
+    # a day with a meter consuming per slot and one energy community covering part of it
+    slots = slots_of(day)
+    base_time = datetime(day.year, day.month, day.day, 0, 15, tzinfo=TZ_VIENNA).astimezone(TZ_UTC)
+    total = {'meteredValues': [consumption] * slots, 'estimatedValues': [None] * slots}
+    community = {
+        'ecId': 'AT00000000000000000000000EC0001',
+        'selfCoverageValues': [self_coverage] * slots,
+        'selfCoverageRenewableEnergyValue': [renewable] * slots,
+        'gridUsageLeftoverValues': [consumption - self_coverage] * slots,
+        'jointTenancyProportionValues': [None] * slots,
+    }
+    return {
+        'total': to_smartmeter_result(base_time, total, time_increase={'minutes': 15}),
+        'EC0001': to_smartmeter_result(base_time, community, time_increase={'minutes': 15}),
+    }
+
+
+def test_monthly_kpis():
+    # 26 March is a DST day with 92 slots, the first value of a day belongs to that day
+    days = [date(2023, 3, 26), date(2023, 3, 31), date(2023, 4, 1)]
+    analytics = analyze_communities(community_day(day, 0.25, 0.1, 0.05) for day in days)
+    assert analytics.periods == [date(2023, 3, 1), date(2023, 4, 1)]
+    kpis = analytics.communities['EC0001']
+    assert kpis.consumption == pytest.approx([(96 + 92) * 0.25, 96 * 0.25])
+    assert kpis.self_coverage == pytest.approx([(96 + 92) * 0.1, 96 * 0.1])
+    assert kpis.self_coverage_percent == pytest.approx([40.0, 40.0])
+    assert kpis.grid_usage_leftover_share == pytest.approx([0.6, 0.6])
+    assert kpis.renewable_energy_ratio == pytest.approx([0.5, 0.5])
+    assert kpis.allocation_share == pytest.approx([1.0, 1.0])
+    assert not kpis.joint_tenancy_proportion.any()
+    assert analytics.aggregate.self_coverage_percent == pytest.approx([40.0, 40.0])
+
+
+def test_daily_kpis_with_two_communities():
+    day = date(2023, 4, 1)
+    first = community_day(day, 0.25, 0.1, 0.1)
+    second = community_day(day, 0.25, 0.05, 0.0)
+    analytics = analyze_communities([{**first, 'EC0002': second['EC0001']}], SmartmeterResolution.DAY)
+    assert analytics.periods == [day]
+    assert analytics.communities['EC0001'].allocation_share == pytest.approx([2 / 3])
+    assert analytics.communities['EC0002'].allocation_share == pytest.approx([1 / 3])
+    assert analytics.communities['EC0002'].renewable_energy_ratio == pytest.approx([0.0])
+    assert analytics.aggregate.consumption == pytest.approx([24.0])
+    assert analytics.aggregate.self_coverage_percent == pytest.approx([60.0])
+    assert analytics.aggregate.renewable_energy_ratio == pytest.approx([0.1 / 0.15])
+
+
+def test_kpis_without_values_are_nan():
+    day = date(2023, 4, 1)
+    analytics = analyze_communities([community_day(day, 0.0, 0.0, 0.0)], SmartmeterResolution.DAY)
+    assert math.isnan(analytics.communities['EC0001'].self_coverage_percent[0])
+    assert math.isnan(analytics.communities['EC0001'].renewable_energy_ratio[0])
+
+
+def test_meter_without_communities():
+    analytics = analyze_communities([{'total': community_day(date(2023, 4, 1), 0.25, 0.0, 0.0)['total']}])
+    assert list(analytics.communities) == ['total']
+    assert analytics.aggregate.consumption == pytest.approx([24.0])
+    assert analytics.aggregate.self_coverage_percent == pytest.approx([0.0])
+
+
+def test_kpis_from_api(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    month = api.get_month_per_energy_community('ATxxTEST', 2023, 3)
+    analytics = analyze_communities([month])
+    assert analytics.periods[0] == date(2023, 3, 1)
+    kpis = next(iter(analytics.communities.values()))
+    assert kpis.consumption.shape == (len(analytics.periods),)
+
+
+def test_kpis_from_yearly_results(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    year = api.get_year_per_energy_community('ATxxTEST', 2023)
+    analytics = analyze_communities([year])
+    assert analytics.periods[0] == date(2023, 1, 1)
+    assert analytics.aggregate.consumption == pytest.approx([value for _, value in year['total'].values])
+
+    with pytest.raises(ValueError, match='Monthly values require resolution MONTH'):
+        analyze_communities([year], SmartmeterResolution.DAY)
+
+
+def test_unsupported_input():
+    with pytest.raises(ValueError, match='Unsupported resolution'):
+        analyze_communities([], SmartmeterResolution.HOUR)
+    with pytest.raises(ValueError, match='No values'):
+        analyze_communities([])
@@ -0,0 +1,113 @@
+import math
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterResult
+from netznoe_smartmeter_portal_api.archive import EPOCH, SLOT_SECONDS, SmartmeterArchive
+
+METER_ID = 'ATxxTEST'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = SmartmeterArchive(tmp_path / 'archive')
+    yield archive
+    archive.close()
+
+
+def test_write_and_read(api, response, archive):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = api.get_day(METER_ID, date(2023, 4, 1))
+    archive.write(METER_ID, [result])
+
+    # slot offsets are computed from the epoch
+    first_slot = (int(datetime(2023, 4, 1, tzinfo=ZoneInfo('Europe/Vienna')).timestamp()) - EPOCH) // SLOT_SECONDS
+    assert archive.slots(METER_ID, 'metered') == first_slot + 96
+
+    metered = archive.read(METER_ID, 'metered', date(2023, 4, 1), date(2023, 4, 1))
+    assert len(metered) == 96
+    # zero-copy, read-only view of the mapped file
+    assert not metered.flags.owndata and not metered.flags.writeable
+    assert math.isnan(metered[0])
+    assert [(timestamp, value) for timestamp, value in zip(archive.timestamps(date(2023, 4, 1), date(2023, 4, 1)),
+                                                          metered) if not math.isnan(value)] == [
+        (int(timestamp.timestamp()), value) for timestamp, value in result.metered
+    ]
+    qualities = archive.read(METER_ID, 'estimated_qualities', date(2023, 4, 1), date(2023, 4, 1))
+    assert qualities.dtype == numpy.uint8
+    assert qualities.tolist() == [3] + [0] * 95
+    peaks = archive.read(METER_ID, 'metered_peak_demands', date(2023, 4, 1), date(2023, 4, 1))
+    assert peaks.tolist() == [value for _, value in result.metered_peak_demands]
+
+
+def test_rewrite_and_gaps(api, response, archive):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    archive.write(METER_ID, [api.get_day(METER_ID, date(2023, 4, 3))])
+    metered = archive.read(METER_ID, 'metered', date(2023, 4, 3), date(2023, 4, 3))
+
+    # an earlier day is written into the gap, a later day extends the file
+    archive.write(METER_ID, [api.get_day(METER_ID, date(2023, 4, 1)), api.get_day(METER_ID, date(2023, 4, 5))])
+    values = archive.read(METER_ID, 'metered', date(2023, 4, 1), date(2023, 4, 5))
+    assert len(values) == 5 * 96
+    assert numpy.isnan(values[96:192]).all()
+    assert numpy.array_equal(values[192:288], metered, equal_nan=True)
+    assert numpy.array_equal(values[:96], values[384:], equal_nan=True)
+    # views of the previous mapping stay valid
+    assert numpy.nansum(metered) == numpy.nansum(values[192:288])
+
+
+def test_sparse_result(tmp_path):
+    start = datetime(2023, 4, 1, 0, 15, tzinfo=ZoneInfo('Europe/Vienna'))
+    result = SmartmeterResult(**{name: [] for name in SmartmeterResult.__dataclass_fields__})
+    result.metered = [(start, 1.0), (start + timedelta(hours=1), 2.0)]
+
+    with SmartmeterArchive(tmp_path / 'archive') as archive:
+        archive.write(METER_ID, [result])
+        values = archive.read(METER_ID, 'metered', date(2023, 4, 1), date(2023, 4, 1))
+        assert values[0] == 1.0 and values[4] == 2.0
+        assert numpy.isnan(values[1:4]).all()
+        del values
+
+
+def test_read_beyond_archive(api, response, archive):
+    assert numpy.isnan(archive.read(METER_ID, 'metered', date(2023, 4, 1), date(2023, 4, 1))).all()
+
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    archive.write(METER_ID, [api.get_day(METER_ID, date(2023, 4, 1))])
+    values = archive.read(METER_ID, 'metered', date(2023, 4, 1), date(2023, 4, 2))
+    assert values.flags.owndata
+    assert len(values) == 192 and numpy.isnan(values[96:]).all()
+    assert archive.read(METER_ID, 'quality_ec', date(2023, 4, 2), date(2023, 4, 2)).tolist() == [0] * 96
+
+
+def test_dst_days(archive):
+    assert len(archive.timestamps(date(2023, 3, 26), date(2023, 3, 26))) == 92
+    assert len(archive.timestamps(date(2023, 10, 29), date(2023, 10, 29))) == 100
+
+
+def test_errors(api, response, archive, tmp_path):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    with pytest.raises(ValueError) as excinfo:
+        archive.write(METER_ID, [api.get_month(METER_ID, 2023, 3)])
+    assert str(excinfo.value) == 'Only 15min results can be archived'
+
+    with pytest.raises(ValueError) as excinfo:
+        archive.read(METER_ID, 'metered', date(2023, 4, 2), date(2023, 4, 1))
+    assert str(excinfo.value) == 'start_date must not be after end_date'
+
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = api.get_day(METER_ID, date(2023, 4, 1))
+    result.metered[0] = (result.metered[0][0] + timedelta(minutes=5), 1.0)
+    with pytest.raises(ValueError) as excinfo:
+        archive.write(METER_ID, [result])
+    assert str(excinfo.value) == 'Timestamp is not on the 15min slot grid'
+
+    path = tmp_path / 'archive' / METER_ID / 'blind_consumption.bin'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError) as excinfo:
+        archive.write(METER_ID, [api.get_day(METER_ID, date(2023, 4, 1))])
+    assert str(excinfo.value) == f'Unsupported archive file "{path}"'
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from netznoe_smartmeter_portal_api import AsyncNetzNoeSmartmeterPortalApi
+from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError
+
+METER_ID = 'ATxxTEST'
+
+
+def test_login_logout(async_api, response):
+    response.post('https://smartmeter.netz-noe.at/orchestration/Authentication/Login', 'data_login')
+    response.get('https://smartmeter.netz-noe.at/orchestration/Authentication/Logout', 'data_logout')
+    asyncio.run(async_api.do_login())
+    asyncio.run(async_api.do_logout())
+
+
+def test_fetch_matches_sync_client(api, async_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Week', 'data_week')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+
+    assert asyncio.run(async_api.get_day(METER_ID, date(2023, 4, 1))) == api.get_day(METER_ID, date(2023, 4, 1))
+    assert asyncio.run(async_api.get_week(METER_ID, date(2023, 3, 27), date(2023, 4, 3))) == \
+        api.get_week(METER_ID, date(2023, 3, 27), date(2023, 4, 3))
+    assert asyncio.run(async_api.get_month(METER_ID, 2023, 3)) == api.get_month(METER_ID, 2023, 3)
+    assert asyncio.run(async_api.get_year(METER_ID, 2023)) == api.get_year(METER_ID, 2023)
+
+
+def test_get_metering_points(async_api, response):
+    response.get(
+        'https://smartmeter.netz-noe.at/orchestration/User/GetAccountIdByBussinespartnerId', 'data_account_id_1'
+    )
+    response.get(
+        'https://smartmeter.netz-noe.at/orchestration/User/GetMeteringPointByAccountId', 'data_metering_point'
+    )
+    result = asyncio.run(async_api.get_metering_points())
+    assert result[0].metering_point_id == 'AT0020000000000000000000100123456'
+    # the account did not change
+    assert asyncio.run(async_api.refresh_metering_points()) == result
+    assert len(response.calls) == 3
+
+
+def test_get_days(async_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = asyncio.run(async_api.get_days(METER_ID, date(2023, 3, 30), date(2023, 4, 2)))
+    assert list(result.keys()) == [date(2023, 3, 30), date(2023, 3, 31), date(2023, 4, 1), date(2023, 4, 2)]
+    assert len(response.calls) == 4
+    assert all(len(day.metered) == 95 for day in result.values())
+
+
+def test_get_days_api_error(async_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day', status=999)
+    with pytest.raises(NetzNoeSmartmeterPortalDataError):
+        asyncio.run(async_api.get_days(METER_ID, date(2023, 4, 1), date(2023, 4, 2)))
+
+
+def test_get_days_value_error(async_api):
+    with pytest.raises(ValueError) as excinfo:
+        asyncio.run(async_api.get_days(METER_ID, date(2023, 4, 2), date(2023, 4, 1)))
+    assert str(excinfo.value) == 'start_date must not be after end_date'
+
+
+def test_invalid_concurrency():
+    with pytest.raises(ValueError) as excinfo:
+        AsyncNetzNoeSmartmeterPortalApi(username='localtest', password='localtest', max_concurrency=0)
+    assert str(excinfo.value) == 'max_concurrency must be at least 1'
@@ -0,0 +1,27 @@
+from datetime import date
+
+from benchmarks.portal import LocalPortal
+from benchmarks.run import main
+from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi
+
+
+def test_local_portal():
+    with LocalPortal(energy_communities=2, accounts=3, meters_per_account=2) as portal:
+        api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', base_url=f'{portal.base_url}/')
+        api.do_login()
+        assert sorted(api.get_day_per_energy_community('ATxxTEST', date(2023, 4, 1))) == ['EC0000', 'EC0001', 'total']
+        metering_points = api.get_metering_points()
+        assert len(metering_points) == 6
+        assert len({metering_point.metering_point_id for metering_point in metering_points}) == 6
+        assert portal.requests == 6
+
+
+def test_quick_run(tmp_path, capsys):
+    measurements = main(['--quick', '--latency', '0', '--json', str(tmp_path / 'benchmarks.json')])
+    # the DataFrame cases run if pandas is installed
+    assert len(measurements) in (14, 16)
+    assert all(measurement.items > 0 and measurement.seconds > 0 for measurement in measurements)
+    # one request per day for the serial and concurrent modes
+    assert [measurement.items for measurement in measurements if measurement.unit == 'requests'][:4] == [7] * 4
+    assert 'peak alloc [KiB]' in capsys.readouterr().out
+    assert (tmp_path / 'benchmarks.json').exists()
@@ -0,0 +1,115 @@
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+import responses
+from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi, SmartmeterResponseCache
+from netznoe_smartmeter_portal_api.cache import is_final
+
+METER_ID = 'ATxxTEST'
+
+
+def load_response(filename: str):
+    return json.loads(Path(os.path.join(os.path.dirname(__file__), 'responses', f'{filename}.json')).read_text())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite')
+    yield cache
+    cache.close()
+
+
+def test_is_final():
+    assert is_final(load_response('data_month'))
+    assert is_final(load_response('data_year'))
+    # contains a L3 estimate and a missing metered value
+    assert not is_final(load_response('data_day'))
+
+    data = load_response('data_month')
+    data[0]['meteredValues'][-1] = None
+    assert not is_final(data)
+
+    # a gap filled by a measured (L1) estimate is final, unless its energy community data is estimated
+    data = load_response('data_day')
+    data[0]['estimatedQualities'][0] = 'L1'
+    assert is_final(data)
+    data[0]['qualityEC'][0] = 'L2'
+    assert not is_final(data)
+
+    # nothing imported yet
+    assert not is_final([])
+    data = load_response('data_month')
+    data[0]['meteredValues'] = []
+    assert not is_final(data)
+
+
+def test_immutable_period_is_served_from_cache(cache, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache)
+    first = api.get_month(METER_ID, year=2023, month=3)
+    second = api.get_month(METER_ID, year=2023, month=3)
+    assert first == second
+    assert len(response.calls) == 1
+
+
+def test_estimated_period_is_revalidated(tmp_path, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+
+    cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite', ttl=timedelta(hours=1))
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache)
+    api.get_day(METER_ID, day=date(2023, 4, 1))
+    api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert len(response.calls) == 1
+
+    expired_cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite', ttl=timedelta(0))
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=expired_cache)
+    api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert len(response.calls) == 2
+
+
+def test_empty_period_is_revalidated(tmp_path, response):
+    response.add(responses.GET, 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', json=[])
+
+    cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite', ttl=timedelta(0))
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache)
+    assert api.get_month_per_energy_community(METER_ID, year=2023, month=3) == {}
+    api.get_month_per_energy_community(METER_ID, year=2023, month=3)
+    assert len(response.calls) == 2
+
+
+def test_open_period_is_not_immutable(cache, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache)
+    api.get_year(METER_ID, year=2999)
+    assert cache.get('Year', METER_ID, 'year=2999') is not None
+
+
+def test_cache_keys(cache):
+    cache.put('Day', METER_ID, 'day=2023-4-1', '[]', immutable=True)
+    assert cache.get('Day', METER_ID, 'day=2023-4-1') == '[]'
+    assert cache.get('Day', METER_ID, 'day=2023-4-2') is None
+    assert cache.get('Day', 'ATxxOTHER', 'day=2023-4-1') is None
+    assert cache.get('Week', METER_ID, 'day=2023-4-1') is None
+
+
+def test_size_based_eviction(tmp_path):
+    cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite', max_size=20)
+    cache.put('Day', METER_ID, 'day=2023-4-1', '[1, 2, 3]', immutable=True)
+    cache.put('Day', METER_ID, 'day=2023-4-2', '[4, 5, 6]', immutable=True)
+    assert cache.size() == 18
+
+    # least recently used entry is evicted first
+    cache.get('Day', METER_ID, 'day=2023-4-1')
+    cache.put('Day', METER_ID, 'day=2023-4-3', '[7, 8, 9]', immutable=True)
+    assert cache.size() == 18
+    assert cache.get('Day', METER_ID, 'day=2023-4-1') is not None
+    assert cache.get('Day', METER_ID, 'day=2023-4-2') is None
+    assert cache.get('Day', METER_ID, 'day=2023-4-3') is not None
+
+    cache.clear()
+    assert cache.size() == 0
+    cache.close()
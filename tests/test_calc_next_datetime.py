@@ -1,8 +1,10 @@
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
 
 import pytest
 
+from netznoe_smartmeter_portal_api.parser import calc_time_axis
+
 
 def test_dst_winter_to_summer(api, response):
     tz_utc = ZoneInfo('UTC')
@@ -76,3 +78,25 @@ def test_unimplemented_increment(api, response):
     with pytest.raises(ValueError) as excinfo:
         api._calc_next_datetime(date(2024, 1, 1), {'not_implemented': 1})
     assert str(excinfo.value) == 'Unsupported time_increase interval'
+
+
+def test_time_axis_dst_days():
+    tz_utc = ZoneInfo('UTC')
+    tz_vienna = ZoneInfo('Europe/Vienna')
+    for day, slots in {date(2024, 3, 31): 92, date(2024, 10, 27): 100, date(2024, 4, 2): 96}.items():
+        base_time = datetime(day.year, day.month, day.day, 0, 15, tzinfo=tz_vienna).astimezone(tz_utc)
+        next_day = datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=tz_vienna)
+        axis = calc_time_axis(base_time, {'minutes': 15}, 100)
+        assert axis.index(next_day) == slots - 1
+        assert all(timestamp.tzinfo == tz_vienna for timestamp in axis)
+
+
+def test_time_axis_days_and_months():
+    axis = calc_time_axis(date(2024, 1, 1), {'months': 1}, 12)
+    assert axis[-1] == date(2024, 12, 1)
+    axis = calc_time_axis(date(2024, 2, 27), {'days': 1}, 4)
+    assert axis == [date(2024, 2, 27), date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)]
+
+    with pytest.raises(ValueError) as excinfo:
+        calc_time_axis(date(2024, 1, 1), {'not_implemented': 1}, 1)
+    assert str(excinfo.value) == 'Unsupported time_increase interval'
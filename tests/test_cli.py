@@ -0,0 +1,126 @@
+import csv
+
+import pytest
+from responses import matchers
+
+from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi
+from netznoe_smartmeter_portal_api.cli import main
+
+METER_ID = 'AT0020000000000000000000100123456'
+PORTAL_URL = 'https://smartmeter.netz-noe.at/orchestration'
+
+
+@pytest.fixture
+def portal(response, monkeypatch):
+    monkeypatch.setenv('NETZNOE_SMARTMETER_USERNAME', 'localtest')
+    monkeypatch.setenv('NETZNOE_SMARTMETER_PASSWORD', 'localtest')
+    response.post(f'{PORTAL_URL}/Authentication/Login', 'data_login')
+    response.get(f'{PORTAL_URL}/Authentication/Logout', 'data_logout')
+    return response
+
+
+def requested_days(response):
+    return sorted(call.request.params['day'] for call in response.calls if 'ConsumptionRecord/Day' in call.request.url)
+
+
+def read_rows(path):
+    with path.open() as fp:
+        return list(csv.DictReader(fp))
+
+
+def test_fetch_resumes(portal, tmp_path):
+    portal.get(f'{PORTAL_URL}/ConsumptionRecord/Day', 'data_day')
+    arguments = ['fetch', '--meter', METER_ID, '--start', '2023-04-01', '--output', str(tmp_path), '--workers', '2']
+
+    assert main([*arguments, '--end', '2023-04-02']) == 0
+    assert requested_days(portal) == ['2023-4-1', '2023-4-2']
+    assert len(read_rows(tmp_path / f'{METER_ID}_values.csv')) == 2 * 96
+    assert (tmp_path / '.checkpoint').read_text().splitlines() == [
+        f'{METER_ID} Day 2023-04-01 2023-04-01',
+        f'{METER_ID} Day 2023-04-02 2023-04-02',
+    ]
+
+    # a longer range only fetches the days which were not written yet
+    assert main([*arguments, '--end', '2023-04-03']) == 0
+    assert requested_days(portal) == ['2023-4-1', '2023-4-2', '2023-4-3']
+    rows = read_rows(tmp_path / f'{METER_ID}_values.csv')
+    assert len(rows) == 3 * 96
+    assert rows[-1]['timestamp'] == '2023-04-04T00:00:00+02:00'
+
+
+def test_fetch_calls_unit_endpoints(portal, tmp_path, monkeypatch):
+    # every unit is a single call of its endpoint, without planning the range again
+    def get_range(*args, **kwargs):
+        raise AssertionError('get_range must not be used per unit')
+
+    monkeypatch.setattr(NetzNoeSmartmeterPortalApi, 'get_range', get_range)
+    portal.get(f'{PORTAL_URL}/ConsumptionRecord/Month', 'data_month')
+    assert main(['fetch', '--meter', METER_ID, '--start', '2023-03-05', '--end', '2023-03-31', '--resolution', 'day',
+                 '--output', str(tmp_path)]) == 0
+    rows = read_rows(tmp_path / f'{METER_ID}_values.csv')
+    assert [row['timestamp'] for row in rows[:2]] == ['2023-03-05', '2023-03-06']
+    assert len(rows) == 27
+
+
+def test_fetch_failure_is_retried(portal, tmp_path):
+    portal.get(f'{PORTAL_URL}/ConsumptionRecord/Day', 'data_day', status=999,
+               match=[matchers.query_param_matcher({'meterId': METER_ID, 'day': '2023-4-2'})])
+    portal.get(f'{PORTAL_URL}/ConsumptionRecord/Day', 'data_day',
+               match=[matchers.query_param_matcher({'meterId': METER_ID, 'day': '2023-4-1'})])
+    arguments = ['fetch', '--meter', METER_ID, '--start', '2023-04-01', '--end', '2023-04-02',
+                 '--output', str(tmp_path)]
+
+    assert main(arguments) == 1
+    assert (tmp_path / '.checkpoint').read_text().splitlines() == [f'{METER_ID} Day 2023-04-01 2023-04-01']
+
+    assert main(arguments) == 1
+    assert requested_days(portal) == ['2023-4-1', '2023-4-2', '2023-4-2']
+
+
+def test_fetch_all_meters_into_store_and_export(portal, tmp_path):
+    portal.get(f'{PORTAL_URL}/User/GetAccountIdByBussinespartnerId', 'data_account_id_1')
+    portal.get(f'{PORTAL_URL}/User/GetMeteringPointByAccountId', 'data_metering_point')
+    portal.get(f'{PORTAL_URL}/ConsumptionRecord/Month', 'data_month')
+    store = tmp_path / 'smartmeter.sqlite'
+
+    assert main(['fetch', '--start', '2023-03-01', '--end', '2023-03-31', '--resolution', 'day', '--format', 'store',
+                 '--output', str(store)]) == 0
+    assert (tmp_path / 'smartmeter.sqlite.checkpoint').read_text().splitlines() == [
+        f'{METER_ID} Month 2023-03-01 2023-03-31'
+    ]
+
+    assert main(['export', '--store', str(store), '--meter', METER_ID, '--start', '2023-03-01', '--end', '2023-03-31',
+                 '--resolution', 'day', '--output', str(tmp_path / 'export')]) == 0
+    rows = read_rows(tmp_path / 'export' / f'{METER_ID}_values.csv')
+    assert [row['timestamp'] for row in rows[:2]] == ['2023-03-01', '2023-03-02']
+    assert len(rows) == 31
+
+
+def test_sync_and_export_archive(portal, tmp_path):
+    portal.get(f'{PORTAL_URL}/ConsumptionRecord/Day', 'data_day')
+    store = tmp_path / 'smartmeter.sqlite'
+
+    assert main(['sync', '--store', str(store), '--meter', METER_ID, '--start', '2023-04-01', '--end', '2023-04-02',
+                 '--workers', '2']) == 0
+    assert requested_days(portal) == ['2023-4-1', '2023-4-2']
+
+    assert main(['export', '--store', str(store), '--meter', METER_ID, '--start', '2023-04-01', '--end', '2023-04-02',
+                 '--format', 'archive', '--output', str(tmp_path / 'archive')]) == 0
+    assert (tmp_path / 'archive' / METER_ID / 'metered.bin').exists()
+
+
+def test_invalid_arguments(monkeypatch, tmp_path, capsys):
+    monkeypatch.delenv('NETZNOE_SMARTMETER_USERNAME', raising=False)
+    with pytest.raises(SystemExit):
+        main(['fetch', '--meter', METER_ID, '--start', '2023-04-01', '--output', str(tmp_path)])
+    assert 'NETZNOE_SMARTMETER_USERNAME is required' in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        main(['fetch', '--start', '2023-04-01', '--resolution', 'day', '--format', 'archive',
+              '--output', str(tmp_path)])
+    assert 'only stores 15min values' in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        main(['export', '--store', str(tmp_path / 'store.sqlite'), '--meter', METER_ID, '--start', '2023-04-01',
+              '--format', 'store', '--output', str(tmp_path)])
+    assert 'export reads from a store' in capsys.readouterr().err
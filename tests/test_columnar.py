@@ -0,0 +1,87 @@
+import math
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterColumnarResult, SmartmeterResult, SmartmeterResultYearly
+from netznoe_smartmeter_portal_api.models import day_of, day_start
+
+METER_ID = 'ATxxTEST'
+
+
+def test_day_round_trip(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = api.get_day(METER_ID, day=date(2023, 4, 1))
+    columnar = result.to_columnar()
+
+    assert not columnar.is_date
+    assert columnar.timestamps.typecode == 'q'
+    assert len(columnar.timestamps) == 96
+    assert columnar.timestamps[0] == int(datetime(2023, 4, 1, 0, 15, tzinfo=ZoneInfo('Europe/Vienna')).timestamp())
+    # first slot has no metered but an estimated value
+    assert math.isnan(columnar.values['metered'][0])
+    assert columnar.values['estimated'][0] == 1.0
+    assert columnar.qualities['estimated_qualities'][:2].tolist() == [3, 0]
+    assert all(math.isnan(value) for value in columnar.values['self_coverage'])
+    assert len(columnar.peak_demand_timestamps) == 96
+    assert set(columnar.peak_demand_qualities['peak_demand_data_qualities']) == {1}
+    assert columnar.columns() == (columnar.timestamps, columnar.values, columnar.qualities)
+    assert columnar.columns(peak_demands=True) == (
+        columnar.peak_demand_timestamps, columnar.peak_demand_values, columnar.peak_demand_qualities
+    )
+
+    assert SmartmeterResult.from_columnar(columnar) == result
+
+
+def test_month_round_trip(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    result = api.get_month(METER_ID, year=2023, month=3)
+    columnar = result.to_columnar()
+
+    assert columnar.is_date
+    assert len(columnar.timestamps) == 31
+    assert SmartmeterResult.from_columnar(columnar) == result
+
+
+def test_year_round_trip(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    result = api.get_year(METER_ID, year=2023)
+    columnar = result.to_columnar()
+
+    assert columnar.is_date
+    assert columnar.values['values'].typecode == 'd'
+    assert len(columnar.peak_demand_values['peak_demands']) == 12
+    assert SmartmeterResultYearly.from_columnar(columnar) == result
+
+
+def test_empty_result():
+    result = SmartmeterResultYearly(**{name: [] for name in SmartmeterResultYearly.__dataclass_fields__})
+    columnar = result.to_columnar()
+    assert columnar.is_date
+    assert len(columnar.timestamps) == 0
+    assert len(columnar.values['values']) == 0
+    assert SmartmeterResultYearly.from_columnar(columnar) == result
+    assert SmartmeterResultYearly.from_columnar(SmartmeterColumnarResult(is_date=True)) == result
+
+
+def test_numpy_view(api, response):
+    numpy = pytest.importorskip('numpy')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = api.get_day(METER_ID, day=date(2023, 4, 1))
+
+    metered = numpy.frombuffer(result.to_columnar().values['metered'], dtype=numpy.float64)
+    assert numpy.nansum(metered) == pytest.approx(sum(value for _, value in result.metered))
+
+
+def test_day_start_and_day_of():
+    tz_vienna = ZoneInfo('Europe/Vienna')
+    assert day_start(date(2024, 3, 31)) == int(datetime(2024, 3, 31, tzinfo=tz_vienna).timestamp())
+    # the DST days have 23 and 25 hours
+    assert day_start(date(2024, 4, 1)) - day_start(date(2024, 3, 31)) == 23 * 3600
+    assert day_start(date(2024, 10, 28)) - day_start(date(2024, 10, 27)) == 25 * 3600
+
+    # the last 15min value of a day is stamped with midnight
+    assert day_of(datetime(2024, 4, 1, 0, 0, tzinfo=tz_vienna)) == date(2024, 3, 31)
+    assert day_of(datetime(2024, 4, 1, 0, 15, tzinfo=tz_vienna)) == date(2024, 4, 1)
+    assert day_of(date(2024, 4, 1)) == date(2024, 4, 1)
@@ -0,0 +1,195 @@
+import json
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+import responses
+from responses import matchers
+
+from netznoe_smartmeter_portal_api import (
+    NetzNoeSmartmeterPortalApi,
+    SmartmeterCoverageIndex,
+    SmartmeterResolution,
+    SmartmeterStore,
+)
+from netznoe_smartmeter_portal_api.parser import to_smartmeter_result
+
+METER_ID = 'ATxxTEST'
+TZ_VIENNA = ZoneInfo('Europe/Vienna')
+TZ_UTC = ZoneInfo('UTC')
+
+
+@pytest.fixture
+def coverage():
+    return SmartmeterCoverageIndex()
+
+
+@pytest.fixture
+def coverage_api(coverage):
+    return NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', coverage=coverage)
+
+
+def daily(start_date: date, end_date: date):
+    days = (end_date - start_date).days + 1
+    return to_smartmeter_result(start_date, {'meteredValues': [1.0] * days}, time_increase={'days': 1})
+
+
+def record_complete_except(coverage, start_date: date, end_date: date, incomplete):
+    coverage.record(METER_ID, daily(start_date, end_date), SmartmeterResolution.DAY, start_date, end_date)
+    for day in incomplete:
+        coverage.record(METER_ID, to_smartmeter_result(day, {'meteredValues': [None]}, time_increase={'days': 1}),
+                        SmartmeterResolution.DAY, day, day)
+
+
+def test_day_coverage(coverage_api, coverage, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    coverage_api.get_day(METER_ID, date(2023, 4, 1))
+
+    # the first slot of the fixture is an L3 estimate
+    day = coverage.get(METER_ID, date(2023, 4, 1))
+    assert day.slots == 96
+    assert day.missing_slots == []
+    assert day.estimated_slots == [0]
+    assert not day.complete
+    assert coverage.get(METER_ID, date(2023, 4, 2)).missing_slots == list(range(96))
+    assert coverage.incomplete_days(METER_ID, date(2023, 4, 1), date(2023, 4, 2)) == [
+        date(2023, 4, 1), date(2023, 4, 2)
+    ]
+
+
+def test_dst_day(coverage):
+    base_time = datetime(2023, 3, 26, 0, 15, tzinfo=TZ_VIENNA).astimezone(TZ_UTC)
+    result = to_smartmeter_result(base_time, {'meteredValues': [0.1] * 92}, time_increase={'minutes': 15})
+    coverage.record(METER_ID, result, SmartmeterResolution.QUARTER_HOUR, date(2023, 3, 26), date(2023, 3, 26))
+    assert coverage.get(METER_ID, date(2023, 3, 26)).slots == 92
+    assert coverage.get(METER_ID, date(2023, 3, 26)).complete
+    assert coverage.get(METER_ID, date(2023, 10, 29)).slots == 100
+
+
+def test_measured_estimate_is_final(coverage, tmp_path):
+    # slot 5 is an L1 estimate, slot 7 has L2 energy community data
+    metered = [0.1] * 96
+    metered[5] = None
+    data = {
+        'meteredValues': metered,
+        'estimatedValues': [0.1 if slot == 5 else None for slot in range(96)],
+        'estimatedQualities': ['L1' if slot == 5 else None for slot in range(96)],
+        'qualityEC': ['L2' if slot == 7 else 'L1' for slot in range(96)],
+    }
+    base_time = datetime(2023, 4, 1, 0, 15, tzinfo=TZ_VIENNA).astimezone(TZ_UTC)
+    result = to_smartmeter_result(base_time, data, time_increase={'minutes': 15})
+    coverage.record(METER_ID, result, SmartmeterResolution.QUARTER_HOUR, date(2023, 4, 1), date(2023, 4, 1))
+
+    day = coverage.get(METER_ID, date(2023, 4, 1))
+    assert day.missing_slots == []
+    assert day.estimated_slots == [7]
+
+    # the store agrees on the final slots
+    store = SmartmeterStore(tmp_path / 'store.sqlite')
+    store.ingest(METER_ID, result)
+    assert store.non_final_days(METER_ID, date(2023, 4, 1), date(2023, 4, 1)) == [date(2023, 4, 1)]
+    data['qualityEC'][7] = 'L1'
+    result = to_smartmeter_result(base_time, data, time_increase={'minutes': 15})
+    store.ingest(METER_ID, result)
+    assert store.non_final_days(METER_ID, date(2023, 4, 1), date(2023, 4, 1)) == []
+    store.close()
+
+    coverage.record(METER_ID, result, SmartmeterResolution.QUARTER_HOUR, date(2023, 4, 1), date(2023, 4, 1))
+    assert coverage.get(METER_ID, date(2023, 4, 1)).complete
+
+
+def test_month_coverage(coverage_api, coverage, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    coverage_api.get_month(METER_ID, 2023, 3)
+    assert coverage.incomplete_days(METER_ID, date(2023, 3, 1), date(2023, 4, 2), SmartmeterResolution.DAY) == [
+        date(2023, 4, 1), date(2023, 4, 2)
+    ]
+    # 15min values were not fetched
+    assert len(coverage.incomplete_days(METER_ID, date(2023, 3, 1), date(2023, 3, 31))) == 31
+
+    coverage.clear(METER_ID)
+    assert len(coverage.incomplete_days(METER_ID, date(2023, 3, 1), date(2023, 3, 31),
+                                        SmartmeterResolution.DAY)) == 31
+
+
+def test_plan_repair_day(coverage_api, coverage):
+    record_complete_except(coverage, date(2023, 1, 1), date(2023, 3, 31),
+                           [date(2023, 1, 29), date(2023, 1, 30), date(2023, 2, 2), date(2023, 3, 5),
+                            date(2023, 3, 20)])
+    # one week across the turn of the month, one month call for two days of March
+    assert coverage_api.plan_repair(METER_ID, date(2023, 1, 1), date(2023, 3, 31), SmartmeterResolution.DAY) == [
+        ('Week', date(2023, 1, 29), date(2023, 2, 2)),
+        ('Month', date(2023, 3, 5), date(2023, 3, 20)),
+    ]
+    assert coverage_api.plan_repair(METER_ID, date(2023, 2, 3), date(2023, 3, 4), SmartmeterResolution.DAY) == []
+
+
+def test_plan_repair_quarter_hour(coverage_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    coverage_api.get_day(METER_ID, date(2023, 4, 1))
+    assert coverage_api.plan_repair(METER_ID, date(2023, 4, 1), date(2023, 4, 2)) == [
+        ('Day', date(2023, 4, 1), date(2023, 4, 1)),
+        ('Day', date(2023, 4, 2), date(2023, 4, 2)),
+    ]
+
+
+def test_repair_range(coverage_api, coverage, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Week', 'data_week')
+    coverage_api.get_month(METER_ID, 2023, 3)
+
+    repaired = coverage_api.repair_range(METER_ID, date(2023, 3, 1), date(2023, 4, 2), SmartmeterResolution.DAY)
+    assert list(repaired) == [('Week', date(2023, 4, 1), date(2023, 4, 2))]
+    assert len(response.calls) == 2
+    assert response.calls[1].request.params == {'meterId': METER_ID, 'startDate': '2023-4-1', 'endDate': '2023-4-2'}
+
+
+def test_repair_in_new_process(api, response, tmp_path):
+    # 2023-04-01 is complete, 2023-04-02 has an L3 estimate and 2023-04-03 was never fetched. The recorded peak demand
+    # times belong to 2023-04-01 only and are left out.
+    estimated = json.loads(response._get_body('data_day'))
+    for field in ('meteredPeakDemands', 'estimatedPeakDemands', 'peakDemandDataQualities', 'peakDemandTimes'):
+        del estimated[0][field]
+    complete = json.loads(json.dumps(estimated))
+    complete[0].update(meteredValues=[1.0] * 96, estimatedValues=[None] * 96, estimatedQualities=[None] * 96)
+    url = 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day'
+    for day, body in (('2023-4-1', complete), ('2023-4-2', estimated), ('2023-4-3', estimated)):
+        response.add(responses.GET, url, json=body,
+                     match=[matchers.query_param_matcher({'meterId': METER_ID, 'day': day})])
+
+    store = SmartmeterStore(tmp_path / 'store.sqlite')
+    store.ingest_many(METER_ID, [api.get_day(METER_ID, date(2023, 4, 1)), api.get_day(METER_ID, date(2023, 4, 2))])
+    store.close()
+
+    # a later process rebuilds the index from the store
+    store = SmartmeterStore(tmp_path / 'store.sqlite')
+    coverage = SmartmeterCoverageIndex()
+    coverage.record_store(store, METER_ID, date(2023, 4, 1), date(2023, 4, 3))
+    store.close()
+    assert coverage.get(METER_ID, date(2023, 4, 1)).complete
+    assert coverage.get(METER_ID, date(2023, 4, 2)).estimated_slots == [0]
+
+    coverage_api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', coverage=coverage)
+    assert list(coverage_api.repair_range(METER_ID, date(2023, 4, 1), date(2023, 4, 3))) == [
+        ('Day', date(2023, 4, 2), date(2023, 4, 2)),
+        ('Day', date(2023, 4, 3), date(2023, 4, 3)),
+    ]
+    assert sorted(call.request.params['day'] for call in response.calls[2:]) == ['2023-4-2', '2023-4-3']
+
+
+def test_plan_repair_invalid(api, coverage_api):
+    with pytest.raises(ValueError) as excinfo:
+        api.plan_repair(METER_ID, date(2023, 4, 1), date(2023, 4, 2))
+    assert str(excinfo.value) == 'plan_repair requires a coverage index'
+
+    with pytest.raises(ValueError) as excinfo:
+        coverage_api.plan_repair(METER_ID, date(2023, 4, 1), date(2023, 4, 2), SmartmeterResolution.MONTH)
+    assert str(excinfo.value) == 'Unsupported resolution'
+
+    with pytest.raises(ValueError) as excinfo:
+        coverage_api.plan_repair(METER_ID, date(2023, 4, 2), date(2023, 4, 1))
+    assert str(excinfo.value) == 'start_date must not be after end_date'
+
+
+def test_unfetched_days_are_missing(coverage):
+    assert coverage.get(METER_ID, date(2023, 4, 1), SmartmeterResolution.DAY).missing_slots == [0]
@@ -0,0 +1,70 @@
+import csv
+from datetime import date
+
+import pytest
+
+from netznoe_smartmeter_portal_api.exporters import SmartmeterCsvExporter, SmartmeterParquetExporter
+
+METER_ID = 'ATxxTEST'
+
+
+@pytest.fixture
+def results(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    return {
+        'days': [api.get_day(METER_ID, date(2023, 4, 1)), api.get_day(METER_ID, date(2023, 4, 1))],
+        'year': api.get_year(METER_ID, 2023),
+    }
+
+
+def test_csv_exporter(tmp_path, results):
+    with SmartmeterCsvExporter(tmp_path) as exporter:
+        exporter.write(METER_ID, results['days'][:1])
+    # appending to existing files does not repeat the header
+    with SmartmeterCsvExporter(tmp_path) as exporter:
+        exporter.write(METER_ID, results['days'][1:] + [results['year']])
+
+    with (tmp_path / f'{METER_ID}_values.csv').open() as fp:
+        rows = list(csv.DictReader(fp))
+    assert len(rows) == 2 * 96
+    assert rows[0]['timestamp'] == '2023-04-01T00:15:00+02:00'
+    assert rows[0]['metered'] == ''
+    assert rows[0]['estimated'] == '1.0'
+    assert rows[0]['estimated_qualities'] == 'L3'
+    assert rows[1]['metered'] == '0.0'
+    assert rows[1]['estimated_qualities'] == ''
+
+    with (tmp_path / f'{METER_ID}_peak_demands.csv').open() as fp:
+        assert len(list(csv.DictReader(fp))) == 2 * 96
+
+    with (tmp_path / f'{METER_ID}_yearly_values.csv').open() as fp:
+        rows = list(csv.DictReader(fp))
+    assert [row['timestamp'] for row in rows][:2] == ['2023-01-01', '2023-02-01']
+    assert rows[0]['values'] == '20.123'
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_parquet_exporter(tmp_path, results, file_format):
+    dataset = pytest.importorskip('pyarrow.dataset')
+    exporter = SmartmeterParquetExporter(tmp_path, file_format=file_format)
+    exporter.write(METER_ID, results['days'])
+    exporter.write(METER_ID, [results['year']])
+
+    table = dataset.dataset(tmp_path / 'values', format='feather' if file_format == 'arrow' else 'parquet',
+                            partitioning='hive').to_table()
+    assert table.num_rows == 2 * 96
+    assert set(table.column('meter_id').to_pylist()) == {METER_ID}
+    assert table.column('estimated_qualities').to_pylist()[:2] == ['L3', None]
+    assert table.schema.field('timestamp').type.tz == 'Europe/Vienna'
+
+    table = dataset.dataset(tmp_path / 'yearly_peak_demands', format='feather' if file_format == 'arrow' else 'parquet',
+                            partitioning='hive').to_table()
+    assert table.column('peak_demands').to_pylist()[0] == 5.0
+
+
+def test_parquet_exporter_invalid_format(tmp_path):
+    pytest.importorskip('pyarrow')
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterParquetExporter(tmp_path, file_format='xlsx')
+    assert str(excinfo.value) == 'Unsupported file_format'
@@ -0,0 +1,84 @@
+import math
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterDataQuality
+from netznoe_smartmeter_portal_api.frames import to_pandas, to_polars
+
+METER_ID = 'ATxxTEST'
+DAY_URL = 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day'
+TZ_VIENNA = ZoneInfo('Europe/Vienna')
+
+pandas = pytest.importorskip('pandas')
+polars = pytest.importorskip('polars')
+
+
+def two_days(api):
+    first = api.get_day(METER_ID, date(2023, 4, 1))
+    second = api.get_day(METER_ID, date(2023, 4, 2))
+    # the recorded peak demand times belong to the first day
+    return [first, replace(second, **{
+        name: [(timestamp + timedelta(days=1), value) for timestamp, value in getattr(second, name)]
+        for name in ('metered_peak_demands', 'peak_demand_data_qualities')
+    })]
+
+
+def test_day_to_pandas(api, response):
+    response.get(DAY_URL, 'data_day')
+    result = api.get_day(METER_ID, date(2023, 4, 1))
+    frame = result.to_pandas()
+
+    assert len(frame) == 96 and str(frame.index.tz) == 'Europe/Vienna'
+    assert frame.index[0] == pandas.Timestamp(datetime(2023, 4, 1, 0, 15, tzinfo=TZ_VIENNA))
+    assert [(timestamp.to_pydatetime(), value) for timestamp, value in frame['metered'].dropna().items()] == \
+        result.metered
+    assert frame['metered'].dtype == 'float64' and math.isnan(frame['metered'].iloc[0])
+    assert list(frame['estimated_qualities'].cat.categories) == ['L1', 'L2', 'L3']
+    assert [(timestamp.to_pydatetime(), SmartmeterDataQuality(quality))
+            for timestamp, quality in frame['estimated_qualities'].dropna().items()] == result.estimated_qualities
+
+    peak_demands = result.to_pandas(peak_demands=True)
+    assert list(peak_demands.columns) == ['metered_peak_demands', 'estimated_peak_demands',
+                                          'peak_demand_data_qualities']
+    assert peak_demands['metered_peak_demands'].dropna().tolist() == [value for _, value in result.metered_peak_demands]
+
+
+def test_days_to_pandas(api, response):
+    response.get(DAY_URL, 'data_day')
+    days = two_days(api)
+    frame = to_pandas(days)
+    assert len(frame) == 192 and frame.index.is_monotonic_increasing
+    assert frame['metered'].sum() == pytest.approx(sum(value for day in days for _, value in day.metered))
+    assert frame['estimated_qualities'].value_counts()['L3'] == 2
+    assert len(to_pandas(days, peak_demands=True)) == 2 * len(days[0].metered_peak_demands)
+
+    with pytest.raises(ValueError) as excinfo:
+        to_pandas(list(reversed(days)))
+    assert str(excinfo.value) == 'Results must be in chronological order without overlap'
+
+
+def test_year_to_pandas(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    result = api.get_year(METER_ID, 2023)
+    frame = result.to_pandas()
+    # dates are indexed as midnight in Europe/Vienna
+    assert [timestamp.date() for timestamp in frame['values'].dropna().index] == [day for day, _ in result.values]
+    assert frame.index[0].hour == 0
+
+
+def test_day_to_polars(api, response):
+    response.get(DAY_URL, 'data_day')
+    days = two_days(api)
+    frame = days[0].to_polars()
+
+    assert frame.columns[0] == 'timestamp' and frame.schema['timestamp'] == polars.Datetime('us', 'Europe/Vienna')
+    assert frame['timestamp'][0] == datetime(2023, 4, 1, 0, 15, tzinfo=TZ_VIENNA)
+    assert frame['metered'].drop_nans().to_list() == [value for _, value in days[0].metered]
+    assert frame.schema['quality_ec'] == polars.Enum(['L1', 'L2', 'L3'])
+    assert frame['estimated_qualities'].drop_nulls().to_list() == ['L3']
+
+    assert len(to_polars(days)) == 192
+    assert to_polars(days, peak_demands=True)['peak_demand_data_qualities'].null_count() == 0
@@ -0,0 +1,173 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from netznoe_smartmeter_portal_api import (
+    NetzNoeSmartmeterPortalApi,
+    SmartmeterMemo,
+    SmartmeterObserver,
+    SmartmeterResponseCache,
+)
+from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError
+from netznoe_smartmeter_portal_api.instrumentation import (
+    SmartmeterOpenTelemetryObserver,
+    SmartmeterPrometheusObserver,
+    count_values,
+)
+
+METER_ID = 'ATxxTEST'
+DAY_URL = 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day'
+RESPONSES = Path(__file__).parent / 'responses'
+
+
+class RecordingObserver(SmartmeterObserver):
+    def __init__(self):
+        self.events = []
+
+    def on_request(self, event):
+        self.events.append(event)
+
+
+@pytest.fixture
+def observer():
+    return RecordingObserver()
+
+
+@pytest.fixture
+def observed_api(observer):
+    return NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', observers=[observer])
+
+
+def test_consumption_record_event(observed_api, observer, response):
+    response.get(DAY_URL, 'data_day')
+    observed_api.get_day(METER_ID, date(2023, 4, 1))
+
+    body = (RESPONSES / 'data_day.json').read_text()
+    [event] = observer.events
+    assert (event.endpoint, event.meter_id, event.status) == ('ConsumptionRecord/Day', METER_ID, 200)
+    assert event.bytes == len(body.encode())
+    assert event.latency > 0 and event.parse_duration > 0
+    assert event.values == count_values(json.loads(body)) > 95
+    assert (event.retries, event.cached, event.error) == (0, False, None)
+
+
+def test_retries_and_errors(observed_api, observer, response, monkeypatch):
+    monkeypatch.setattr('netznoe_smartmeter_portal_api.api.time.sleep', lambda seconds: None)
+    response.get(DAY_URL, 'data_day', status=503)
+    response.get(DAY_URL, 'data_day', status=401)
+    response.post('https://smartmeter.netz-noe.at/orchestration/Authentication/Login', 'data_login')
+    response.get(DAY_URL, 'data_day')
+    observed_api.get_day(METER_ID, date(2023, 4, 1))
+    assert (observer.events[0].retries, observer.events[0].status) == (2, 200)
+
+    response.get(DAY_URL, 'data_day', status=404)
+    with pytest.raises(NetzNoeSmartmeterPortalDataError):
+        observed_api.get_day(METER_ID, date(2023, 4, 2))
+    assert observer.events[1].status == 404
+    assert observer.events[1].error == 'NetzNoeSmartmeterPortalDataError'
+    assert observer.events[1].values == 0
+
+
+def test_cached_and_memoized_calls(observer, response, tmp_path):
+    response.get(DAY_URL, 'data_day')
+    cache = SmartmeterResponseCache(tmp_path / 'cache.sqlite')
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache,
+                                     memo=SmartmeterMemo(), observers=[observer])
+    api.get_day(METER_ID, date(2023, 4, 1))
+    # answered by the memo, no endpoint call
+    api.get_day(METER_ID, date(2023, 4, 1))
+    assert len(observer.events) == 1
+
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', cache=cache, observers=[observer])
+    api.get_day(METER_ID, date(2023, 4, 1))
+    assert len(response.calls) == 1
+    event = observer.events[1]
+    assert event.cached and event.status is None and event.latency == 0
+    assert event.bytes == observer.events[0].bytes and event.values == observer.events[0].values
+    cache.close()
+
+
+def test_streamed_event(observed_api, observer, response):
+    response.get(DAY_URL, 'data_day')
+    entries = observed_api.iter_day_per_energy_community(METER_ID, date(2023, 4, 1))
+    assert observer.events == []
+    assert [name for name, _ in entries] == ['total']
+
+    [event] = observer.events
+    assert event.bytes == len((RESPONSES / 'data_day.json').read_bytes())
+    assert event.values == count_values(json.loads((RESPONSES / 'data_day.json').read_text()))
+    assert event.parse_duration > 0 and event.error is None
+
+    response.get(DAY_URL, 'data_day', status=404)
+    entries = observed_api.iter_day_per_energy_community(METER_ID, date(2023, 4, 2))
+    with pytest.raises(NetzNoeSmartmeterPortalDataError):
+        next(entries)
+    assert observer.events[1].error == 'NetzNoeSmartmeterPortalDataError'
+
+
+def test_metering_point_events(observed_api, observer, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/User/GetAccountIdByBussinespartnerId',
+                 'data_account_id_2')
+    response.get('https://smartmeter.netz-noe.at/orchestration/User/GetMeteringPointByAccountId',
+                 'data_metering_point')
+    observed_api.get_metering_points()
+    assert [(event.endpoint, event.values) for event in observer.events] == [
+        ('User/GetAccountIdByBussinespartnerId', 2),
+        ('User/GetMeteringPointByAccountId', 1),
+        ('User/GetMeteringPointByAccountId', 1),
+    ]
+    assert all(event.meter_id is None for event in observer.events)
+
+
+class FakeInstrument:
+    def __init__(self, name):
+        self.name = name
+        self.measurements = []
+
+    def add(self, value, attributes):
+        self.measurements.append((value, attributes))
+
+    record = add
+
+
+class FakeMeter:
+    def __init__(self):
+        self.instruments = {}
+
+    def create_counter(self, name, unit, description):
+        return self.instruments.setdefault(name, FakeInstrument(name))
+
+    create_histogram = create_counter
+
+
+def test_open_telemetry_observer(response):
+    meter = FakeMeter()
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest',
+                                     observers=[SmartmeterOpenTelemetryObserver(meter)])
+    response.get(DAY_URL, 'data_day')
+    api.get_day(METER_ID, date(2023, 4, 1))
+
+    attributes = {'endpoint': 'ConsumptionRecord/Day', 'outcome': 'ok'}
+    assert meter.instruments['netznoe_smartmeter.requests'].measurements == [(1, attributes)]
+    assert meter.instruments['netznoe_smartmeter.response.size'].measurements == [
+        (len((RESPONSES / 'data_day.json').read_bytes()), attributes)
+    ]
+    assert len(meter.instruments['netznoe_smartmeter.request.latency'].measurements) == 1
+
+
+def test_prometheus_observer(response):
+    prometheus_client = pytest.importorskip('prometheus_client')
+    registry = prometheus_client.CollectorRegistry()
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest',
+                                     observers=[SmartmeterPrometheusObserver(registry)])
+    response.get(DAY_URL, 'data_day')
+    api.get_day(METER_ID, date(2023, 4, 1))
+
+    labels = {'endpoint': 'ConsumptionRecord/Day'}
+    assert registry.get_sample_value('netznoe_smartmeter_requests_total', {**labels, 'outcome': 'ok'}) == 1
+    assert registry.get_sample_value('netznoe_smartmeter_request_latency_seconds_count', labels) == 1
+    assert registry.get_sample_value('netznoe_smartmeter_response_bytes_total', labels) == len(
+        (RESPONSES / 'data_day.json').read_bytes()
+    )
@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError
+
+METER_ID = 'ATxxTEST'
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_iter_days(api, response, prefetch):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    results = list(api.iter_days(METER_ID, date(2023, 3, 30), date(2023, 4, 3), prefetch=prefetch))
+    assert [day for day, _ in results] == [
+        date(2023, 3, 30), date(2023, 3, 31), date(2023, 4, 1), date(2023, 4, 2), date(2023, 4, 3)
+    ]
+    assert all(len(result.metered) == 95 for _, result in results)
+    assert len(response.calls) == 5
+
+
+def test_iter_days_is_lazy(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    days = api.iter_days(METER_ID, date(2023, 1, 1), date(2023, 12, 31), prefetch=2)
+    assert next(days)[0] == date(2023, 1, 1)
+    days.close()
+    # only the current and the prefetched days have been requested
+    assert len(response.calls) <= 3
+
+
+def test_iter_days_api_error(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day', status=999)
+    with pytest.raises(NetzNoeSmartmeterPortalDataError):
+        list(api.iter_days(METER_ID, date(2023, 4, 1), date(2023, 4, 3), prefetch=2))
+
+
+def test_iter_days_value_error(api):
+    with pytest.raises(ValueError) as excinfo:
+        next(api.iter_days(METER_ID, date(2023, 4, 3), date(2023, 4, 1)))
+    assert str(excinfo.value) == 'start_date must not be after end_date'
@@ -0,0 +1,67 @@
+import pickle
+from dataclasses import asdict, replace
+from datetime import date
+
+import pytest
+
+from netznoe_smartmeter_portal_api import (
+    NetzNoeSmartmeterPortalApi,
+    SmartmeterLazyResult,
+    SmartmeterLazyResultYearly,
+    SmartmeterResult,
+    SmartmeterResultYearly,
+)
+
+METER_ID = 'ATxxTEST'
+
+
+@pytest.fixture
+def lazy_api():
+    return NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', lazy_results=True)
+
+
+def test_lazy_results_match_eager_results(api, lazy_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+
+    day = lazy_api.get_day(METER_ID, date(2023, 4, 1))
+    year = lazy_api.get_year(METER_ID, 2023)
+    assert isinstance(day, SmartmeterLazyResult) and isinstance(day, SmartmeterResult)
+    assert isinstance(year, SmartmeterLazyResultYearly) and isinstance(year, SmartmeterResultYearly)
+    assert day == api.get_day(METER_ID, date(2023, 4, 1))
+    assert api.get_day(METER_ID, date(2023, 4, 1)) == day
+    assert lazy_api.get_month(METER_ID, 2023, 3) == api.get_month(METER_ID, 2023, 3)
+    assert year == api.get_year(METER_ID, 2023)
+    assert day != year
+    assert dict(lazy_api.iter_day_per_energy_community(METER_ID, date(2023, 4, 1))) == \
+        api.get_day_per_energy_community(METER_ID, date(2023, 4, 1))
+
+
+def test_fields_decoded_on_first_access(lazy_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = lazy_api.get_day(METER_ID, date(2023, 4, 1))
+    assert 'metered' not in vars(result)
+
+    assert len(result.metered) == 95
+    assert result.metered is result.metered
+    assert 'metered' in vars(result)
+    assert 'estimated' not in vars(result) and 'metered_peak_demands' not in vars(result)
+    with pytest.raises(AttributeError):
+        result.unknown
+
+
+def test_dataclass_api(api, lazy_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    eager = api.get_day(METER_ID, date(2023, 4, 1))
+    result = lazy_api.get_day(METER_ID, date(2023, 4, 1))
+
+    assert asdict(result) == asdict(eager)
+    assert repr(result).startswith('SmartmeterLazyResult(metered=[')
+    assert replace(result, estimated=[]) == replace(eager, estimated=[])
+    assert SmartmeterResult.from_columnar(result.to_columnar()) == eager
+    assert pickle.loads(pickle.dumps(result)) == eager
+
+    result.metered = []
+    assert result.metered == []
+    assert result != eager
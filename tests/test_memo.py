@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi, SmartmeterMemo
+
+METER_ID = 'ATxxTEST'
+
+
+@pytest.fixture
+def memo_api():
+    return NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', memo=SmartmeterMemo())
+
+
+def test_get_day_reuses_per_energy_community_result(memo_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+
+    per_energy_community = memo_api.get_day_per_energy_community(METER_ID, date(2023, 4, 1))
+    assert memo_api.get_day(METER_ID, date(2023, 4, 1)) is per_energy_community['total']
+    assert len(response.calls) == 1
+
+    # other periods are fetched separately
+    memo_api.get_day(METER_ID, date(2023, 4, 2))
+    assert len(response.calls) == 2
+
+
+def test_metering_points_memoized(memo_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/User/GetAccountIdByBussinespartnerId',
+                 'data_account_id_1')
+    response.get('https://smartmeter.netz-noe.at/orchestration/User/GetMeteringPointByAccountId',
+                 'data_metering_point')
+
+    metering_points = memo_api.get_metering_points()
+    metering_points.clear()
+    assert len(memo_api.get_metering_points()) == 1
+    assert len(response.calls) == 2
+
+
+def test_concurrent_calls_coalesced(memo_api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: memo_api.get_month(METER_ID, 2023, 3), range(16)))
+    assert all(result is results[0] for result in results)
+    assert len(response.calls) == 1
+
+
+def test_single_flight():
+    memo = SmartmeterMemo(ttl=timedelta(0))
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return 'value'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(memo.get_or_compute, 'key', compute)
+        started.wait(1)
+        followers = [executor.submit(memo.get_or_compute, 'key', compute) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        assert [future.result() for future in [leader, *followers]] == ['value'] * 4
+    assert len(calls) == 1
+
+    # with ttl=0 nothing is kept after the call finished
+    assert len(memo) == 0
+    memo.get_or_compute('key', compute)
+    assert len(calls) == 2
+
+
+def test_failures_not_memoized():
+    memo = SmartmeterMemo()
+
+    def fail():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        memo.get_or_compute('key', fail)
+    assert memo.get_or_compute('key', lambda: 'value') == 'value'
+
+
+def test_ttl_and_lru(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('netznoe_smartmeter_portal_api.memo.time.monotonic', lambda: now[0])
+    memo = SmartmeterMemo(max_entries=2, ttl=timedelta(seconds=10))
+
+    memo.get_or_compute('a', lambda: 1)
+    memo.get_or_compute('b', lambda: 2)
+    assert memo.get_or_compute('a', lambda: 0) == 1
+    # 'b' is the least recently used entry
+    memo.get_or_compute('c', lambda: 3)
+    assert memo.get_or_compute('b', lambda: 0) == 0
+
+    now[0] += 11
+    assert memo.get_or_compute('c', lambda: 4) == 4
+
+    memo.invalidate('c')
+    assert memo.get_or_compute('c', lambda: 5) == 5
+    memo.clear()
+    assert len(memo) == 0
+
+
+def test_invalid_max_entries():
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterMemo(max_entries=0)
+    assert str(excinfo.value) == 'max_entries must be at least 1'
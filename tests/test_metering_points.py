@@ -1,7 +1,19 @@
+import json
+import threading
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
 import pytest
 
+import responses
+from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi, SmartmeterMemo
 from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError
 
+ACCOUNTS_URL = 'https://smartmeter.netz-noe.at/orchestration/User/GetAccountIdByBussinespartnerId'
+METERING_POINTS_URL = 'https://smartmeter.netz-noe.at/orchestration/User/GetMeteringPointByAccountId'
+RESPONSES = Path(__file__).parent / 'responses'
+
 
 def test_get_metering_points(api, response):
     response.get(
@@ -48,3 +60,64 @@ def test_get_metering_point_api_error(api, response):
     )
     with pytest.raises(NetzNoeSmartmeterPortalDataError):
         api._get_metering_point_by_account_id('12345678')
+
+
+def metering_points_of(request):
+    # one metering point per account, named after it
+    account_id = parse_qs(urlsplit(request.url).query)['accountId'][0]
+    metering_point = json.loads((RESPONSES / 'data_metering_point.json').read_text())[0]
+    return 200, {}, json.dumps([{**metering_point, 'meteringPointId': f'AT{account_id}'}])
+
+
+def test_get_metering_points_concurrently(api, response):
+    response.get(ACCOUNTS_URL, 'data_account_id_2')
+    # both accounts have to be queried at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def callback(request):
+        barrier.wait()
+        return metering_points_of(request)
+
+    response.add_callback(responses.GET, METERING_POINTS_URL, callback=callback)
+    result = api.get_metering_points()
+    assert [(point.account_id, point.metering_point_id) for point in result] == [
+        ('000030012345', 'AT000030012345'), ('000030678912', 'AT000030678912')
+    ]
+
+
+def test_metering_points_ttl(response):
+    response.get(ACCOUNTS_URL, 'data_account_id_2')
+    response.add_callback(responses.GET, METERING_POINTS_URL, callback=metering_points_of)
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest',
+                                     metering_points_ttl=timedelta(hours=1))
+    assert api.get_metering_points() == api.get_metering_points()
+    assert len(response.calls) == 3
+
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest')
+    api.get_metering_points()
+    api.get_metering_points()
+    assert len(response.calls) == 9
+
+
+def test_refresh_metering_points(response):
+    accounts = json.loads((RESPONSES / 'data_account_id_2.json').read_text())
+    response.add_callback(responses.GET, ACCOUNTS_URL, callback=lambda request: (200, {}, json.dumps(accounts)))
+    response.add_callback(responses.GET, METERING_POINTS_URL, callback=metering_points_of)
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', memo=SmartmeterMemo())
+    api.get_metering_points()
+    assert len(response.calls) == 3
+
+    # nothing changed, only the accounts are read
+    assert len(api.refresh_metering_points()) == 2
+    assert len(response.calls) == 4
+
+    # the changed and the new account are queried, the removed one is dropped
+    accounts[1]['hasActive'] = False
+    accounts[0] = {**accounts[0], 'accountId': '000030999999'}
+    result = api.refresh_metering_points()
+    assert [point.account_id for point in result] == ['000030999999', '000030678912']
+    assert sorted(parse_qs(urlsplit(call.request.url).query)['accountId'][0] for call in response.calls[5:]) == [
+        '000030678912', '000030999999'
+    ]
+    # the memoized metering points were replaced
+    assert api.get_metering_points() == result
@@ -0,0 +1,90 @@
+import json
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterDataQuality
+from netznoe_smartmeter_portal_api.parser import (
+    calc_next_datetime,
+    parse_peak_demand_times,
+    process_peak_demand,
+    to_smartmeter_result,
+)
+
+INTERVAL_FIELDS = {
+    'meteredValues': 'metered', 'estimatedValues': 'estimated', 'estimatedQualities': 'estimated_qualities',
+    'gridUsageLeftoverValues': 'grid_usage_leftover', 'qualityEC': 'quality_ec', 'selfCoverageValues': 'self_coverage',
+    'jointTenancyProportionValues': 'joint_tenancy_proportion',
+    'selfCoverageRenewableEnergyValue': 'self_coverage_renewable_energy',
+    'blindConsumptionValue': 'blind_consumption', 'blindPowerFeedValue': 'blind_power_feed',
+}
+
+
+def legacy_get_values(data, field, base_time, time_increase):
+    # per value stepping as done before the time axis was shared between all fields
+    results = []
+    for value in data.get(field, []):
+        if value is not None:
+            converted_time = base_time
+            if isinstance(converted_time, datetime):
+                converted_time = converted_time.astimezone(ZoneInfo('Europe/Vienna'))
+            if value in ('L1', 'L2', 'L3'):
+                results.append((converted_time, SmartmeterDataQuality(value)))
+            else:
+                results.append((converted_time, value))
+        base_time = calc_next_datetime(base_time, time_increase)
+    return results
+
+
+def test_shared_time_axis_matches_legacy():
+    # interval fields of a full day in 15min resolution
+    data = {
+        field: ['L1'] * 96 if 'Qualit' in field or field == 'qualityEC' else [0.25] * 96
+        for field in INTERVAL_FIELDS
+    }
+    base_time = datetime(2023, 1, 1, 0, 15, tzinfo=ZoneInfo('Europe/Vienna')).astimezone(ZoneInfo('UTC'))
+    result = to_smartmeter_result(base_time, data, {'minutes': 15})
+    assert {name: getattr(result, name) for name in INTERVAL_FIELDS.values()} == {
+        name: legacy_get_values(data, field, base_time, {'minutes': 15}) for field, name in INTERVAL_FIELDS.items()
+    }
+
+
+PEAK_DEMAND_FIELDS = ('meteredPeakDemands', 'estimatedPeakDemands', 'peakDemandDataQualities')
+
+
+def legacy_process_peak_demand(data, field):
+    # strptime and two ZoneInfo lookups per entry and series as done before peakDemandTimes were shared
+    results = []
+    for cnt, value in enumerate(data.get(field, [])):
+        if value is not None:
+            timestamp = datetime.strptime(
+                data['peakDemandTimes'][cnt], '%Y-%m-%dT%H:%M:%S'
+            ).replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo('Europe/Vienna'))
+            if value in ('L1', 'L2', 'L3'):
+                results.append((timestamp, SmartmeterDataQuality(value)))
+            else:
+                results.append((timestamp, value))
+    return results
+
+
+def load_response(filename):
+    with open(os.path.join(os.path.dirname(__file__), 'responses', f'{filename}.json')) as fp:
+        return json.load(fp)[0]
+
+
+@pytest.mark.parametrize('filename', ['data_month', 'data_year'])
+def test_shared_peak_demand_times_match_legacy(filename):
+    data = load_response(filename)
+    fields = [field for field in (*PEAK_DEMAND_FIELDS, 'peakDemands') if field in data]
+    peak_demand_times = parse_peak_demand_times(data)
+    assert [process_peak_demand(data, field, peak_demand_times) for field in fields] == \
+        [legacy_process_peak_demand(data, field) for field in fields]
+
+
+def test_missing_peak_demand_time():
+    data = {'meteredPeakDemands': [1.0, 2.0], 'peakDemandTimes': ['2023-03-31T22:15:00', None]}
+    with pytest.raises(ValueError) as excinfo:
+        process_peak_demand(data, 'meteredPeakDemands')
+    assert str(excinfo.value) == 'Missing peak demand time of meteredPeakDemands'
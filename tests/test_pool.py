@@ -0,0 +1,86 @@
+import json
+from datetime import date
+
+import pytest
+import responses
+
+from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError
+from netznoe_smartmeter_portal_api.pool import SmartmeterSessionPool
+
+METER_ID = 'AT0020000000000000000000100123456'
+OTHER_METER_ID = 'AT0020000000000000000000100654321'
+
+
+@pytest.fixture
+def pool(response):
+    response.post('https://smartmeter.netz-noe.at/orchestration/Authentication/Login', 'data_login')
+    response.get(
+        'https://smartmeter.netz-noe.at/orchestration/User/GetAccountIdByBussinespartnerId', 'data_account_id_1'
+    )
+    # the first account sees the first, the second account the other metering point
+    response.get(
+        'https://smartmeter.netz-noe.at/orchestration/User/GetMeteringPointByAccountId', 'data_metering_point'
+    )
+    other = json.loads(response._get_body('data_metering_point'))
+    other[0]['meteringPointId'] = OTHER_METER_ID
+    response.add(responses.GET, 'https://smartmeter.netz-noe.at/orchestration/User/GetMeteringPointByAccountId',
+                 body=json.dumps(other), content_type='application/json')
+
+    pool = SmartmeterSessionPool([('user1', 'password1'), ('user2', 'password2')], max_concurrency_per_account=2)
+    pool.login()
+    yield pool
+    pool.close()
+
+
+def test_run(pool, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    assert sorted(pool.meter_ids()) == sorted([METER_ID, OTHER_METER_ID])
+
+    results = pool.run(lambda api, meter_id: api.get_day(meter_id, date(2023, 4, 1)))
+    assert sorted(results.keys()) == sorted([METER_ID, OTHER_METER_ID])
+    assert all(len(result.metered) == 95 for result in results.values())
+
+    stats = pool.stats()
+    assert [account.username for account in stats] == ['user1', 'user2']
+    assert [account.jobs for account in stats] == [1, 1]
+    assert all(account.throughput > 0 for account in stats)
+
+
+def test_relogin_on_expired_session(pool, response):
+    calls = []
+
+    def job(api, meter_id):
+        calls.append(meter_id)
+        if len(calls) == 1:
+            raise NetzNoeSmartmeterPortalDataError('Fetching daily data failed')
+        return meter_id
+
+    assert pool.run(job, [METER_ID]) == {METER_ID: METER_ID}
+    assert sum(account.relogins for account in pool.stats()) == 1
+
+
+def test_failing_job(pool):
+    def job(api, meter_id):
+        raise NetzNoeSmartmeterPortalDataError('Fetching daily data failed')
+
+    with pytest.raises(NetzNoeSmartmeterPortalDataError):
+        pool.run(job, [METER_ID])
+    assert sum(account.failures for account in pool.stats()) == 1
+
+
+def test_unknown_meter(pool):
+    with pytest.raises(ValueError) as excinfo:
+        pool.run(lambda api, meter_id: None, ['ATxxUNKNOWN'])
+    assert str(excinfo.value) == 'Unknown meter_id "ATxxUNKNOWN"'
+
+
+def test_logout(pool, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/Authentication/Logout', 'data_logout')
+    pool.logout()
+    assert len([call for call in response.calls if call.request.url.endswith('Logout')]) == 2
+
+
+def test_invalid_concurrency():
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterSessionPool([('user', 'password')], max_concurrency_per_account=0)
+    assert str(excinfo.value) == 'max_concurrency_per_account must be at least 1'
@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterResolution
+
+METER_ID = 'ATxxTEST'
+
+
+def test_plan_quarter_hour(api):
+    assert api._plan_range(date(2023, 3, 31), date(2023, 4, 2), SmartmeterResolution.QUARTER_HOUR) == [
+        ('Day', date(2023, 3, 31), date(2023, 3, 31)),
+        ('Day', date(2023, 4, 1), date(2023, 4, 1)),
+        ('Day', date(2023, 4, 2), date(2023, 4, 2)),
+    ]
+
+
+def test_plan_day(api):
+    assert api._plan_range(date(2023, 1, 30), date(2023, 2, 3), SmartmeterResolution.DAY) == [
+        ('Week', date(2023, 1, 30), date(2023, 2, 3)),
+    ]
+    assert api._plan_range(date(2023, 1, 15), date(2023, 3, 31), SmartmeterResolution.DAY) == [
+        ('Month', date(2023, 1, 15), date(2023, 1, 31)),
+        ('Month', date(2023, 2, 1), date(2023, 2, 28)),
+        ('Month', date(2023, 3, 1), date(2023, 3, 31)),
+    ]
+    assert api._plan_range(date(2023, 1, 1), date(2023, 2, 5), SmartmeterResolution.DAY) == [
+        ('Month', date(2023, 1, 1), date(2023, 1, 31)),
+        ('Week', date(2023, 2, 1), date(2023, 2, 5)),
+    ]
+
+
+def test_plan_month(api):
+    assert api._plan_range(date(2022, 11, 1), date(2023, 2, 1), SmartmeterResolution.MONTH) == [
+        ('Year', date(2022, 11, 1), date(2022, 12, 31)),
+        ('Year', date(2023, 1, 1), date(2023, 2, 1)),
+    ]
+
+
+def test_plan_invalid(api):
+    with pytest.raises(ValueError) as excinfo:
+        api._plan_range(date(2023, 2, 1), date(2023, 1, 1), SmartmeterResolution.DAY)
+    assert str(excinfo.value) == 'start_date must not be after end_date'
+
+    with pytest.raises(ValueError) as excinfo:
+        api._plan_range(date(2023, 1, 1), date(2023, 2, 1), 'weekly')
+    assert str(excinfo.value) == 'Unsupported resolution'
+
+
+def test_get_range_quarter_hour(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = api.get_range(METER_ID, date(2023, 4, 1), date(2023, 4, 2), SmartmeterResolution.QUARTER_HOUR)
+    # the fixture always returns the values of the 1st of April
+    assert len(response.calls) == 2
+    assert len(result.metered) == 2 * 95
+    assert len(result.metered_peak_demands) == 2 * 96
+
+
+def test_get_range_day(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    result = api.get_range(METER_ID, date(2023, 3, 5), date(2023, 3, 20), SmartmeterResolution.DAY)
+    assert len(response.calls) == 1
+    assert [timestamp for timestamp, _ in result.metered] == [date(2023, 3, day) for day in range(5, 21)]
+    assert len(result.metered_peak_demands) == 16
+
+
+def test_get_range_month(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    result = api.get_range(METER_ID, date(2023, 3, 15), date(2023, 5, 2), SmartmeterResolution.MONTH)
+    assert len(response.calls) == 1
+    assert [timestamp for timestamp, _ in result.values] == [date(2023, 3, 1), date(2023, 4, 1), date(2023, 5, 1)]
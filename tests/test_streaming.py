@@ -0,0 +1,86 @@
+import json
+from datetime import date
+
+import pytest
+import requests
+import responses
+
+from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError
+from netznoe_smartmeter_portal_api.parser import iter_json_array
+
+METER_ID = 'ATxxTEST'
+
+
+def test_iter_json_array_chunk_boundaries():
+    data = [{'ec_id': 'EC "1" \\ {[', 'values': [1.5, None, {'nested': []}]}, {'ec_id': 'Gemeinschaft €'}, []]
+    body = json.dumps(data, ensure_ascii=False).encode()
+    for size in (1, 2, 5, len(body)):
+        assert list(iter_json_array(body[pos:pos + size] for pos in range(0, len(body), size))) == data
+
+
+def test_iter_json_array_incomplete():
+    with pytest.raises(ValueError) as excinfo:
+        list(iter_json_array([b'[{"ec_id": null}, {"ec_id": ']))
+    assert str(excinfo.value) == 'Unexpected end of JSON array'
+
+
+def test_iter_matches_get(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Week', 'data_week')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+
+    assert dict(api.iter_day_per_energy_community(METER_ID, date(2023, 4, 1))) == \
+        api.get_day_per_energy_community(METER_ID, date(2023, 4, 1))
+    assert dict(api.iter_week_per_energy_community(METER_ID, date(2023, 3, 27), date(2023, 4, 3))) == \
+        api.get_week_per_energy_community(METER_ID, date(2023, 3, 27), date(2023, 4, 3))
+    assert dict(api.iter_month_per_energy_community(METER_ID, 2023, 3)) == \
+        api.get_month_per_energy_community(METER_ID, 2023, 3)
+    assert dict(api.iter_year_per_energy_community(METER_ID, 2023)) == \
+        api.get_year_per_energy_community(METER_ID, 2023)
+
+
+def test_iter_energy_communities(api, response):
+    total = json.loads(response._get_body('data_month'))[0]
+    body = json.dumps([total] + [dict(total, ec_id=f'EC{number}') for number in range(1, 4)])
+    response.add(responses.GET, 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', body=body,
+                 content_type='application/json')
+
+    results = api.iter_month_per_energy_community(METER_ID, 2023, 3)
+    assert next(results)[0] == 'total'
+    assert [ec_id for ec_id, _ in results] == ['EC1', 'EC2', 'EC3']
+
+
+def test_iter_is_lazy_and_closes_response(api, response, monkeypatch):
+    closed = []
+    close = requests.Response.close
+    monkeypatch.setattr(requests.Response, 'close', lambda resp: closed.append(resp) or close(resp))
+    total = json.loads(response._get_body('data_month'))[0]
+    body = json.dumps([total] + [dict(total, ec_id=f'EC{number}') for number in range(1, 4)])
+    response.add(responses.GET, 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', body=body,
+                 content_type='application/json')
+
+    # nothing is requested before the first entry is consumed
+    results = api.iter_month_per_energy_community(METER_ID, 2023, 3)
+    assert len(response.calls) == 0
+    assert next(results)[0] == 'total'
+    assert len(response.calls) == 1
+    assert closed == []
+
+    # closing the stream early releases the response
+    results.close()
+    assert closed == [response.calls[0].response]
+
+
+def test_iter_api_error(api, response):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day', status=999)
+    with pytest.raises(NetzNoeSmartmeterPortalDataError) as excinfo:
+        next(api.iter_day_per_energy_community(METER_ID, date(2023, 4, 1)))
+    assert str(excinfo.value) == 'Fetching daily data failed'
+
+
+def test_iter_value_error(api):
+    with pytest.raises(ValueError):
+        api.iter_month_per_energy_community(METER_ID, 2023, 13)
+    with pytest.raises(ValueError):
+        api.iter_year_per_energy_community(METER_ID, 1900)
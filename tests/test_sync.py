@@ -0,0 +1,141 @@
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from netznoe_smartmeter_portal_api import SmartmeterResolution
+from netznoe_smartmeter_portal_api.store import SmartmeterStore
+from netznoe_smartmeter_portal_api.sync import SmartmeterSync
+
+METER_ID = 'ATxxTEST'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SmartmeterStore(tmp_path / 'store.sqlite')
+    yield store
+    store.close()
+
+
+def test_store_high_water_marks(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    store.ingest(METER_ID, api.get_day(METER_ID, date(2023, 4, 1)))
+
+    marks = store.high_water_marks(METER_ID)
+    assert marks['metered'] == datetime(2023, 4, 2, tzinfo=ZoneInfo('Europe/Vienna'))
+    # the only estimate is not final
+    assert 'estimated' not in marks
+    assert store.non_final_days(METER_ID, date(2023, 3, 1), date(2023, 4, 30)) == [date(2023, 4, 1)]
+    assert store.non_final_days(METER_ID, date(2023, 4, 2), date(2023, 4, 30)) == []
+
+
+def test_store_reingest_replaces_period(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = api.get_day(METER_ID, date(2023, 4, 1))
+    store.ingest(METER_ID, result)
+
+    # the estimate got replaced by a metered value
+    store.ingest(METER_ID, replace(result, metered=[(result.estimated[0][0], 1.0)] + result.metered,
+                                   estimated=[], estimated_qualities=[]))
+    assert 'estimated' not in store.high_water_marks(METER_ID)
+    assert store.non_final_days(METER_ID, date(2023, 3, 1), date(2023, 4, 30)) == []
+
+
+def test_store_resolutions(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    result = api.get_year(METER_ID, 2023)
+    store.ingest(METER_ID, result, SmartmeterResolution.MONTH)
+    store.ingest(METER_ID, replace(result, values=[], peak_demands=[]), SmartmeterResolution.MONTH)
+
+    marks = store.high_water_marks(METER_ID, SmartmeterResolution.MONTH)
+    assert marks['values'] == datetime(2023, 12, 1, tzinfo=ZoneInfo('Europe/Vienna'))
+    assert marks['peak_demands'].year == 2023
+    assert store.high_water_marks(METER_ID) == {}
+
+
+def test_store_query(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    first = api.get_day(METER_ID, date(2023, 4, 1))
+    second = api.get_day(METER_ID, date(2023, 4, 2))
+    # the recorded peak demand times belong to the first day
+    second = replace(second, **{
+        name: [(timestamp + timedelta(days=1), value) for timestamp, value in getattr(second, name)]
+        for name in ('metered_peak_demands', 'peak_demand_data_qualities')
+    })
+    store.ingest_many(METER_ID, [first, second])
+    # re-fetched slots replace the stored ones
+    store.ingest(METER_ID, second)
+
+    assert store.query(METER_ID, date(2023, 4, 1), date(2023, 4, 1)) == first
+    assert store.query(METER_ID, date(2023, 4, 2), date(2023, 4, 2)) == second
+    both = store.query(METER_ID, date(2023, 4, 1), date(2023, 4, 2))
+    assert both.metered == first.metered + second.metered
+    assert both.metered_peak_demands == first.metered_peak_demands + second.metered_peak_demands
+
+    metered = store.query(METER_ID, date(2023, 4, 1), date(2023, 4, 1), fields=['metered', 'estimated_qualities'])
+    assert metered.metered == first.metered
+    assert metered.estimated_qualities == first.estimated_qualities
+    assert metered.estimated == [] and metered.metered_peak_demands == []
+    assert store.query(METER_ID, date(2023, 4, 3), date(2023, 4, 30)) == replace(first, **{
+        name: [] for name in first.__dataclass_fields__
+    })
+
+    with pytest.raises(ValueError) as excinfo:
+        store.query(METER_ID, date(2023, 4, 2), date(2023, 4, 1))
+    assert str(excinfo.value) == 'start_date must not be after end_date'
+
+
+def test_store_query_resolutions(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Month', 'data_month')
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Year', 'data_year')
+    month = api.get_month(METER_ID, 2023, 3)
+    year = api.get_year(METER_ID, 2023)
+    # the resolution is derived from the results
+    store.ingest_many(METER_ID, [month, year])
+
+    assert store.query(METER_ID, date(2023, 3, 1), date(2023, 3, 31), SmartmeterResolution.DAY) == month
+    assert store.query(METER_ID, date(2023, 1, 1), date(2023, 12, 31), SmartmeterResolution.MONTH) == year
+    # the months of start_date and end_date are included entirely
+    spring = store.query(METER_ID, date(2023, 3, 15), date(2023, 5, 2), SmartmeterResolution.MONTH)
+    assert spring.values == year.values[2:5]
+    assert spring.peak_demands == year.peak_demands[2:5]
+    week = store.query(METER_ID, date(2023, 3, 6), date(2023, 3, 12), SmartmeterResolution.DAY)
+    assert week.metered == month.metered[5:12]
+    assert store.query(METER_ID, date(2023, 3, 1), date(2023, 3, 31)).metered == []
+
+
+def test_store_query_uses_index(store):
+    connection = store._SmartmeterStore__connection
+    plan = connection.execute(
+        'EXPLAIN QUERY PLAN SELECT field, timestamp, value, quality FROM measurements '
+        'WHERE meter_id = ? AND resolution = ? AND timestamp >= ? AND timestamp < ?', (METER_ID, '15min', 0, 1)
+    ).fetchall()
+    assert 'measurements_timestamp' in plan[0][-1]
+
+
+def test_sync(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    sync = SmartmeterSync(api, store)
+
+    result = sync.sync(METER_ID, start_date=date(2023, 4, 1), end_date=date(2023, 4, 1))
+    assert result.fetched_days == [date(2023, 4, 1)]
+    assert result.high_water_mark == datetime(2023, 4, 2, tzinfo=ZoneInfo('Europe/Vienna'))
+
+    # the tail after the high-water mark and the day with the estimate are fetched
+    result = sync.sync(METER_ID, start_date=date(2023, 4, 1), end_date=date(2023, 4, 2))
+    assert result.fetched_days == [date(2023, 4, 1), date(2023, 4, 2)]
+
+    assert result.high_water_mark == datetime(2023, 4, 3, tzinfo=ZoneInfo('Europe/Vienna'))
+
+    # estimates older than revalidate_days are not fetched again
+    result = SmartmeterSync(api, store, revalidate_days=0).sync(METER_ID, date(2023, 4, 1), date(2023, 4, 3))
+    assert result.fetched_days == [date(2023, 4, 3)]
+    assert len(response.calls) == 4
+
+
+def test_sync_without_data(api, response, store):
+    response.get('https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day', 'data_day')
+    result = SmartmeterSync(api, store).sync(METER_ID, date(2023, 4, 1), date(2023, 4, 1), fields=('self_coverage',))
+    assert result.fetched_days == [date(2023, 4, 1)]
+    assert result.high_water_mark is None
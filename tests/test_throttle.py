@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from netznoe_smartmeter_portal_api import (
+    NetzNoeSmartmeterPortalApi,
+    SmartmeterConcurrencyController,
+    SmartmeterRateLimiter,
+)
+
+METER_ID = 'ATxxTEST'
+DAY_URL = 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day'
+
+
+def test_rate_limiter():
+    limiter = SmartmeterRateLimiter(rate=50, burst=5)
+    started = time.monotonic()
+    for _ in range(15):
+        limiter.acquire()
+    # the burst is free, the remaining 10 tokens take 10 / 50 seconds
+    assert 0.15 <= time.monotonic() - started < 1
+
+
+def test_rate_limiter_shared_by_threads():
+    limiter = SmartmeterRateLimiter(rate=100, burst=1)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: limiter.acquire(), range(21)))
+    assert 0.18 <= time.monotonic() - started < 1
+
+
+def test_rate_limiter_invalid_arguments():
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterRateLimiter(rate=0)
+    assert str(excinfo.value) == 'rate must be positive'
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterRateLimiter(rate=1, burst=0)
+    assert str(excinfo.value) == 'burst must be at least 1'
+
+
+def test_concurrency_additive_increase():
+    controller = SmartmeterConcurrencyController(initial_limit=2, max_limit=4)
+    for _ in range(100):
+        controller.acquire()
+        controller.release(0.1)
+    assert controller.limit == 4
+    assert controller.in_flight == 0
+
+
+def test_concurrency_multiplicative_decrease():
+    controller = SmartmeterConcurrencyController(initial_limit=8, min_limit=2)
+    controller.acquire()
+    controller.release(0.1, congested=True)
+    assert controller.limit == 4
+
+    # further errors of the same round do not cut the limit again
+    for _ in range(3):
+        controller.acquire()
+        controller.release(0.1, congested=True)
+    assert controller.limit == 4
+
+    for _ in range(20):
+        controller.acquire()
+        controller.release(0.1, congested=True)
+    assert controller.limit == 2
+
+
+def test_concurrency_latency_congestion():
+    controller = SmartmeterConcurrencyController(initial_limit=8, latency_tolerance=4.0)
+    controller.acquire()
+    controller.release(0.1)
+    controller.acquire()
+    controller.release(0.3)
+    assert controller.limit == 8
+    controller.acquire()
+    controller.release(0.5)
+    assert controller.limit == 4
+
+
+def test_concurrency_blocks_at_limit():
+    controller = SmartmeterConcurrencyController(initial_limit=1, max_limit=1)
+    controller.acquire()
+    acquired = threading.Event()
+
+    def acquire():
+        controller.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    assert not acquired.wait(0.1)
+    controller.release(0.1)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_concurrency_invalid_arguments():
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterConcurrencyController(initial_limit=64, max_limit=32)
+    assert str(excinfo.value) == 'min_limit <= initial_limit <= max_limit must hold and min_limit must be at least 1'
+    with pytest.raises(ValueError) as excinfo:
+        SmartmeterConcurrencyController(decrease_factor=1)
+    assert str(excinfo.value) == 'decrease_factor must be between 0 and 1'
+
+
+def test_api_throttled(response, monkeypatch):
+    monkeypatch.setattr('netznoe_smartmeter_portal_api.api.time.sleep', lambda _: None)
+    response.get(DAY_URL, 'data_day', status=503)
+    response.get(DAY_URL, 'data_day')
+
+    limiter = SmartmeterRateLimiter(rate=1000, burst=10)
+    controller = SmartmeterConcurrencyController(initial_limit=4)
+    # both are shared by all clients of the process
+    apis = [NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', rate_limiter=limiter,
+                                       concurrency=controller) for _ in range(2)]
+    apis[0].get_day(METER_ID, day=date(2023, 4, 1))
+    assert controller.limit == 2
+    apis[1].get_day(METER_ID, day=date(2023, 4, 1))
+    assert controller.in_flight == 0
+    assert len(response.calls) == 3
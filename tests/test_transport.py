@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from netznoe_smartmeter_portal_api import NetzNoeSmartmeterPortalApi
+from netznoe_smartmeter_portal_api.api import NetzNoeSmartmeterPortalDataError, _retry_after_seconds
+
+METER_ID = 'ATxxTEST'
+DAY_URL = 'https://smartmeter.netz-noe.at/orchestration/ConsumptionRecord/Day'
+LOGIN_URL = 'https://smartmeter.netz-noe.at/orchestration/Authentication/Login'
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('netznoe_smartmeter_portal_api.api.time.sleep', sleeps.append)
+    return sleeps
+
+
+def test_retry_transient_errors(api, response, sleeps):
+    response.get(DAY_URL, 'data_day', status=503)
+    response.get(DAY_URL, 'data_day', status=502)
+    response.get(DAY_URL, 'data_day')
+
+    result = api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert len(result.metered) == 95
+    assert len(sleeps) == 2
+    # jittered exponential backoff
+    assert 0.25 <= sleeps[0] <= 0.5
+    assert 0.5 <= sleeps[1] <= 1.0
+
+
+def test_retry_after(api, response, sleeps):
+    response.get(DAY_URL, 'data_day', status=429, headers={'Retry-After': '7'})
+    response.get(DAY_URL, 'data_day')
+
+    api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert sleeps == [7.0]
+
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= _retry_after_seconds(format_datetime(retry_at, usegmt=True)) <= 30
+    assert _retry_after_seconds(format_datetime(retry_at - timedelta(minutes=5), usegmt=True)) == 0
+    assert _retry_after_seconds('soon') is None
+    assert _retry_after_seconds(None) is None
+
+
+def test_retries_exhausted(response, sleeps):
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', max_retries=2)
+    response.get(DAY_URL, 'data_day', status=500)
+
+    with pytest.raises(NetzNoeSmartmeterPortalDataError) as excinfo:
+        api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert str(excinfo.value) == 'Fetching daily data failed'
+    assert len(sleeps) == 2
+    assert len(response.calls) == 3
+
+
+def test_relogin_on_expired_session(api, response, sleeps):
+    response.get(DAY_URL, 'data_day', status=401)
+    response.get(DAY_URL, 'data_day')
+    response.post(LOGIN_URL, 'data_login')
+
+    result = api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert len(result.metered) == 95
+    assert [call.request.url.split('?')[0] for call in response.calls] == [DAY_URL, LOGIN_URL, DAY_URL]
+    assert sleeps == []
+
+
+def test_relogin_only_once(api, response, sleeps):
+    response.get(DAY_URL, 'data_day', status=401)
+    response.post(LOGIN_URL, 'data_login')
+
+    with pytest.raises(NetzNoeSmartmeterPortalDataError):
+        api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert len(response.calls) == 3
+
+
+def test_retry_connection_error(api, response, sleeps):
+    response.add('GET', DAY_URL, body=requests.ConnectionError('connection reset'))
+    response.get(DAY_URL, 'data_day')
+
+    result = api.get_day(METER_ID, day=date(2023, 4, 1))
+    assert len(result.metered) == 95
+    assert len(sleeps) == 1
+
+    response.add('GET', DAY_URL, body=requests.ConnectionError('connection reset'))
+    api = NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', max_retries=0)
+    with pytest.raises(requests.ConnectionError):
+        api.get_day(METER_ID, day=date(2023, 4, 1))
+
+
+def test_invalid_max_retries():
+    with pytest.raises(ValueError) as excinfo:
+        NetzNoeSmartmeterPortalApi(username='localtest', password='localtest', max_retries=-1)
+    assert str(excinfo.value) == 'max_retries must not be negative'